@@ -0,0 +1,500 @@
+"""오목 게임 서버
+
+표준 라이브러리 asyncio만으로 HTTP와 WebSocket을 처리하며
+한 프로세스에서 여러 Board 게임을 동시에 진행함
+
+Shell에
+python main.py [--host HOST] [--port PORT] [--session-dir DIR]
+입력 후 브라우저로 접속
+
+HTTP
+GET  /                  HTML 클라이언트
+POST /games             새 게임. body {"rule": "default" | "korean" | "renju"} 생략 가능
+GET  /games/<id>        현재 보드 HTML
+WebSocket /ws/<id>      board_stream 메시지를 받고 아래 메시지를 보냄
+    {"type": "move", "cell": [행, 열]}
+    {"type": "ai"}      다음 차례 돌을 OmokAi가 계산해 둠. --ai pool이면 프로세스 풀에서,
+                        --ai batch면 여러 게임의 요청을 모아 스레드 풀에서 한번에 계산
+    {"type": "hint"}    다음 차례 돌의 추천 수를 요청한 클라이언트에게만 보냄.
+                        같은 국면의 요청은 AnalysisService가 한번만 계산함
+    {"type": "undo"}    계산 중인 AI는 중단
+    {"type": "resign", "stone": 1 | 2}
+                        계산 중인 AI를 중단하고 상대 돌의 승리로 끝냄
+모든 클라이언트가 나간 게임의 AI 계산도 바로 중단함
+--reply-cache PATH를 주면 AI 응수를 국면별로 캐시하고 종료할 때 SQLite 파일에 저장함
+접속한 클라이언트가 없는 게임의 Board는 SessionStore가 --max-active개까지만 메모리에 두고
+IDLE_SECONDS 넘게 쓰지 않으면 --session-dir에 착수 기록으로 내보냈다가 다시 접속하면 복원함
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import secrets
+import struct
+import sys
+from http import HTTPStatus
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "test"))
+
+from board_calculator import (
+    KOREAN_RULE,
+    RENJU_RULE,
+    STONE_CODES,
+    Board,
+    BoardErrors,
+    OmokAiErrors,
+    Rule,
+    Stone,
+)
+from ai_analysis import AnalysisService
+from ai_batch import BatchQueue
+from ai_cache import Reply, ReplyCache
+from ai_pool import AiPool
+from board_stream import BoardStream
+from session_store import SessionStore
+
+RULES: dict[str, Rule] = {"default": Rule(), "korean": KOREAN_RULE, "renju": RENJU_RULE}
+
+GAME_ERRORS: tuple[type, ...] = tuple(
+    error for errors in (BoardErrors, OmokAiErrors) for error in vars(errors).values()
+    if isinstance(error, type) and issubclass(error, Exception)
+)
+"클라이언트에게 error 메시지로 알리는 규칙 위반"
+
+WS_GUID: str = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+"Sec-WebSocket-Accept 계산에 쓰는 RFC 6455 고정 문자열"
+
+MAX_HEADER: int = 1 << 14
+MAX_FRAME: int = 1 << 16
+MAX_BUFFERED: int = 1 << 20
+"보내지 못하고 쌓인 바이트가 이보다 많은 클라이언트는 연결을 끊음. 다시 접속하면 checkpoint부터 받음"
+
+IDLE_SECONDS: float = 300.0
+"이 시간 넘게 쓰지 않은 Board는 디스크로 내보냄"
+
+
+class WebSocket:
+    """RFC 6455 텍스트 프레임만 주고받는 최소 구현"""
+    __slots__ = ("__reader", "__writer")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.__reader: asyncio.StreamReader = reader
+        self.__writer: asyncio.StreamWriter = writer
+
+    @staticmethod
+    def accept_key(key: str) -> str:
+        return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+    async def recv(self) -> str | None:
+        """다음 텍스트 메시지. ping에는 pong으로 답하고, 연결이 끝나면 None"""
+        while True:
+            try:
+                head: bytes = await self.__reader.readexactly(2)
+                opcode: int = head[0] & 0x0F
+                length: int = head[1] & 0x7F
+                if length == 126:
+                    length = struct.unpack("!H", await self.__reader.readexactly(2))[0]
+                elif length == 127:
+                    length = struct.unpack("!Q", await self.__reader.readexactly(8))[0]
+                if length > MAX_FRAME:
+                    return None
+                mask: bytes = await self.__reader.readexactly(4) if head[1] & 0x80 else b""
+                payload: bytes = await self.__reader.readexactly(length)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return None
+            if mask:
+                payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+            match opcode:
+                case 0x1:
+                    return payload.decode()
+                case 0x8:
+                    self.__send_frame(0x8, b"")
+                    return None
+                case 0x9:
+                    self.__send_frame(0xA, payload)
+
+    def send(self, message: dict) -> None:
+        """message를 json 텍스트 프레임으로 보냄. 이벤트 루프를 막지 않도록 버퍼에만 쓰고
+        받는 쪽이 느려 MAX_BUFFERED를 넘게 쌓이면 연결을 끊음"""
+        self.__send_frame(0x1, json.dumps(message, separators=(",", ":")).encode())
+
+    def __send_frame(self, opcode: int, payload: bytes) -> None:
+        if self.__writer.is_closing():
+            return
+        if self.__writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+            self.__writer.transport.abort()
+            return
+        size: int = len(payload)
+        if size < 126:
+            head: bytes = struct.pack("!BB", 0x80 | opcode, size)
+        elif size < 1 << 16:
+            head = struct.pack("!BBH", 0x80 | opcode, 126, size)
+        else:
+            head = struct.pack("!BBQ", 0x80 | opcode, 127, size)
+        self.__writer.write(head + payload)
+
+
+class Game:
+    """접속 중인 클라이언트가 있는 한 판의 Board와 그 변경을 클라이언트에 보내는 BoardStream"""
+    __slots__ = ("board", "stream", "winner", "ai_task")
+
+    def __init__(self, board: Board) -> None:
+        """디스크에서 복원한 board면 마지막 돌이 이미 이겼는지 다시 판정함"""
+        self.board: Board = board
+        self.stream: BoardStream = BoardStream(board)
+        self.winner: Stone | None = None
+        if board.last_stone != Stone.EMPTY and board.windows.has_five(board.last_stone):
+            self.winner = board.last_stone
+        self.ai_task: asyncio.Task | None = None
+        "AI 착수 계산 작업"
+
+    @property
+    def next_stone(self) -> Stone:
+        return Stone.WHITE if self.board.last_stone == Stone.BLACK else Stone.BLACK
+
+    @property
+    def thinking(self) -> bool:
+        return self.ai_task is not None and not self.ai_task.done()
+
+    def stop_ai(self) -> None:
+        """계산 중인 AI 작업을 취소. 워커의 계산도 함께 중단됨"""
+        if self.thinking:
+            self.ai_task.cancel()
+
+    def play(self, idx: tuple[int, int]) -> None:
+        """다음 차례 돌을 idx에 둠. 승리하면 winner를 기록하고 결과를 알림"""
+        stone: Stone = self.next_stone
+        try:
+            self.board[idx] = stone
+        except BoardErrors.WinError:
+            self.winner = stone
+            self.broadcast({"type": "result", "winner": STONE_CODES[stone]})
+
+    def undo(self) -> None:
+        self.stop_ai()
+        self.board.undo()
+        self.winner = None
+
+    def resign(self, stone: Stone) -> None:
+        self.stop_ai()
+        self.winner = Stone.WHITE if stone == Stone.BLACK else Stone.BLACK
+        self.broadcast({"type": "result", "winner": STONE_CODES[self.winner]})
+
+    def broadcast(self, message: dict) -> None:
+        """board_stream 메시지가 아닌 알림을 같은 클라이언트들에게 보냄"""
+        for client in self.stream.clients:
+            client(message)
+
+
+class GameServer:
+    """HTTP 요청과 WebSocket 연결을 게임별로 나눠 처리"""
+    def __init__(
+        self, ai: AiPool | BatchQueue, store: SessionStore, replies: ReplyCache | None = None
+    ) -> None:
+        """ai는 choose_reply(board, mystone)을 await할 수 있는 AiPool 또는 BatchQueue.
+        store는 게임별 Board 저장소. replies를 주면 AI 응수를 먼저 찾아보고 새로 계산한 응수를 저장함"""
+        self.__games: dict[str, Game] = {}
+        "클라이언트가 접속 중인 게임"
+        self.__store: SessionStore = store
+        self.__ai: AiPool | BatchQueue = ai
+        self.__replies: ReplyCache | None = replies
+        self.__analysis: AnalysisService = AnalysisService()
+
+    @property
+    def games(self) -> dict[str, Game]:
+        return self.__games
+
+    @property
+    def store(self) -> SessionStore:
+        return self.__store
+
+    def new_game(self, rule: Rule = RULES["default"]) -> str:
+        game_id: str = secrets.token_urlsafe(6)
+        self.__store.create(game_id, rule)
+        return game_id
+
+    def join(self, game_id: str) -> Game:
+        """접속 중인 게임을 반환하거나, 저장소에서 Board를 checkout해 새로 시작. 없는 게임이면 KeyError"""
+        game: Game | None = self.__games.get(game_id)
+        if game is None:
+            game = self.__games[game_id] = Game(self.__store.checkout(game_id))
+        return game
+
+    def leave(self, game_id: str) -> None:
+        """마지막 클라이언트가 나간 게임의 AI를 멈추고 Board를 저장소에 돌려줌"""
+        game: Game = self.__games[game_id]
+        if game.stream.clients:
+            return
+        game.stop_ai()
+        game.stream.close()
+        del self.__games[game_id]
+        self.__store.checkin(game_id)
+
+    async def spill_idle(self, interval: float = 60.0, idle_seconds: float = IDLE_SECONDS) -> None:
+        """interval초마다 오래 쓰지 않은 Board를 디스크로 내보냄"""
+        while True:
+            await asyncio.sleep(interval)
+            self.__store.spill_idle(idle_seconds)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """연결 하나를 처리. WebSocket 업그레이드가 아니면 응답 후 닫음"""
+        try:
+            head: bytes = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        lines: list[str] = head.decode("latin-1").split("\r\n")
+        try:
+            method, path, _ = lines[0].split(" ", 2)
+        except ValueError:
+            await self.__respond(writer, HTTPStatus.BAD_REQUEST)
+            return
+        headers: dict[str, str] = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        if headers.get("upgrade", "").lower() == "websocket" and path.startswith("/ws/"):
+            await self.__websocket(reader, writer, headers, path[len("/ws/"):])
+            return
+        body: bytes = b""
+        try:
+            length: int = int(headers.get("content-length", "0") or 0)
+            if 0 < length <= MAX_HEADER:
+                body = await reader.readexactly(length)
+        except (ValueError, asyncio.IncompleteReadError):
+            await self.__respond(writer, HTTPStatus.BAD_REQUEST)
+            return
+        await self.__route(writer, method, path, body)
+
+    async def __route(self, writer: asyncio.StreamWriter, method: str, path: str, body: bytes) -> None:
+        if method == "GET" and path == "/":
+            await self.__respond(writer, HTTPStatus.OK, CLIENT_HTML, "text/html; charset=utf-8")
+        elif method == "POST" and path == "/games":
+            try:
+                options: dict = json.loads(body) if body else {}
+                rule: Rule = RULES[options.get("rule", "default")]
+            except (ValueError, KeyError, AttributeError):
+                await self.__respond(writer, HTTPStatus.BAD_REQUEST)
+                return
+            game_id: str = self.new_game(rule)
+            await self.__respond(writer, HTTPStatus.CREATED, json.dumps({"id": game_id}), "application/json")
+        elif method == "GET" and path.startswith("/games/"):
+            try:
+                board: Board = self.__store.get(path[len("/games/"):])
+            except KeyError:
+                await self.__respond(writer, HTTPStatus.NOT_FOUND)
+                return
+            await self.__respond(writer, HTTPStatus.OK, board.to_html(), "text/html; charset=utf-8")
+        else:
+            await self.__respond(writer, HTTPStatus.NOT_FOUND)
+
+    @staticmethod
+    async def __respond(
+        writer: asyncio.StreamWriter, status: HTTPStatus, body: str = "", content_type: str = "text/plain"
+    ) -> None:
+        data: bytes = (body or status.phrase).encode()
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            "Connection: close\r\n\r\n".encode() + data
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def __websocket(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, headers: dict, game_id: str
+    ) -> None:
+        try:
+            if "sec-websocket-key" not in headers:
+                raise KeyError(game_id)
+            game: Game = self.join(game_id)
+        except KeyError:
+            await self.__respond(writer, HTTPStatus.NOT_FOUND)
+            return
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {WebSocket.accept_key(headers['sec-websocket-key'])}\r\n\r\n".encode()
+        )
+        ws: WebSocket = WebSocket(reader, writer)
+        game.stream.join(ws.send)
+        try:
+            while (text := await ws.recv()) is not None:
+                await self.__on_message(game, ws, text)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            game.stream.leave(ws.send)
+            self.leave(game_id)
+            writer.close()
+
+    async def __on_message(self, game: Game, ws: WebSocket, text: str) -> None:
+        """클라이언트 요청을 Board에 적용. 규칙 위반은 보낸 클라이언트에게만 error로 알림"""
+        try:
+            message: dict = json.loads(text)
+            kind: str = message["type"]
+        except (ValueError, KeyError, TypeError):
+            ws.send({"type": "error", "error": "BadMessage"})
+            return
+        try:
+            match kind:
+                case "move" | "ai" if game.thinking:
+                    ws.send({"type": "error", "error": "AiThinking"})
+                case "move" if game.winner is None:
+                    row, col = message["cell"]
+                    game.play((int(row), int(col)))
+                case "ai" if game.winner is None:
+                    game.ai_task = asyncio.create_task(self.__ai_move(game))
+                case "hint":
+                    version: int = game.board.version
+                    analysis = await self.__analysis.analyse(game.board, game.next_stone)
+                    ws.send({"type": "hint", "version": version, "move": analysis.move})
+                case "undo":
+                    game.undo()
+                case "resign" if game.winner is None:
+                    game.resign({1: Stone.BLACK, 2: Stone.WHITE}[message["stone"]])
+                case "move" | "ai" | "resign":
+                    ws.send({"type": "error", "error": "GameOver"})
+                case _:
+                    ws.send({"type": "error", "error": "BadMessage"})
+        except GAME_ERRORS as error:
+            ws.send({"type": "error", "error": type(error).__name__, "message": str(error)})
+        except (KeyError, TypeError, ValueError, IndexError):
+            ws.send({"type": "error", "error": "BadMessage"})
+
+    async def __ai_move(self, game: Game) -> None:
+        """다음 차례 돌의 착수를 계산한 뒤 그 사이 보드가 바뀌지 않았으면 착수"""
+        board: Board = game.board
+        version: int = board.version
+        stone: Stone = game.next_stone
+        reply: Reply | None = None if self.__replies is None else self.__replies.get(board, stone)
+        if reply is None:
+            reply = await self.__ai.choose_reply(board, stone)
+            if self.__replies is not None and board.version == version:
+                self.__replies.put(board, stone, reply)
+        idx = reply.move
+        if idx is not None and board.version == version and game.winner is None:
+            try:
+                game.play(idx)
+            except GAME_ERRORS as error:
+                game.broadcast({"type": "error", "error": type(error).__name__, "message": str(error)})
+
+
+CLIENT_HTML: str = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Omok</title>
+<style>
+.omok-board{border-collapse:collapse;background:#dcb35c}
+.omok-board td{width:28px;height:28px;border:1px solid #8a6d2f;padding:0;cursor:pointer}
+.omok-board td.black{background:radial-gradient(circle,#000 55%,transparent 60%)}
+.omok-board td.white{background:radial-gradient(circle,#fff 55%,transparent 60%)}
+</style></head>
+<body>
+<div id="board"></div>
+<button id="ai">AI</button> <button id="hint">Hint</button> <button id="undo">Undo</button> <span id="status"></span>
+<script>
+const CLASSES = ["empty", "black", "white"];
+const board = document.getElementById("board");
+const status = document.getElementById("status");
+let ws;
+
+async function start() {
+  if (!location.hash) {
+    const res = await fetch("/games", {method: "POST"});
+    location.hash = (await res.json()).id;
+  }
+  const scheme = location.protocol === "https:" ? "wss" : "ws";
+  ws = new WebSocket(`${scheme}://${location.host}/ws/${location.hash.slice(1)}`);
+  ws.onmessage = (event) => {
+    const msg = JSON.parse(event.data);
+    if (msg.type === "checkpoint") {
+      board.innerHTML = msg.html;
+    } else if (msg.type === "patch") {
+      board.firstChild.rows[msg.cell[0]].cells[msg.cell[1]].className = CLASSES[msg.stone];
+    } else if (msg.type === "result") {
+      status.textContent = CLASSES[msg.winner] + " wins";
+    } else if (msg.type === "hint") {
+      status.textContent = msg.move ? "hint: " + msg.move.join(", ") : "";
+    } else if (msg.type === "error") {
+      status.textContent = msg.error;
+    }
+  };
+}
+
+board.addEventListener("click", (event) => {
+  const td = event.target.closest("td");
+  if (!td) return;
+  status.textContent = "";
+  ws.send(JSON.stringify({type: "move", cell: [td.parentNode.rowIndex, td.cellIndex]}));
+});
+document.getElementById("ai").onclick = () => ws.send(JSON.stringify({type: "ai"}));
+document.getElementById("hint").onclick = () => ws.send(JSON.stringify({type: "hint"}));
+document.getElementById("undo").onclick = () => {
+  status.textContent = "";
+  ws.send(JSON.stringify({type: "undo"}));
+};
+start();
+</script>
+</body></html>
+"""
+
+
+async def serve(
+    host: str, port: int, ai: str = "pool", workers: int | None = None, reply_cache: str | None = None,
+    session_dir: str = "sessions", max_active: int = 1024
+) -> None:
+    replies: ReplyCache | None = None if reply_cache is None else ReplyCache(path=reply_cache)
+    store: SessionStore = SessionStore(session_dir, max_active)
+    try:
+        if ai == "batch":
+            await _listen(GameServer(BatchQueue(), store, replies), host, port)
+        else:
+            with AiPool(workers) as ai_pool:
+                await _listen(GameServer(ai_pool, store, replies), host, port)
+    finally:
+        store.flush()
+        if replies is not None:
+            replies.save()
+            print(f"reply cache: {len(replies)} entries, hit rate {replies.hit_rate:.1%}")
+
+
+async def _listen(server: GameServer, host: str, port: int) -> None:
+    listener: asyncio.Server = await asyncio.start_server(server.handle, host, port, limit=MAX_HEADER)
+    print(f"serving on http://{host}:{port}")
+    spiller: asyncio.Task = asyncio.create_task(server.spill_idle())
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        spiller.cancel()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="오목 게임 서버")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8080)))
+    parser.add_argument("--ai", choices=("pool", "batch"), default="pool", help="AI 착수 계산 방식")
+    parser.add_argument("--workers", type=int, default=None, help="--ai pool의 계산 프로세스 수")
+    parser.add_argument("--reply-cache", default=None, help="AI 응수 캐시 SQLite 파일")
+    parser.add_argument("--session-dir", default="sessions", help="쓰지 않는 게임을 저장할 디렉터리")
+    parser.add_argument("--max-active", type=int, default=1024, help="메모리에 둘 최대 게임 수")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(
+            args.host, args.port, args.ai, args.workers, args.reply_cache,
+            args.session_dir, args.max_active
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
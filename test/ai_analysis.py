@@ -0,0 +1,94 @@
+"""같은 국면에 대한 분석 요청을 한번의 OmokAi 계산으로 묶는 분석 서비스
+
+국면은 (Board.zobrist, last_stone, rule)로 구분하며
+계산 중인 국면에 들어온 요청은 그 계산 결과를 함께 기다리고(single-flight),
+끝난 결과는 ttl초 동안 캐시에서 바로 돌려줌
+"""
+import asyncio
+import time
+from typing import NamedTuple
+
+import numpy as np
+from board_calculator import Board, OmokAi, Rule, Stone
+
+
+class Analysis(NamedTuple):
+    """한 국면에서 mystone이 둘 수와 그 근거가 된 moveboard"""
+    move: tuple[int, int] | None
+    moveboard: np.ndarray
+
+
+def analyse(data: bytes, rule: Rule, mystone: Stone, attack: float, defence: float) -> Analysis:
+    """to_bytes로 받은 국면을 분석. 이벤트 루프 밖에서 실행됨"""
+    ai: OmokAi = OmokAi(Board.from_bytes(data, rule), mystone, attack, defence)
+    move = ai.choose_move()
+    if not ai.view_moveboard.any():
+        ai.scoring()
+    moveboard: np.ndarray = ai.view_moveboard
+    moveboard.flags.writeable = False
+    return Analysis(move, moveboard)
+
+
+class AnalysisService:
+    """analyse를 await하면 같은 국면의 계산은 한번만 실행하고 결과를 공유"""
+    def __init__(self, ttl: float = 2.0, max_entries: int = 4096, executor=None, clock=time.monotonic) -> None:
+        """executor는 계산을 실행할 concurrent.futures Executor. None이면 loop 기본 스레드 풀"""
+        self.ttl: float = ttl
+        self.max_entries: int = max_entries
+        self.__executor = executor
+        self.__clock = clock
+        self.__inflight: dict[tuple, asyncio.Future] = {}
+        self.__cache: dict[tuple, tuple[float, Analysis]] = {}
+        "국면 키 -> (만료 시각, 결과). 오래된 결과부터 들어 있음"
+        self.computed: int = 0
+        "실제로 계산한 횟수"
+        self.coalesced: int = 0
+        "계산 중인 결과를 함께 기다린 요청 수"
+        self.hits: int = 0
+        "캐시에서 바로 돌려준 요청 수"
+
+    @staticmethod
+    def key(board: Board, mystone: Stone, attack: float = 1, defence: float = 1) -> tuple:
+        return board.zobrist, board.last_stone, board.rule, mystone, attack, defence
+
+    async def analyse(
+        self, board: Board, mystone: Stone, attack: float = 1, defence: float = 1
+    ) -> Analysis:
+        """board의 현재 국면을 mystone 입장에서 분석한 Analysis.
+        기다리던 요청이 취소되어도 공유 중인 계산은 계속 진행됨"""
+        key: tuple = self.key(board, mystone, attack, defence)
+        now: float = self.__clock()
+        cached: tuple[float, Analysis] | None = self.__cache.get(key)
+        if cached is not None and cached[0] > now:
+            self.hits += 1
+            return cached[1]
+
+        future: asyncio.Future | None = self.__inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            self.computed += 1
+            loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self.__executor, analyse, board.to_bytes(), board.rule, mystone, attack, defence
+            )
+            self.__inflight[key] = future
+            future.add_done_callback(lambda done: self.__finish(key, done))
+        return await asyncio.shield(future)
+
+    def __finish(self, key: tuple, future: asyncio.Future) -> None:
+        del self.__inflight[key]
+        if future.cancelled() or future.exception() is not None:
+            return
+        now: float = self.__clock()
+        self.__cache.pop(key, None)
+        self.__cache[key] = now + self.ttl, future.result()
+        self.__prune(now)
+
+    def __prune(self, now: float) -> None:
+        """만료된 결과와 max_entries를 넘는 오래된 결과를 버림"""
+        for key in list(self.__cache):
+            expires, _ = self.__cache[key]
+            if expires > now and len(self.__cache) <= self.max_entries:
+                break
+            del self.__cache[key]
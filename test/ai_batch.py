@@ -0,0 +1,103 @@
+"""여러 게임의 AI 착수 요청을 모아 한번에 계산하는 요청 큐
+
+요청을 max_delay초 동안 또는 max_batch개가 될 때까지 모은 뒤
+이벤트 루프 밖 executor에서 OmokAi.choose_moves 한번으로 계산해 각 요청에 결과를 돌려줌
+"""
+import asyncio
+
+from ai_cache import Reply
+from board_calculator import Board, OmokAi, Rule, Stone
+
+
+def _choose_replies(requests: list[tuple[bytes, Rule, Stone, float, float]]) -> list[Reply]:
+    """executor에서 실행. to_bytes로 받은 보드들을 choose_moves로 한번에 계산하고
+    ai_cache.compute_reply와 같이 각 수의 moveboard 점수를 붙임"""
+    ais: list[OmokAi] = [
+        OmokAi(Board.from_bytes(data, rule), mystone, attack, defence)
+        for data, rule, mystone, attack, defence in requests
+    ]
+    replies: list[Reply] = []
+    for ai, move in zip(ais, OmokAi.choose_moves(ais)):
+        moveboard = ai.view_moveboard
+        score: float | None = None
+        if move is not None and moveboard.any():
+            score = moveboard[move].item()
+        replies.append(Reply(move, score))
+    return replies
+
+
+class BatchQueue:
+    """choose_move를 await하면 같은 시기의 다른 요청들과 묶어서 계산"""
+    def __init__(self, max_batch: int = 32, max_delay: float = 0.002, executor=None) -> None:
+        """executor는 묶음을 계산할 concurrent.futures Executor. None이면 loop 기본 스레드 풀"""
+        self.max_batch: int = max_batch
+        self.max_delay: float = max_delay
+        "첫 요청 후 묶음을 계산하기까지 기다리는 최대 시간(초)"
+        self.__executor = executor
+        self.__pending: list[tuple[Board, Stone, float, float, asyncio.Future]] = []
+        self.__timer: asyncio.TimerHandle | None = None
+        self.__batches: int = 0
+        self.__requests: int = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self.__pending)
+
+    @property
+    def average_batch(self) -> float:
+        """지금까지 계산한 묶음 하나의 평균 요청 수"""
+        return self.__requests / self.__batches if self.__batches else 0.0
+
+    async def choose_move(
+        self, board: Board, mystone: Stone, attack: float = 1, defence: float = 1
+    ) -> tuple[int, int] | None:
+        """OmokAi(board, mystone, attack, defence).choose_move()와 같은 결과.
+        기다리는 동안 board를 바꾸면 묶음을 보내는 시점의 board로 계산함"""
+        return (await self.choose_reply(board, mystone, attack, defence)).move
+
+    async def choose_reply(
+        self, board: Board, mystone: Stone, attack: float = 1, defence: float = 1
+    ) -> Reply:
+        """choose_move와 같지만 그 수의 moveboard 점수를 함께 반환"""
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        self.__pending.append((board, mystone, attack, defence, future))
+        if len(self.__pending) >= self.max_batch:
+            self.flush()
+        elif self.__timer is None:
+            self.__timer = loop.call_later(self.max_delay, self.flush)
+        return await future
+
+    def flush(self) -> None:
+        """모인 요청의 보드를 to_bytes로 떼어 executor에 바로 보냄. 이미 취소된 요청은 건너뜀"""
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+        batch: list[asyncio.Future] = []
+        requests: list[tuple[bytes, Rule, Stone, float, float]] = []
+        for board, mystone, attack, defence, future in self.__pending:
+            if not future.done():
+                batch.append(future)
+                requests.append((board.to_bytes(), board.rule, mystone, attack, defence))
+        self.__pending = []
+        if not batch:
+            return
+        self.__batches += 1
+        self.__requests += len(batch)
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        replies: asyncio.Future = loop.run_in_executor(self.__executor, _choose_replies, requests)
+        replies.add_done_callback(lambda done: self.__resolve(batch, done))
+
+    @staticmethod
+    def __resolve(batch: list[asyncio.Future], replies: asyncio.Future) -> None:
+        """계산이 끝나면 그 사이 취소되지 않은 요청에 결과를 돌려줌"""
+        error: BaseException | None = (
+            asyncio.CancelledError() if replies.cancelled() else replies.exception()
+        )
+        for i, future in enumerate(batch):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(replies.result()[i])
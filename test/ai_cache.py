@@ -0,0 +1,183 @@
+"""국면별 AI 응수 캐시
+
+보드를 뒤집거나 돌린 대칭 국면은 같은 키(정규형)로 묶고
+(정규형, 둘 돌, rule, AI 설정) -> (정규형 좌표의 수, moveboard 점수)를 LRU로 보관함
+save/load로 SQLite 파일에 저장했다가 다음 실행 때 다시 채울 수 있음
+"""
+import os
+import sqlite3
+import struct
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+from board_calculator import STONE_CODES, Board, OmokAi, Stone, pack_codes
+
+_SQUARE_TRANSFORMS: tuple = (
+    lambda a: a,
+    lambda a: np.rot90(a, 1),
+    lambda a: np.rot90(a, 2),
+    lambda a: np.rot90(a, 3),
+    lambda a: a[::-1, :],
+    lambda a: a[:, ::-1],
+    lambda a: a.T,
+    lambda a: np.rot90(a, 2).T,
+)
+"정사각형 보드의 8가지 대칭 변환"
+
+_RECT_TRANSFORMS: tuple = _SQUARE_TRANSFORMS[0:3:2] + _SQUARE_TRANSFORMS[4:6]
+"직사각형 보드에서 모양을 유지하는 4가지 대칭 변환"
+
+
+def _transforms(shape: tuple[int, int]) -> tuple:
+    return _SQUARE_TRANSFORMS if shape[0] == shape[1] else _RECT_TRANSFORMS
+
+
+def canonical(codes: np.ndarray) -> tuple[bytes, int]:
+    """대칭 변환한 보드들 중 pack_codes 바이트열이 가장 작은 것과 그 변환 번호"""
+    candidates: list[bytes] = [
+        pack_codes(transform(codes)).tobytes() for transform in _transforms(codes.shape)
+    ]
+    index: int = min(range(len(candidates)), key=candidates.__getitem__)
+    return candidates[index], index
+
+
+def _from_canonical(shape: tuple[int, int], transform: int, move: tuple[int, int]) -> tuple[int, int]:
+    """정규형 보드 좌표 move를 원래 보드 좌표로"""
+    grid: np.ndarray = _transforms(shape)[transform](np.arange(shape[0]*shape[1]).reshape(shape))
+    r, c = divmod(int(grid[move]), shape[1])
+    return r, c
+
+
+def _to_canonical(shape: tuple[int, int], transform: int, move: tuple[int, int]) -> tuple[int, int]:
+    """원래 보드 좌표 move를 정규형 보드 좌표로"""
+    grid: np.ndarray = _transforms(shape)[transform](np.arange(shape[0]*shape[1]).reshape(shape))
+    r, c = np.argwhere(grid == move[0]*shape[1] + move[1])[0]
+    return int(r), int(c)
+
+
+class Reply(NamedTuple):
+    """AI가 고른 수와 그 칸의 moveboard 점수. 점수를 모르면 None"""
+    move: tuple[int, int] | None
+    score: float | None
+
+
+def compute_reply(ai: OmokAi) -> Reply:
+    """ai.choose_move()와 그 칸의 moveboard 점수. scoring 없이 정해진 수면 점수는 None"""
+    move = ai.choose_move()
+    score: float | None = None
+    if move is not None and ai.view_moveboard.any():
+        score = ai.view_moveboard[move].item()
+    return Reply(move, score)
+
+
+class ReplyCache:
+    """(정규형 국면, 둘 돌, rule, AI 설정) -> Reply LRU 캐시.
+    대칭 국면의 동점 칸 중 어느 것을 돌려줄지는 새로 계산한 결과와 다를 수 있음"""
+    def __init__(self, max_entries: int = 1 << 16, path: str | None = None) -> None:
+        """path를 주면 그 SQLite 파일에서 바로 load"""
+        self.max_entries: int = max_entries
+        self.path: str | None = path
+        self.__replies: OrderedDict[bytes, Reply] = OrderedDict()
+        "정규형 좌표로 저장한 Reply. 최근에 쓴 것이 뒤쪽"
+        self.hits: int = 0
+        self.misses: int = 0
+        if path is not None:
+            self.load(path)
+
+    def __len__(self) -> int:
+        return len(self.__replies)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups: int = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @staticmethod
+    def key(
+        board: Board, mystone: Stone, attack: float = 1, defence: float = 1, engine: str = "line"
+    ) -> tuple[bytes, int]:
+        """(캐시 키, 정규형으로 바꾼 대칭 변환 번호)"""
+        packed, transform = canonical(board.code_view())
+        head: bytes = struct.pack(
+            "<HHBBBdd", *board.shape, STONE_CODES[mystone],
+            board.rule.k, board.rule.flags, attack, defence
+        )
+        return head + engine.encode() + b"\0" + packed, transform
+
+    def get(
+        self, board: Board, mystone: Stone, attack: float = 1, defence: float = 1, engine: str = "line"
+    ) -> Reply | None:
+        """저장된 Reply를 board 좌표로 바꿔 반환. 없으면 None"""
+        key, transform = self.key(board, mystone, attack, defence, engine)
+        reply: Reply | None = self.__replies.get(key)
+        if reply is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__replies.move_to_end(key)
+        if reply.move is None:
+            return reply
+        return Reply(_from_canonical(board.shape, transform, reply.move), reply.score)
+
+    def put(
+        self, board: Board, mystone: Stone, reply: Reply,
+        attack: float = 1, defence: float = 1, engine: str = "line"
+    ) -> None:
+        key, transform = self.key(board, mystone, attack, defence, engine)
+        if reply.move is not None:
+            reply = Reply(_to_canonical(board.shape, transform, reply.move), reply.score)
+        self.__store(key, reply)
+
+    def __store(self, key: bytes, reply: Reply) -> None:
+        self.__replies[key] = reply
+        self.__replies.move_to_end(key)
+        while len(self.__replies) > self.max_entries:
+            self.__replies.popitem(last=False)
+
+    def choose_move(
+        self, board: Board, mystone: Stone, attack: float = 1, defence: float = 1, engine: str = "line"
+    ) -> tuple[int, int] | None:
+        """캐시에 있으면 그 수를, 없으면 OmokAi.choose_move로 계산해 저장한 뒤 반환"""
+        reply: Reply | None = self.get(board, mystone, attack, defence, engine)
+        if reply is not None:
+            return reply.move
+        reply = compute_reply(OmokAi(board, mystone, attack, defence, engine))
+        self.put(board, mystone, reply, attack, defence, engine)
+        return reply.move
+
+    def clear(self) -> None:
+        self.__replies.clear()
+        self.hits = self.misses = 0
+
+    def save(self, path: str | None = None) -> None:
+        """SQLite 파일에 LRU 순서대로 덮어써서 저장"""
+        with sqlite3.connect(path or self.path) as db:
+            db.execute("DROP TABLE IF EXISTS replies")
+            db.execute(
+                "CREATE TABLE replies (rank INTEGER PRIMARY KEY, key BLOB, row INTEGER, col INTEGER, score REAL)"
+            )
+            db.executemany(
+                "INSERT INTO replies VALUES (?, ?, ?, ?, ?)",
+                (
+                    (rank, key, *(reply.move or (None, None)), reply.score)
+                    for rank, (key, reply) in enumerate(self.__replies.items())
+                ),
+            )
+        db.close()
+
+    def load(self, path: str | None = None) -> None:
+        """save한 파일의 내용을 LRU 순서를 유지하며 추가. 파일이나 표가 없으면 무시"""
+        path = path or self.path
+        if not os.path.exists(path):
+            return
+        db = sqlite3.connect(path)
+        try:
+            rows = db.execute("SELECT key, row, col, score FROM replies ORDER BY rank").fetchall()
+        except sqlite3.OperationalError:
+            rows = []
+        finally:
+            db.close()
+        for key, row, col, score in rows:
+            move = None if row is None else (row, col)
+            self.__store(key, Reply(move, score))
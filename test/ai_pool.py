@@ -0,0 +1,124 @@
+"""OmokAi 착수 계산을 이벤트 루프 밖 프로세스 풀에서 실행
+
+보드는 Board.to_bytes로 넘기고, 작업마다 공유 메모리의 중단 플래그 한 칸을 빌려주어
+await 중인 작업이 취소되면 워커의 OmokAi.should_stop이 True가 되어 바로 계산을 멈춤
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from ai_cache import Reply, compute_reply
+from board_calculator import Board, OmokAi, OmokAiErrors, Rule, Stone
+
+_stop_flags = None
+"워커 프로세스에서 AiPool의 중단 플래그 배열"
+
+
+def _init_worker(flags) -> None:
+    global _stop_flags
+    _stop_flags = flags
+
+
+def _choose_reply(
+    data: bytes, rule: Rule, mystone: Stone,
+    attack: float, defence: float, engine: str, slot: int
+) -> Reply:
+    """워커에서 실행. 중단되면 Reply(None, None)"""
+    board: Board = Board.from_bytes(data, rule)
+    ai: OmokAi = OmokAi(
+        board, mystone, attack, defence, engine, should_stop=lambda: _stop_flags[slot] != 0
+    )
+    try:
+        return compute_reply(ai)
+    except OmokAiErrors.StoppedError:
+        return Reply(None, None)
+
+
+class AiPool:
+    """choose_move, put_stone을 await할 수 있게 프로세스 풀에서 실행.
+    동시에 max_jobs개까지 실행하고 나머지는 자리가 날 때까지 기다림"""
+    def __init__(self, max_workers: int | None = None, max_jobs: int = 64) -> None:
+        """워커는 spawn으로 만들어 서버의 소켓 등 부모 프로세스 자원을 물려받지 않음"""
+        context = multiprocessing.get_context("spawn")
+        self.__max_jobs: int = max_jobs
+        self.__flags = context.RawArray("b", max_jobs)
+        "작업 칸별 중단 플래그. 워커와 공유"
+        self.__free: list[int] = list(range(max_jobs))
+        self.__slots: asyncio.Semaphore = asyncio.Semaphore(max_jobs)
+        self.__executor: ProcessPoolExecutor = ProcessPoolExecutor(
+            max_workers or os.cpu_count(), context,
+            initializer=_init_worker, initargs=(self.__flags,)
+        )
+
+    @property
+    def active(self) -> int:
+        """워커가 아직 붙잡고 있는 작업 수. 취소된 작업도 워커가 멈출 때까지 포함"""
+        return self.__max_jobs - len(self.__free)
+
+    async def choose_move(
+        self, board: Board, mystone: Stone,
+        attack: float = 1, defence: float = 1, engine: str = "line"
+    ) -> tuple[int, int] | None:
+        """OmokAi(board, mystone, ...).choose_move()를 워커에서 계산.
+        await 중 취소되면 워커 계산도 중단시키고 CancelledError를 그대로 전달"""
+        return (await self.choose_reply(board, mystone, attack, defence, engine)).move
+
+    async def choose_reply(
+        self, board: Board, mystone: Stone,
+        attack: float = 1, defence: float = 1, engine: str = "line"
+    ) -> Reply:
+        """choose_move와 같지만 그 수의 moveboard 점수를 함께 반환"""
+        await self.__slots.acquire()
+        slot: int = self.__free.pop()
+        self.__flags[slot] = 0
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        try:
+            future: Future = self.__executor.submit(
+                _choose_reply, board.to_bytes(), board.rule, mystone, attack, defence, engine, slot
+            )
+        except BaseException:
+            self.__release(slot)
+            raise
+        future.add_done_callback(lambda _: self.__release_threadsafe(loop, slot))
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            self.__flags[slot] = 1
+            raise
+
+    async def put_stone(
+        self, board: Board, mystone: Stone,
+        attack: float = 1, defence: float = 1, engine: str = "line"
+    ) -> tuple[int, int]:
+        """choose_move 결과를 board에 착수하고 위치를 반환.
+        둘 곳이 없거나 계산 중 board가 바뀌었으면 NoStoneChangedError"""
+        version: int = board.version
+        idx = await self.choose_move(board, mystone, attack, defence, engine)
+        if idx is None or board.version != version:
+            raise OmokAiErrors.NoStoneChangedError
+        board[idx] = mystone
+        return idx
+
+    def __release(self, slot: int) -> None:
+        self.__free.append(slot)
+        self.__slots.release()
+
+    def __release_threadsafe(self, loop: asyncio.AbstractEventLoop, slot: int) -> None:
+        """워커 작업이 끝나면 풀 관리 스레드에서 호출됨"""
+        try:
+            loop.call_soon_threadsafe(self.__release, slot)
+        except RuntimeError:
+            pass
+
+    def close(self) -> None:
+        """진행 중인 계산을 모두 중단시키고 풀을 닫음"""
+        for slot in range(self.__max_jobs):
+            self.__flags[slot] = 1
+        self.__executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "AiPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,160 @@
+"""board_calculator 성능 측정 스크립트
+
+Shell에
+python test/benchmark.py
+입력
+"""
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+import numpy as np
+from board_calculator import Board, BoardErrors, OmokAi, Stone
+from session_store import SessionStore, dump_board
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main
+
+
+def _play_random(board: Board, n_moves: int, seed: int = 0) -> None:
+    """보드 크기에 상관없이 재현 가능한 무작위 수순으로 n_moves만큼 착수"""
+    rng = np.random.default_rng(seed)
+    stones = (Stone.BLACK, Stone.WHITE)
+    cells = rng.permutation(board.shape[0] * board.shape[1])
+    for i, cell in enumerate(cells[:n_moves]):
+        try:
+            board[divmod(int(cell), board.shape[1])] = stones[i % 2]
+        except BoardErrors.WinError:
+            board.undo()
+
+
+def bench_board_sizes(shapes=((9, 9), (15, 15), (19, 19), (15, 25)), number: int = 20) -> None:
+    """보드 크기별 Board 생성 비용, 착수, 엔진별 OmokAi.scoring과 choose_move 지연시간"""
+    print(f"{'shape':>10} {'new Board':>12} {'place+undo':>12} "
+          f"{'line score':>12} {'conv score':>12} {'choose_move':>12} {'to_html':>12}")
+    for shape in shapes:
+        Board(shape)
+        new_board = timeit.timeit(lambda: Board(shape), number=number) / number
+
+        board = Board(shape)
+        _play_random(board, shape[0] * shape[1] // 5)
+        free = tuple(int(v) for v in np.argwhere(board.view() == Stone.EMPTY)[0])
+        stone = Stone.WHITE if board.last_stone == Stone.BLACK else Stone.BLACK
+
+        def place_undo():
+            try:
+                board[free] = stone
+            except BoardErrors.WinError:
+                pass
+            board.undo()
+        place = timeit.timeit(place_undo, number=number) / number
+
+        scores = []
+        for engine in OmokAi.ENGINES:
+            ai = OmokAi(board, stone, engine=engine)
+            ai.scoring()
+            scores.append(timeit.timeit(ai.scoring, number=number) / number)
+        move = timeit.timeit(OmokAi(board, stone).choose_move, number=number) / number
+        html = timeit.timeit(board.to_html, number=number) / number
+
+        print(f"{str(shape):>10} "
+              f"{new_board*1e6:>10.1f}us {place*1e6:>10.1f}us "
+              f"{scores[0]*1e3:>10.3f}ms {scores[1]*1e3:>10.3f}ms {move*1e3:>10.3f}ms "
+              f"{html*1e6:>10.1f}us")
+
+
+def bench_choose_moves(n_boards: int = 32, number: int = 5) -> None:
+    """같은 시기에 들어온 n_boards개 착수 요청을 하나씩 계산할 때와 choose_moves로 묶을 때"""
+    boards = []
+    for seed in range(n_boards):
+        board = Board()
+        _play_random(board, 20, seed)
+        boards.append(board)
+    ais = [OmokAi(board, Stone.WHITE if board.last_stone == Stone.BLACK else Stone.BLACK)
+           for board in boards]
+    one = timeit.timeit(lambda: [ai.choose_move() for ai in ais], number=number) / number
+    batch = timeit.timeit(lambda: OmokAi.choose_moves(ais), number=number) / number
+    print(f"\n{n_boards} boards  choose_move x{n_boards}: {one*1e3:.2f}ms "
+          f"({n_boards/one:.0f} moves/s)  choose_moves: {batch*1e3:.2f}ms ({n_boards/batch:.0f} moves/s)")
+
+
+def _footprint(make, count: int) -> float:
+    """make()로 만든 객체 count개를 살려 둔 채 늘어난 메모리를 객체 하나당 바이트로"""
+    make()
+    gc.collect()
+    tracemalloc.start()
+    before: int = tracemalloc.get_traced_memory()[0]
+    objects = [make() for _ in range(count)]
+    after: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def bench_footprint(count: int = 1000, n_moves: int = 20) -> None:
+    """열려 있는 게임 하나가 차지하는 메모리. 빈 Board, n_moves수 둔 Board,
+    그 Board로 choose_move를 마친 OmokAi, 디스크로 내보낸 세션 하나의 크기"""
+    def played() -> Board:
+        board = Board()
+        _play_random(board, n_moves)
+        return board
+
+    board = played()
+    stone = Stone.WHITE if board.last_stone == Stone.BLACK else Stone.BLACK
+
+    def thought() -> OmokAi:
+        ai = OmokAi(board, stone)
+        ai.choose_move()
+        return ai
+
+    print(f"\nper object  Board(): {_footprint(Board, count):.0f}B  "
+          f"Board+{n_moves} moves: {_footprint(played, count):.0f}B  "
+          f"OmokAi after choose_move: {_footprint(thought, count):.0f}B  "
+          f"spilled session: {len(dump_board(board))}B")
+
+
+def bench_idle_connections(n_games: int = 1000) -> None:
+    """게임마다 WebSocket 하나가 접속만 해 둔 n_games개 게임의 연결 하나당 메모리.
+    같은 프로세스의 클라이언트 쪽 스트림까지 포함한 값이므로 서버 쪽 상한"""
+    async def run() -> float:
+        with tempfile.TemporaryDirectory() as directory:
+            server = main.GameServer(main.BatchQueue(), SessionStore(directory, n_games))
+            listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+            port: int = listener.sockets[0].getsockname()[1]
+            game_ids: list[str] = [server.new_game() for _ in range(n_games)]
+            gc.collect()
+            tracemalloc.start()
+            before: int = tracemalloc.get_traced_memory()[0]
+            clients: list = []
+            for game_id in game_ids:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(
+                    f"GET /ws/{game_id} HTTP/1.1\r\nUpgrade: websocket\r\n"
+                    "Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n\r\n".encode()
+                )
+                await reader.readuntil(b"\r\n\r\n")
+                clients.append((reader, writer))
+            while len(server.games) < n_games:
+                await asyncio.sleep(0.01)
+            after: int = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            for _, writer in clients:
+                writer.close()
+            while server.games:
+                await asyncio.sleep(0.01)
+            listener.close()
+            await listener.wait_closed()
+            return (after - before) / n_games
+
+    print(f"\n{n_games} idle connections  per connected game: {asyncio.run(run()):.0f}B")
+
+
+if __name__ == "__main__":
+    bench_board_sizes()
+    bench_choose_moves()
+    bench_footprint()
+    bench_idle_connections()
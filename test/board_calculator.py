@@ -1,4 +1,7 @@
+import struct
 from enum import Enum, auto
+from functools import lru_cache
+from typing import NamedTuple
 
 import numpy as np
 from numpy import ndarray
@@ -42,6 +45,36 @@ class BoardErrors:
             error: str = "게임 첫 수는 흑돌이어야 함"
             return super().__str__() + error
 
+    class BoardShapeError(Exception):
+        def __str__(self) -> str:
+            error: str = "보드 크기는 양의 정수 두 개여야 함"
+            return super().__str__() + error
+
+    class RuleError(Exception):
+        def __str__(self) -> str:
+            error: str = "승리에 필요한 돌 수 k는 1 이상이어야 함"
+            return super().__str__() + error
+
+    class ForbiddenMoveError(Exception):
+        def __str__(self) -> str:
+            error: str = "흑은 금수 자리(삼삼, 사사, 장목)에 돌을 놓을 수 없음"
+            return super().__str__() + error
+
+    class NoMoveToUndoError(Exception):
+        def __str__(self) -> str:
+            error: str = "무를 수 있는 착수 기록이 없음"
+            return super().__str__() + error
+
+    class BoardBytesError(Exception):
+        def __str__(self) -> str:
+            error: str = "Board.to_bytes 형식이 아닌 데이터"
+            return super().__str__() + error
+
+    class BytesLimitError(Exception):
+        def __str__(self) -> str:
+            error: str = "Board.to_bytes는 한 변이 255칸 이하, move_count가 65535 이하인 보드만 담을 수 있음"
+            return super().__str__() + error
+
 
 class Stone(Enum):
     """오목판에 놓이는 돌의 종류"""
@@ -53,29 +86,806 @@ class Stone(Enum):
     "빈칸"
 
 
+STONE_CODES: dict[Stone, int] = {Stone.EMPTY: 0, Stone.BLACK: 1, Stone.WHITE: 2}
+"정수 배열로 보드를 다룰 때 쓰는 돌별 코드"
+
+
+_CODE_STONES: tuple[Stone, ...] = (Stone.EMPTY, Stone.BLACK, Stone.WHITE)
+"STONE_CODES의 역변환"
+
+
+def to_codes(arr: np.ndarray) -> np.ndarray:
+    """Stone ndarray를 STONE_CODES에 따른 int8 ndarray로 변환.
+    이미 정수 코드인 배열은 그대로 int8로 반환"""
+    arr = np.asarray(arr)
+    if arr.dtype != object:
+        return arr.astype(np.int8, copy=False)
+    codes: np.ndarray = np.zeros(arr.shape, dtype=np.int8)
+    codes[arr == Stone.BLACK] = STONE_CODES[Stone.BLACK]
+    codes[arr == Stone.WHITE] = STONE_CODES[Stone.WHITE]
+    return codes
+
+
+def pack_codes(codes: np.ndarray) -> np.ndarray:
+    """(..., H, W) 정수 코드 배열을 칸당 2비트로 묶은 (..., ceil(H*W/4)) uint8 배열로 변환.
+    칸 j는 j//4번째 바이트의 2*(j%4)번째 비트부터 담김"""
+    codes = np.asarray(codes, dtype=np.uint8)
+    flat: np.ndarray = codes.reshape(codes.shape[:-2] + (-1,))
+    pad: int = -flat.shape[-1] % 4
+    if pad:
+        flat = np.concatenate([flat, np.zeros(flat.shape[:-1] + (pad,), np.uint8)], axis=-1)
+    quads: np.ndarray = flat.reshape(flat.shape[:-1] + (-1, 4))
+    return quads[..., 0] | quads[..., 1] << 2 | quads[..., 2] << 4 | quads[..., 3] << 6
+
+
+def unpack_codes(packed: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+    """pack_codes의 역변환. (..., ceil(H*W/4)) uint8 배열을 (..., H, W) int8 코드 배열로 반환"""
+    packed = np.asarray(packed, dtype=np.uint8)
+    quads: np.ndarray = (packed[..., None] >> np.array([0, 2, 4, 6], np.uint8)) & 3
+    flat: np.ndarray = quads.reshape(packed.shape[:-1] + (-1,))[..., :shape[0]*shape[1]]
+    return flat.reshape(packed.shape[:-1] + tuple(shape)).astype(np.int8)
+
+
+class Rule(NamedTuple):
+    """승리 조건과 보드 크기를 묶은 게임 규칙. 같은 Rule은 판정 표를 공유함"""
+    k: int = 5
+    "승리에 필요한 연속된 돌 수"
+    exact: bool = False
+    "True면 정확히 k개 연속일 때만 승리하고 k개를 넘는 장목은 승리가 아님"
+    shape: tuple[int, int] = (15, 15)
+    "보드 크기"
+    forbid_double_three: bool = False
+    "흑의 삼삼 금지"
+    forbid_double_four: bool = False
+    "흑의 사사 금지"
+    forbid_overline: bool = False
+    "흑의 장목 금지"
+
+    def wins(self, stack: int) -> bool:
+        """같은 돌 stack개 연속이 승리인지"""
+        return stack == self.k if self.exact else stack >= self.k
+
+    @property
+    def has_forbidden(self) -> bool:
+        """흑 금수 규칙이 하나라도 있는지"""
+        return self.forbid_double_three or self.forbid_double_four or self.forbid_overline
+
+    @property
+    def flags(self) -> int:
+        """exact와 금수 규칙들을 비트로 묶은 정수. from_flags로 되돌릴 수 있음"""
+        return (
+            self.exact | self.forbid_double_three << 1
+            | self.forbid_double_four << 2 | self.forbid_overline << 3
+        )
+
+    @classmethod
+    def from_flags(cls, k: int, flags: int, shape: tuple[int, int]) -> "Rule":
+        return cls(
+            k, bool(flags & 1), tuple(shape),
+            bool(flags & 2), bool(flags & 4), bool(flags & 8)
+        )
+
+
+KOREAN_RULE: Rule = Rule(forbid_double_three=True)
+"흑 삼삼만 금지하는 한국식 오목 규칙"
+RENJU_RULE: Rule = Rule(forbid_double_three=True, forbid_double_four=True, forbid_overline=True)
+"흑 삼삼, 사사, 장목을 금지하는 렌주 규칙"
+
+
+def _resolve_rule(shape: tuple[int, int] | None, rule: Rule | None) -> Rule:
+    """shape, rule 인자를 검사해 하나의 Rule로 합침"""
+    if rule is None:
+        rule = Rule() if shape is None else Rule(shape=shape)
+    elif shape is not None and tuple(shape) != tuple(rule.shape):
+        raise BoardErrors.BoardShapeError
+    shape = rule.shape
+    if len(shape) != 2 or any(not isinstance(n, (int, np.integer)) or n < 1 for n in shape):
+        raise BoardErrors.BoardShapeError
+    if rule.k < 1:
+        raise BoardErrors.RuleError
+    return rule._replace(shape=(int(shape[0]), int(shape[1])), k=int(rule.k), exact=bool(rule.exact))
+
+
+DIRECTIONS: tuple[tuple[int, int], ...] = ((0, 1), (1, 0), (1, 1), (1, -1))
+"가로, 세로, 양대각선, 음대각선 방향"
+
+
+class CandidateIndex:
+    """돌 주변 radius칸 이내의 빈칸(착수 후보)을 유지.
+    착수/무르기마다 해당 칸 주변 (2*radius+1)^2칸만 갱신함"""
+    __slots__ = ("__radius", "__near", "__occupied", "__mask")
+
+    def __init__(self, shape: tuple[int, int], radius: int = 2) -> None:
+        self.__radius: int = radius
+        self.__near: np.ndarray = np.zeros(shape, dtype=np.int16)
+        "각 칸에서 radius칸 이내에 있는 돌의 개수"
+        self.__occupied: np.ndarray = np.zeros(shape, dtype=bool)
+        self.__mask: np.ndarray = np.zeros(shape, dtype=bool)
+
+    @property
+    def radius(self):
+        return self.__radius
+
+    @property
+    def mask(self) -> np.ndarray:
+        """착수 후보 칸이 True인 읽기 전용 bool ndarray"""
+        view = self.__mask.view()
+        view.flags.writeable = False
+        return view
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.__mask))
+
+    def indices(self) -> np.ndarray:
+        """착수 후보 칸의 (k, 2) 좌표 배열"""
+        return np.argwhere(self.__mask)
+
+    def flat_indices(self) -> np.ndarray:
+        """착수 후보 칸의 r * W + c 인덱스 배열"""
+        return np.flatnonzero(self.__mask)
+
+    def __window(self, idx: tuple[int, int]) -> tuple[slice, slice]:
+        r, c = idx
+        rad: int = self.__radius
+        return slice(max(r - rad, 0), r + rad + 1), slice(max(c - rad, 0), c + rad + 1)
+
+    def place(self, idx: tuple[int, int]) -> None:
+        """idx에 돌이 놓였을 때 갱신"""
+        window = self.__window(idx)
+        self.__near[window] += 1
+        self.__occupied[idx] = True
+        self.__mask[window] = (self.__near[window] > 0) & ~self.__occupied[window]
+
+    def remove(self, idx: tuple[int, int]) -> None:
+        """idx의 돌이 치워졌을 때 갱신"""
+        window = self.__window(idx)
+        self.__near[window] -= 1
+        self.__occupied[idx] = False
+        self.__mask[window] = (self.__near[window] > 0) & ~self.__occupied[window]
+
+    def rebuild(self, occupied: np.ndarray) -> None:
+        """돌이 있는 칸이 True인 occupied로 전체를 다시 계산"""
+        rad: int = self.__radius
+        size: int = 2*rad + 1
+        padded: np.ndarray = np.pad(occupied.astype(np.int16), rad)
+        self.__near[:] = np.lib.stride_tricks.sliding_window_view(
+            padded, (size, size)
+        ).sum(axis=(-2, -1))
+        self.__occupied[:] = occupied
+        self.__mask[:] = (self.__near > 0) & ~self.__occupied
+
+
+@lru_cache(maxsize=None)
+def _line_cells(shape: tuple[int, int]) -> tuple[np.ndarray, ...]:
+    """가로, 세로, 양대각선, 음대각선의 모든 줄을 r * W + c 평탄화 인덱스 배열로 미리 계산"""
+    h, w = shape
+    grid: np.ndarray = np.arange(h*w).reshape(h, w)
+    flipped: np.ndarray = np.fliplr(grid)
+    lines: list[np.ndarray] = [grid[i, :] for i in range(h)]
+    lines += [grid[:, i] for i in range(w)]
+    lines += [grid.diagonal(i) for i in range(w)]
+    lines += [grid.diagonal(-i) for i in range(1, h)]
+    lines += [flipped.diagonal(i) for i in range(w)]
+    lines += [flipped.diagonal(-i) for i in range(1, h)]
+    return tuple(np.ascontiguousarray(line) for line in lines)
+
+
+@lru_cache(maxsize=None)
+def _cell_lines(shape: tuple[int, int]) -> tuple[tuple[tuple[int, int], ...], ...]:
+    """각 칸(평탄화 인덱스)이 속한 네 줄의 (_line_cells 번호, 줄 안에서의 위치)"""
+    cell_lines: list[list[tuple[int, int]]] = [[] for _ in range(shape[0]*shape[1])]
+    for line_id, cells in enumerate(_line_cells(shape)):
+        for pos, cell in enumerate(cells.tolist()):
+            cell_lines[cell].append((line_id, pos))
+    return tuple(tuple(lines) for lines in cell_lines)
+
+
+class _WinChecker:
+    """Rule에 맞춰 줄마다 미리 계산한 k목 패턴 표로 Board.line_codes에서 승리를 찾음"""
+    def __init__(self, rule: Rule) -> None:
+        k: int = rule.k
+        full: int = sum(3 << 2*i for i in range(k))
+        self.__at: dict[int, tuple] = {}
+        "돌 코드 -> 줄 번호 -> 줄 안 위치 -> 그 위치를 지나는 k칸 패턴들"
+        self.__lines: dict[int, tuple] = {}
+        "돌 코드 -> 줄 번호 -> 줄 안의 모든 k칸 패턴"
+        for code in (STONE_CODES[Stone.BLACK], STONE_CODES[Stone.WHITE]):
+            run: int = sum(code << 2*i for i in range(k))
+            at_lines: list[tuple] = []
+            all_lines: list[tuple] = []
+            for cells in _line_cells(rule.shape):
+                size: int = cells.size
+                patterns: list[tuple[int, ...]] = []
+                for s in range(size - k + 1):
+                    pattern: tuple[int, ...] = (full << 2*s, run << 2*s)
+                    if rule.exact:
+                        before = (3 << 2*(s - 1), code << 2*(s - 1)) if s > 0 else (0, 1)
+                        after = (3 << 2*(s + k), code << 2*(s + k)) if s + k < size else (0, 1)
+                        pattern += before + after
+                    patterns.append(pattern)
+                all_lines.append(tuple(patterns))
+                at_lines.append(tuple(
+                    tuple(patterns[max(pos - k + 1, 0):pos + 1]) for pos in range(size)
+                ))
+            self.__at[code] = tuple(at_lines)
+            self.__lines[code] = tuple(all_lines)
+        self.at = self.__at_exact if rule.exact else self.__at_any
+        """at(line_codes, cell_lines, code): 방금 code 돌을 둔 칸의 cell_lines 중 승리한 줄이 있는지"""
+        self.__match = self.__match_exact if rule.exact else self.__match_any
+
+    def __at_any(self, line_codes, cell_lines, code: int) -> bool:
+        table = self.__at[code]
+        for line_id, pos in cell_lines:
+            line: int = line_codes[line_id]
+            for mask, run in table[line_id][pos]:
+                if line & mask == run:
+                    return True
+        return False
+
+    def __at_exact(self, line_codes, cell_lines, code: int) -> bool:
+        table = self.__at[code]
+        for line_id, pos in cell_lines:
+            if self.__match_exact(line_codes[line_id], table[line_id][pos]):
+                return True
+        return False
+
+    @staticmethod
+    def __match_any(line: int, patterns) -> bool:
+        for mask, run in patterns:
+            if line & mask == run:
+                return True
+        return False
+
+    @staticmethod
+    def __match_exact(line: int, patterns) -> bool:
+        for mask, run, before_mask, before, after_mask, after in patterns:
+            if line & mask == run and line & before_mask != before and line & after_mask != after:
+                return True
+        return False
+
+    def any_line(self, line_codes) -> bool:
+        """보드 전체 줄 중 어느 돌이든 승리한 줄이 있는지"""
+        for lines in self.__lines.values():
+            for line, patterns in zip(line_codes, lines):
+                if line and self.__match(line, patterns):
+                    return True
+        return False
+
+
+@lru_cache(maxsize=None)
+def _win_checker(rule: Rule) -> _WinChecker:
+    """Rule별 _WinChecker를 한번만 만들어 공유"""
+    return _WinChecker(rule)
+
+
+class _LinePattern(NamedTuple):
+    """빈칸 하나에 흑을 놓았을 때 한 줄에서 생기는 모양"""
+    five: bool
+    "정확히 k개 연속"
+    overline: bool
+    "k개를 넘는 연속"
+    fours: int
+    "한 수만 더 두면 정확히 k개가 되는 사(四)의 개수"
+    three_points: tuple[int, ...]
+    "이 칸 기준 상대 위치 중 두면 열린 사(양쪽이 모두 오목 자리인 四)가 되는 빈칸"
+
+
+def _run_around(cells: list[int], i: int) -> tuple[int, int]:
+    """cells[i]를 포함하는 흑 연속 구간의 [시작, 끝] 인덱스"""
+    start, end = i, i
+    while start > 0 and cells[start - 1] == 1:
+        start -= 1
+    while end < len(cells) - 1 and cells[end + 1] == 1:
+        end += 1
+    return start, end
+
+
+@lru_cache(maxsize=1 << 16)
+def _black_line_pattern(key: int, k: int) -> _LinePattern:
+    """가운데가 빈칸인 2k+1칸 줄 조각(칸마다 2비트, 보드 밖은 3)에서
+    가운데에 흑을 놓을 때의 모양. 같은 조각은 어느 보드, 어느 줄이든 결과를 공유함"""
+    size: int = 2*k + 1
+    cells: list[int] = [(key >> 2*j) & 3 for j in range(size)]
+    cells[k] = 1
+    start, end = _run_around(cells, k)
+    stack: int = end - start + 1
+    if stack >= k:
+        return _LinePattern(stack == k, stack > k, 0, ())
+
+    def makes_five(e: int) -> bool:
+        cells[e] = 1
+        s, t = _run_around(cells, k)
+        cells[e] = 0
+        return t - s + 1 == k
+
+    empties: list[int] = [e for e in range(size) if cells[e] == 0]
+    completions: list[int] = [e for e in empties if makes_five(e)]
+    if len(completions) == 2 and stack == k - 1 and completions == [start - 1, end + 1]:
+        fours: int = 1
+    else:
+        fours = min(len(completions), 2)
+    if fours:
+        return _LinePattern(False, False, fours, ())
+
+    three_points: list[int] = []
+    for e in empties:
+        cells[e] = 1
+        s, t = _run_around(cells, k)
+        if t - s + 1 == k - 1 and s <= e <= t and s >= 1 and t <= size - 2 \
+                and cells[s - 1] == 0 and cells[t + 1] == 0 \
+                and (s < 2 or cells[s - 2] != 1) and (t > size - 3 or cells[t + 2] != 1):
+            three_points.append(e - k)
+        cells[e] = 0
+    return _LinePattern(False, False, 0, tuple(three_points))
+
+
+class _ForbiddenDetector:
+    """Board.line_codes에서 칸마다 네 줄의 조각을 잘라 _black_line_pattern으로 흑 금수를 판정.
+    삼삼은 사가 되는 자리 자체가 금수가 아닌 진짜 삼만 세며, 이를 위해 재귀적으로 확인함"""
+    MAX_DEPTH: int = 3
+    "진짜 삼 확인 재귀 깊이. 넘어서면 진짜 삼으로 간주"
+
+    def __init__(self, rule: Rule) -> None:
+        self.__rule: Rule = rule
+        self.__width: int = rule.shape[1]
+        k: int = rule.k
+        self.__full: int = (1 << 2*(2*k + 1)) - 1
+        self.__key_table: list[tuple[tuple[int, int, int], ...]] = []
+        "줄 번호 -> 줄 안 위치 -> (오른쪽 shift, 왼쪽 shift, 보드 밖 칸을 3으로 채우는 mask)"
+        for cells in _line_cells(rule.shape):
+            size: int = cells.size
+            entries: list[tuple[int, int, int]] = []
+            for pos in range(size):
+                lo: int = pos - k
+                wall: int = 0
+                for i in range(2*k + 1):
+                    if not 0 <= lo + i < size:
+                        wall |= 3 << 2*i
+                entries.append((2*max(lo, 0), 2*max(-lo, 0), wall))
+            self.__key_table.append(tuple(entries))
+
+    def __patterns(self, line_codes, cell: int) -> list[_LinePattern]:
+        patterns: list[_LinePattern] = []
+        for line_id, pos in _cell_lines(self.__rule.shape)[cell]:
+            right, left, wall = self.__key_table[line_id][pos]
+            key: int = ((line_codes[line_id] >> right << left) & self.__full) | wall
+            patterns.append(_black_line_pattern(key, self.__rule.k))
+        return patterns
+
+    def is_forbidden(self, line_codes: list[int], idx: tuple[int, int], depth: int = 0) -> bool:
+        """빈칸 idx에 흑을 두는 것이 금수인지. line_codes는 확인 중 잠시 바뀌었다가 복구됨"""
+        rule: Rule = self.__rule
+        cell: int = idx[0]*self.__width + idx[1]
+        patterns: list[_LinePattern] = self.__patterns(line_codes, cell)
+        if any(p.five for p in patterns):
+            return False
+        if any(p.overline for p in patterns):
+            if rule.forbid_overline:
+                return True
+            if not rule.exact:
+                return False
+        if rule.forbid_double_four and sum(p.fours for p in patterns) >= 2:
+            return True
+        if not rule.forbid_double_three:
+            return False
+        threes = [(d, p.three_points) for d, p in enumerate(patterns) if p.three_points]
+        if len(threes) < 2:
+            return False
+        if depth >= self.MAX_DEPTH:
+            return True
+
+        cell_lines = _cell_lines(rule.shape)[cell]
+        black: int = STONE_CODES[Stone.BLACK]
+        for line_id, pos in cell_lines:
+            line_codes[line_id] |= black << 2*pos
+        real: int = 0
+        for d, points in threes:
+            dr, dc = DIRECTIONS[d]
+            for off in points:
+                if not self.is_forbidden(line_codes, (idx[0] + dr*off, idx[1] + dc*off), depth + 1):
+                    real += 1
+                    break
+        for line_id, pos in cell_lines:
+            line_codes[line_id] &= ~(3 << 2*pos)
+        return real >= 2
+
+
+@lru_cache(maxsize=None)
+def _forbidden_detector(rule: Rule) -> _ForbiddenDetector:
+    """Rule별 _ForbiddenDetector를 한번만 만들어 공유"""
+    return _ForbiddenDetector(rule)
+
+
+def _codes_line_codes(codes: np.ndarray) -> list[int]:
+    """STONE_CODES 정수 보드로 Board.line_codes와 같은 줄 정수 코드 목록을 만듦"""
+    line_codes: list[int] = [0] * len(_line_cells(codes.shape))
+    cell_lines = _cell_lines(codes.shape)
+    flat: np.ndarray = codes.reshape(-1)
+    for cell in np.flatnonzero(flat).tolist():
+        code: int = int(flat[cell])
+        for line_id, pos in cell_lines[cell]:
+            line_codes[line_id] |= code << 2*pos
+    return line_codes
+
+
+def _forbidden_cells(
+    codes: np.ndarray, line_codes: list[int], rule: Rule, should_stop=None
+) -> np.ndarray:
+    """흑 금수 자리인 빈칸이 True인 bool ndarray. 흑돌에서 k-1칸 이내인 빈칸만 확인함.
+    칸마다 should_stop()을 확인해서 True면 OmokAiErrors.StoppedError로 중단"""
+    mask: np.ndarray = np.zeros(codes.shape, dtype=bool)
+    if not rule.has_forbidden:
+        return mask
+    rad: int = rule.k - 1
+    black: np.ndarray = np.pad(codes == STONE_CODES[Stone.BLACK], rad)
+    near: np.ndarray = np.lib.stride_tricks.sliding_window_view(
+        black, (2*rad + 1, 2*rad + 1)
+    ).any(axis=(-2, -1))
+    detector: _ForbiddenDetector = _forbidden_detector(rule)
+    for r, c in np.argwhere(near & (codes == STONE_CODES[Stone.EMPTY])).tolist():
+        if should_stop is not None and should_stop():
+            raise OmokAiErrors.StoppedError
+        mask[r, c] = detector.is_forbidden(line_codes, (r, c))
+    return mask
+
+
+@lru_cache(maxsize=None)
+def _zobrist_keys(shape: tuple[int, int]) -> tuple[tuple[int, ...], ...]:
+    """STONE_CODES, 평탄화 인덱스별 64비트 Zobrist 키.
+    프로세스가 달라도 같은 해시가 나오도록 고정된 seed로 생성"""
+    rng = np.random.default_rng(shape[0] * 1_000_003 + shape[1])
+    keys: np.ndarray = rng.integers(0, 2**63, size=(3, shape[0]*shape[1]), dtype=np.int64)
+    keys[STONE_CODES[Stone.EMPTY]] = 0
+    return tuple(tuple(row) for row in keys.tolist())
+
+
+@lru_cache(maxsize=None)
+def _window_tables(shape: tuple[int, int], length: int) -> tuple[np.ndarray, tuple[np.ndarray, ...]]:
+    """보드 안에 들어가는 길이 length의 모든 가로, 세로, 대각선 구간(window)과
+    각 칸이 속한 window 목록을 r * W + c 평탄화 인덱스로 미리 계산"""
+    h, w = shape
+    ks = np.arange(length)
+    windows: list[np.ndarray] = []
+    for dr, dc in DIRECTIONS:
+        rows = np.arange(h - (length - 1)*dr) if dr else np.arange(h)
+        cols = np.arange(length - 1, w) if dc < 0 else np.arange(w - (length - 1)*dc)
+        r0, c0 = np.meshgrid(rows, cols, indexing="ij")
+        r = r0.reshape(-1, 1) + dr*ks
+        c = c0.reshape(-1, 1) + dc*ks
+        windows.append(r*w + c)
+    cells: np.ndarray = np.concatenate(windows)
+    cell_windows: list[list[int]] = [[] for _ in range(h*w)]
+    for window_id, window in enumerate(cells.tolist()):
+        for cell in window:
+            cell_windows[cell].append(window_id)
+    return cells, tuple(np.array(ids, dtype=np.intp) for ids in cell_windows)
+
+
+class WindowCounter:
+    """길이 5의 모든 window마다 흑돌, 백돌 개수를 유지하는 평가 구조.
+    착수/무르기마다 그 칸을 지나는 최대 20개 window만 갱신함"""
+    WIN_WEIGHT: int = 100000
+    "window를 모두 채웠을 때의 점수"
+    __slots__ = ("__shape", "__windows", "__cell_windows", "weights", "__counts", "__occupied", "__score")
+
+    def __init__(self, shape: tuple[int, int], length: int = 5) -> None:
+        self.__shape: tuple[int, int] = shape
+        self.__windows, self.__cell_windows = _window_tables(shape, length)
+        self.weights: np.ndarray = np.array(
+            [0] + [8**(i - 1) for i in range(1, length)] + [self.WIN_WEIGHT * 8**max(length - 5, 0)]
+        )
+        "상대 돌이 없는 window에서 내 돌 개수별 점수. 길이 5면 [0, 1, 8, 64, 512, 100000]"
+        self.__counts: np.ndarray = np.zeros([3, len(self.__windows)], dtype=np.int8)
+        "STONE_CODES로 인덱싱한 window별 돌 개수. 0번(빈칸)은 사용하지 않음"
+        self.__occupied: np.ndarray = np.zeros(shape[0]*shape[1], dtype=bool)
+        self.__score: int = 0
+        "흑 기준 평가 점수"
+
+    @property
+    def windows(self) -> np.ndarray:
+        """(window 개수, length) 평탄화 인덱스 배열"""
+        return self.__windows
+
+    def __len__(self) -> int:
+        return len(self.__windows)
+
+    def counts(self, stone: Stone) -> np.ndarray:
+        """window별 stone 개수"""
+        return self.__counts[STONE_CODES[stone]].copy()
+
+    def __values(self, ids) -> int:
+        black: np.ndarray = self.__counts[1, ids]
+        white: np.ndarray = self.__counts[2, ids]
+        return int(
+            self.weights[black][white == 0].sum() - self.weights[white][black == 0].sum()
+        )
+
+    def place(self, idx: tuple[int, int], stone: Stone) -> None:
+        """idx에 stone이 놓였을 때 갱신"""
+        cell: int = idx[0]*self.__shape[1] + idx[1]
+        ids: np.ndarray = self.__cell_windows[cell]
+        before: int = self.__values(ids)
+        self.__counts[STONE_CODES[stone], ids] += 1
+        self.__occupied[cell] = True
+        self.__score += self.__values(ids) - before
+
+    def remove(self, idx: tuple[int, int], stone: Stone) -> None:
+        """idx의 stone이 치워졌을 때 갱신"""
+        cell: int = idx[0]*self.__shape[1] + idx[1]
+        ids: np.ndarray = self.__cell_windows[cell]
+        before: int = self.__values(ids)
+        self.__counts[STONE_CODES[stone], ids] -= 1
+        self.__occupied[cell] = False
+        self.__score += self.__values(ids) - before
+
+    def rebuild(self, codes: np.ndarray) -> None:
+        """STONE_CODES 정수 보드로 전체를 다시 계산"""
+        window_codes: np.ndarray = codes.ravel()[self.__windows]
+        for code in (1, 2):
+            self.__counts[code] = (window_codes == code).sum(axis=1)
+        self.__occupied[:] = codes.ravel() != 0
+        self.__score = self.__values(slice(None))
+
+    def evaluate(self, stone: Stone) -> int:
+        """stone 기준 평가 점수. 상대 돌이 없는 window마다 weights[내 돌 개수]를 더하고
+        상대도 같은 방식으로 빼서 계산"""
+        return self.__score if stone == Stone.BLACK else -self.__score
+
+    def has_five(self, stone: Stone) -> bool:
+        """stone이 5칸을 모두 채운 window가 있는지"""
+        return bool((self.__counts[STONE_CODES[stone]] == self.__windows.shape[1]).any())
+
+    def threats(self, stone: Stone) -> np.ndarray:
+        """한 수만 더 두면 stone이 window를 채우는 (내 돌 4개, 상대 돌 0개) 빈칸의 (k, 2) 좌표.
+        window 밖 돌은 보지 않으므로 exact 규칙의 장목 자리도 포함됨. Board.winning_moves 참고"""
+        own: int = STONE_CODES[stone]
+        length: int = self.__windows.shape[1]
+        hot: np.ndarray = (self.__counts[own] == length - 1) & (self.__counts[3 - own] == 0)
+        cells: np.ndarray = self.__windows[hot].ravel()
+        cells = np.unique(cells[~self.__occupied[cells]])
+        return np.stack(np.divmod(cells, self.__shape[1]), axis=1)
+
+
+class BoardEvent(NamedTuple):
+    """Board 변경 알림. kind는 "place", "remove", "reset" 중 하나이며
+    reset(init_board 수정)은 여러 칸이 바뀌므로 cell이 None, stone이 Stone.EMPTY"""
+    kind: str
+    cell: tuple[int, int] | None
+    stone: Stone
+    version: int
+
+
+_TEXT_CELLS: tuple[str, ...] = ("` ", "● ", "○ ")
+"STONE_CODES 순서의 텍스트 칸"
+
+_HTML_CELLS: tuple[str, ...] = (
+    '<td class="empty"></td>', '<td class="black"></td>', '<td class="white"></td>'
+)
+"STONE_CODES 순서의 HTML 칸"
+
+_STONE_TEXT: dict[Stone, str] = {stone: _TEXT_CELLS[code] for stone, code in STONE_CODES.items()}
+
+
+@lru_cache(maxsize=1 << 12)
+def _text_row(code: int, width: int) -> str:
+    """Board.line_codes 형식의 한 행을 텍스트로. 같은 행은 다시 만들지 않음"""
+    return "".join([_TEXT_CELLS[(code >> 2*j) & 3] for j in range(width)]) + "\n"
+
+
+@lru_cache(maxsize=1 << 12)
+def _html_row(code: int, width: int) -> str:
+    """Board.line_codes 형식의 한 행을 <tr>로. 같은 행은 다시 만들지 않음"""
+    return "<tr>" + "".join([_HTML_CELLS[(code >> 2*j) & 3] for j in range(width)]) + "</tr>"
+
+
+def render_text(row_codes, width: int) -> str:
+    """행별 줄 정수 코드로 print(board)의 보드 부분과 같은 텍스트를 만듦"""
+    return "".join([_text_row(code, width) for code in row_codes])
+
+
+def render_html(row_codes, width: int) -> str:
+    """행별 줄 정수 코드로 <table class="omok-board"> HTML을 만듦.
+    각 칸은 empty, black, white class를 가진 <td>"""
+    return (
+        '<table class="omok-board">'
+        + "".join([_html_row(code, width) for code in row_codes])
+        + "</table>"
+    )
+
+
+class BoardSnapshot:
+    """특정 시점 Board의 변경 불가능한 사본. 다음 수정 전까지 Board와 코드 배열을 공유하고
+    Board가 수정될 때 Board 쪽이 새 배열로 옮겨가므로(copy-on-write) 만들 때 복사가 없음.
+    같은 돌 배치와 같은 last_stone이면 같은 값으로 비교되고 해시됨"""
+    __slots__ = (
+        "__codes", "__rule", "__last_stone", "__version", "__zobrist", "__moves", "__row_codes"
+    )
+
+    def __init__(
+        self, codes: np.ndarray, rule: Rule, last_stone: Stone,
+        version: int, zobrist: int, moves: tuple[tuple[int, int], ...],
+        row_codes: tuple[int, ...]
+    ) -> None:
+        self.__codes: np.ndarray = codes.view()
+        self.__codes.flags.writeable = False
+        self.__rule: Rule = rule
+        self.__last_stone: Stone = last_stone
+        self.__version: int = version
+        self.__zobrist: int = zobrist
+        self.__moves: tuple[tuple[int, int], ...] = moves
+        self.__row_codes: tuple[int, ...] = row_codes
+        "Board.line_codes의 행 부분"
+
+    @property
+    def codes(self) -> np.ndarray:
+        """STONE_CODES int8 읽기 전용 ndarray"""
+        return self.__codes
+
+    @property
+    def rule(self) -> Rule:
+        return self.__rule
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.__codes.shape
+
+    @property
+    def last_stone(self) -> Stone:
+        return self.__last_stone
+
+    @property
+    def version(self) -> int:
+        return self.__version
+
+    @property
+    def zobrist(self) -> int:
+        return self.__zobrist
+
+    @property
+    def moves(self) -> tuple[tuple[int, int], ...]:
+        return self.__moves
+
+    def to_text(self) -> str:
+        return render_text(self.__row_codes, self.shape[1])
+
+    def to_html(self) -> str:
+        return render_html(self.__row_codes, self.shape[1])
+
+    def __getitem__(self, idx) -> object:
+        """Board와 같이 ndarray 인덱싱으로 Stone 또는 Stone ndarray 반환"""
+        codes = self.__codes[idx]
+        if np.ndim(codes) == 0:
+            return _CODE_STONES[int(codes)]
+        return np.array(_CODE_STONES, dtype=object)[codes]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, BoardSnapshot):
+            return NotImplemented
+        return (
+            self.__zobrist == other.__zobrist
+            and self.__last_stone == other.__last_stone
+            and self.shape == other.shape
+            and bool((self.__codes == other.__codes).all())
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.__zobrist, self.__last_stone, self.shape))
+
+
 class Board:
     """오목판을 제공하고 오목 규칙들을 적용하여 게임을 진행함"""
 
     class InitBoard:
         """게임 규칙에서 벗어나 ndarray 인덱싱으로 여러 수를 놓을 수 있음"""
-        def __init__(self, board: np.ndarray) -> None:
+        __slots__ = ("__board", "__on_write")
+
+        def __init__(self, board: np.ndarray, on_write=None) -> None:
             self.__board: np.ndarray = board
+            self.__on_write = on_write
+            "여러 칸이 바뀐 뒤 Board가 부가 정보를 다시 계산하도록 호출"
     
         def __setitem__(self, idx, stones) -> None:
             self.__board[idx] = stones
+            if self.__on_write is not None:
+                self.__on_write()
 
+    __slots__ = (
+        "__rule", "__win_checker", "__board", "__codes", "__version", "__listeners", "__snapshot",
+        "__last_stone", "__moves", "__base_move_count", "__candidates", "__windows",
+        "__line_codes", "__zobrist", "__forbidden"
+    )
 
-    def __init__(self) -> None:
-        self.__board: np.ndarray = np.full([15, 15], Stone.EMPTY, dtype=Stone)
+    def __init__(self, shape: tuple[int, int] | None = None, rule: Rule | None = None) -> None:
+        """shape만 주면 그 크기의 기본 규칙, rule을 주면 rule.shape 크기로 생성"""
+        self.__rule: Rule = _resolve_rule(shape, rule)
+        self.__win_checker: _WinChecker = _win_checker(self.__rule)
+        self.__board: np.ndarray = np.full(self.__rule.shape, Stone.EMPTY, dtype=Stone)
         "오목판"
+        self.__codes: np.ndarray = np.zeros(self.__rule.shape, dtype=np.int8)
+        "__board와 같은 내용을 STONE_CODES로 담은 배열"
+        self.__version: int = 0
+        "착수, 무르기, init_board 수정마다 1씩 증가"
+        self.__listeners: list | None = None
+        "subscribe로 등록한 BoardEvent 수신 함수. 처음 subscribe할 때 만듦"
+        self.__snapshot: BoardSnapshot | None = None
+        "__codes를 공유 중인 마지막 snapshot. 다음 수정 전에 __codes를 복사하고 비움"
         self.__last_stone: Stone = Stone.EMPTY
-        self.init_board: Board.InitBoard = Board.InitBoard(self.__board)
-        """게임 규칙에서 벗어나 ndarray 인덱싱으로 여러 수를 놓을 수 있음"""
+        self.__moves: list[tuple[tuple[int, int], Stone]] = []
+        "(착수 위치, 착수 전 last_stone) 기록. init_board로 수정하면 비워짐"
+        self.__base_move_count: int = 0
+        "from_bytes로 복원할 때 기록 없이 이어받은 착수 수"
+        self.__candidates: CandidateIndex | None = None
+        self.__windows: WindowCounter | None = None
+        "candidates, windows는 처음 읽을 때 만들고 그 뒤로 착수마다 갱신함"
+        self.__line_codes: list[int] = [0] * len(_line_cells(self.__board.shape))
+        "_line_cells 순서의 각 줄을 칸마다 STONE_CODES 2비트로 담은 정수"
+        self.__zobrist: int = 0
+        self.__forbidden: tuple[int, np.ndarray] | None = None
+        "(zobrist, forbidden_mask) 마지막으로 계산한 금수 mask"
+
+    @property
+    def init_board(self) -> "Board.InitBoard":
+        """게임 규칙에서 벗어나 ndarray 인덱싱으로 여러 수를 놓을 수 있음.
+        Board가 자신을 참조하는 객체를 들고 있지 않도록 읽을 때마다 만듦"""
+        return Board.InitBoard(self.__board, self.__on_init_board)
 
     @property
     def last_stone(self):
         return self.__last_stone
 
+    @property
+    def rule(self) -> Rule:
+        return self.__rule
+
+    @property
+    def moves(self) -> tuple[tuple[int, int], ...]:
+        """규칙에 따라 둔 착수 위치를 순서대로 반환"""
+        return tuple(idx for idx, _ in self.__moves)
+
+    @property
+    def move_count(self) -> int:
+        """지금까지 둔 수. from_bytes로 복원한 보드는 저장 당시의 수부터 이어서 셈"""
+        return self.__base_move_count + len(self.__moves)
+
+    @property
+    def candidates(self) -> CandidateIndex:
+        """돌 주변 빈칸으로 이루어진 착수 후보"""
+        if self.__candidates is None:
+            self.__candidates = CandidateIndex(self.shape)
+            self.__candidates.rebuild(self.__codes != STONE_CODES[Stone.EMPTY])
+        return self.__candidates
+
+    @property
+    def windows(self) -> WindowCounter:
+        """길이 rule.k 구간별 돌 개수로 만든 평가 구조"""
+        if self.__windows is None:
+            self.__windows = WindowCounter(self.shape, self.__rule.k)
+            self.__windows.rebuild(self.__codes)
+        return self.__windows
+
+    @property
+    def version(self) -> int:
+        """보드가 바뀔 때마다 증가하는 번호. 복사본을 비교하지 않고 변경 여부를 확인"""
+        return self.__version
+
+    @property
+    def zobrist(self) -> int:
+        """돌 배치에 대한 64비트 Zobrist 해시. 착수/무르기마다 XOR로 갱신"""
+        return self.__zobrist
+
+    LINE_BITS: int = 2
+    "line_codes에서 한 칸이 차지하는 비트 수"
+
+    @property
+    def line_codes(self) -> tuple[int, ...]:
+        """가로, 세로, 양대각선, 음대각선 모든 줄의 정수 코드.
+        줄의 j번째 칸이 (code >> 2*j) & 3에 STONE_CODES로 담김"""
+        return tuple(self.__line_codes)
+
+    def cell_lines(self, idx: tuple[int, int]) -> tuple[tuple[int, int], ...]:
+        """idx를 지나는 네 줄의 (line_codes 번호, 줄 안에서의 위치)"""
+        return _cell_lines(self.shape)[idx[0]*self.shape[1] + idx[1]]
+
     @property
     def ndim(self):
         return self.__board.ndim
@@ -88,44 +898,113 @@ class Board:
         """Board의 스톤 정보를 담고 있는 ndarray만 deepcopy"""
         return self.__board.copy()
 
+    def subscribe(self, listener) -> None:
+        """보드가 바뀔 때마다 listener(BoardEvent)를 호출하도록 등록"""
+        if self.__listeners is None:
+            self.__listeners = []
+        self.__listeners.append(listener)
+
+    def unsubscribe(self, listener) -> None:
+        if self.__listeners is None:
+            raise ValueError(listener)
+        self.__listeners.remove(listener)
+
+    def __emit(self, kind: str, cell: tuple[int, int] | None, stone: Stone) -> None:
+        """등록 순서대로 BoardEvent 전달. 수신 중 구독이 바뀌어도 이번 알림은 그대로 진행"""
+        event: BoardEvent = BoardEvent(kind, cell, stone, self.__version)
+        for listener in tuple(self.__listeners):
+            listener(event)
+
+    def view(self) -> np.ndarray:
+        """복사 없이 Board의 Stone ndarray를 읽기 전용 view로 반환.
+        이후 착수가 그대로 보이므로 값을 보관하려면 viewcopy 사용"""
+        view: np.ndarray = self.__board.view()
+        view.flags.writeable = False
+        return view
+
+    def code_view(self) -> np.ndarray:
+        """복사 없이 STONE_CODES int8 ndarray를 읽기 전용 view로 반환.
+        snapshot 이후 첫 수정에서 Board가 새 배열로 옮겨가므로 그 전에 받은 view는 갱신되지 않음"""
+        view: np.ndarray = self.__codes.view()
+        view.flags.writeable = False
+        return view
+
+    def snapshot(self) -> BoardSnapshot:
+        """현재 상태의 BoardSnapshot. 복사 없이 만들고, 수정이 없으면 같은 객체를 다시 반환"""
+        if self.__snapshot is None:
+            self.__snapshot = BoardSnapshot(
+                self.__codes, self.__rule, self.__last_stone,
+                self.__version, self.__zobrist, self.moves,
+                tuple(self.__line_codes[:self.shape[0]])
+            )
+        return self.__snapshot
+
+    BYTES_HEADER: struct.Struct = struct.Struct("<BBBH")
+    "to_bytes 머리말. 높이, 너비, last_stone 코드, move_count"
+
+    def to_bytes(self) -> bytes:
+        """머리말 뒤에 모든 칸을 2비트씩 묶은 바이트열. 15x15 보드는 5 + 57 바이트.
+        머리말에 담을 수 없는 크기나 move_count면 BytesLimitError"""
+        if max(self.shape) > 0xFF or self.move_count > 0xFFFF:
+            raise BoardErrors.BytesLimitError
+        last: int = STONE_CODES[self.__last_stone]
+        header: bytes = self.BYTES_HEADER.pack(*self.shape, last, self.move_count)
+        return header + pack_codes(self.__codes).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, rule: Rule | None = None) -> "Board":
+        """to_bytes로 만든 바이트열에서 돌 배치, last_stone, move_count를 복원한 Board.
+        착수 기록은 저장되지 않으므로 복원한 보드의 moves는 비어 있음"""
+        size: int = cls.BYTES_HEADER.size
+        if len(data) < size:
+            raise BoardErrors.BoardBytesError
+        height, width, last, move_count = cls.BYTES_HEADER.unpack_from(data)
+        if last > 2 or len(data) != size + -(-height*width // 4):
+            raise BoardErrors.BoardBytesError
+        codes: np.ndarray = unpack_codes(np.frombuffer(data, np.uint8, offset=size), (height, width))
+        if (codes > 2).any():
+            raise BoardErrors.BoardBytesError
+
+        board: Board = cls((height, width) if rule is None else None, rule)
+        if board.shape != (height, width):
+            raise BoardErrors.BoardShapeError
+        board.init_board[:] = np.array(_CODE_STONES, dtype=object)[codes]
+        board.__last_stone = _CODE_STONES[last]
+        board.__base_move_count = move_count
+        return board
+
+    def __detach_snapshot(self) -> None:
+        """snapshot이 공유 중인 __codes 대신 복사본에 쓰도록 바꿈"""
+        self.__codes = self.__codes.copy()
+        self.__snapshot = None
+
+    def to_text(self) -> str:
+        """보드 부분만의 텍스트. 행 단위로 캐시된 문자열을 이어 붙임"""
+        return render_text(self.__line_codes[:self.shape[0]], self.shape[1])
+
+    def to_html(self) -> str:
+        """보드의 <table> HTML. 행 단위로 캐시된 <tr>을 이어 붙임"""
+        return render_html(self.__line_codes[:self.shape[0]], self.shape[1])
+
     def __str__(self) -> str:
         """print(board)로 보드판 현황 표현"""
-        result = "\n\n"
-        result += "Board Shape : " + str(self.shape) + "\n"
-        result += "Last Stone : " + str(self.last_stone) + "\n"
-        result += "\nBoard View\n"
-        for line in self.__board:
-            for stone in line:
-                if stone == Stone.EMPTY:
-                    result += '`' + ' '
-                elif stone == Stone.WHITE:
-                    result += '○' + ' '
-                elif stone == Stone.BLACK:
-                    result += '●' + ' '
-            result += '\n'
-        return result
+        return "".join([
+            "\n\n",
+            "Board Shape : ", str(self.shape), "\n",
+            "Last Stone : ", str(self.last_stone), "\n",
+            "\nBoard View\n",
+            self.to_text(),
+        ])
 
     def print(self, arr: np.ndarray[Stone,...]):
         """ndarray의 구성요소 시각화"""
         result = ""
         if arr.ndim == 1:
-            for stone in arr:
-                if stone == Stone.EMPTY:
-                    result += '`' + ' '
-                elif stone == Stone.WHITE:
-                    result += '○' + ' '
-                elif stone == Stone.BLACK:
-                    result += '●' + ' '
+            result = "".join([_STONE_TEXT.get(stone, "") for stone in arr])
         elif arr.ndim == 2:
-            for line in arr:
-                for stone in line:
-                    if stone == Stone.EMPTY:
-                        result += '`' + ' '
-                    elif stone == Stone.WHITE:
-                        result += '○' + ' '
-                    elif stone == Stone.BLACK:
-                        result += '●' + ' '
-                result += '\n'
+            result = "".join([
+                "".join([_STONE_TEXT.get(stone, "") for stone in line]) + "\n" for line in arr
+            ])
         print(result)
 
     def __getitem__(self, idx) -> object:
@@ -154,58 +1033,449 @@ class Board:
         if self.__last_stone == Stone.EMPTY and stone == Stone.WHITE:
             raise BoardErrors.BlackFirstError
 
+        idx = int(idx[0]), int(idx[1])
+        if stone == Stone.BLACK and self.__rule.has_forbidden and self.is_forbidden(idx):
+            raise BoardErrors.ForbiddenMoveError
+        code: int = STONE_CODES[stone]
+        if self.__snapshot is not None:
+            self.__detach_snapshot()
         self.__board[idx] = stone
+        self.__codes[idx] = code
+        self.__version += 1
+        self.__moves.append((idx, self.__last_stone))
         self.__last_stone = stone
+        if self.__candidates is not None:
+            self.__candidates.place(idx)
+        if self.__windows is not None:
+            self.__windows.place(idx, stone)
+        for line_id, pos in self.cell_lines(idx):
+            self.__line_codes[line_id] |= code << self.LINE_BITS*pos
+        self.__zobrist ^= _zobrist_keys(self.shape)[code][idx[0]*self.shape[1] + idx[1]]
+        if self.__listeners:
+            self.__emit("place", idx, stone)
 
-        self.__judge_win()
+        if self.__win_checker.at(self.__line_codes, self.cell_lines(idx), code):
+            raise BoardErrors.WinError
+
+    def winning_moves(self, stone: Stone) -> np.ndarray:
+        """stone을 두면 rule에 따라 바로 승리하는 빈칸의 (k, 2) 좌표.
+        windows.threats 중 exact 규칙에서 k개를 넘는 장목이 되는 자리는 뺌"""
+        threats: np.ndarray = self.windows.threats(stone)
+        if not self.__rule.exact or not len(threats):
+            return threats
+        code: int = STONE_CODES[stone]
+        wins: list[bool] = []
+        for r, c in threats.tolist():
+            cell_lines = self.cell_lines((r, c))
+            for line_id, pos in cell_lines:
+                self.__line_codes[line_id] |= code << self.LINE_BITS*pos
+            wins.append(self.__win_checker.at(self.__line_codes, cell_lines, code))
+            for line_id, pos in cell_lines:
+                self.__line_codes[line_id] &= ~(3 << self.LINE_BITS*pos)
+        return threats[np.array(wins, dtype=bool)]
+
+    def is_forbidden(self, idx: tuple[int, int]) -> bool:
+        """빈칸 idx가 rule에 따른 흑 금수 자리인지"""
+        if not self.__rule.has_forbidden or self.__board[idx] != Stone.EMPTY:
+            return False
+        return _forbidden_detector(self.__rule).is_forbidden(self.__line_codes, idx)
+
+    def forbidden_mask(self, should_stop=None) -> np.ndarray:
+        """흑 금수 자리인 빈칸이 True인 (H, W) bool ndarray.
+        같은 배치에 대해서는 한번만 계산하며, 흑돌에서 k-1칸 이내인 빈칸만 확인함.
+        계산 도중 should_stop()이 True가 되면 OmokAiErrors.StoppedError로 중단하고 저장하지 않음"""
+        if self.__forbidden is not None and self.__forbidden[0] == self.__zobrist:
+            return self.__forbidden[1].copy()
+        mask: np.ndarray = _forbidden_cells(self.__codes, self.__line_codes, self.__rule, should_stop)
+        self.__forbidden = self.__zobrist, mask
+        return mask.copy()
+
+    def undo(self) -> tuple[int, int]:
+        """마지막 착수를 무르고 그 위치를 반환"""
+        if not self.__moves:
+            raise BoardErrors.NoMoveToUndoError
+        idx, last_stone = self.__moves.pop()
+        stone: Stone = self.__board[idx]
+        if self.__snapshot is not None:
+            self.__detach_snapshot()
+        self.__board[idx] = Stone.EMPTY
+        self.__codes[idx] = STONE_CODES[Stone.EMPTY]
+        self.__version += 1
+        self.__last_stone = last_stone
+        if self.__candidates is not None:
+            self.__candidates.remove(idx)
+        if self.__windows is not None:
+            self.__windows.remove(idx, stone)
+        for line_id, pos in self.cell_lines(idx):
+            self.__line_codes[line_id] &= ~(3 << self.LINE_BITS*pos)
+        self.__zobrist ^= _zobrist_keys(self.shape)[STONE_CODES[stone]][idx[0]*self.shape[1] + idx[1]]
+        if self.__listeners:
+            self.__emit("remove", idx, stone)
+        return idx
+
+    def __on_init_board(self) -> None:
+        """init_board로 여러 칸이 바뀌면 착수 기록을 비우고 부가 정보를 다시 계산"""
+        self.__moves.clear()
+        self.__base_move_count = 0
+        codes: np.ndarray = to_codes(self.__board)
+        if self.__snapshot is not None:
+            self.__detach_snapshot()
+        self.__codes[:] = codes
+        self.__version += 1
+        if self.__candidates is not None:
+            self.__candidates.rebuild(codes != STONE_CODES[Stone.EMPTY])
+        if self.__windows is not None:
+            self.__windows.rebuild(codes)
+        flat: np.ndarray = codes.reshape(-1)
+        for line_id, cells in enumerate(_line_cells(self.shape)):
+            self.__line_codes[line_id] = sum(
+                v << self.LINE_BITS*pos for pos, v in enumerate(flat[cells].tolist())
+            )
+        keys = _zobrist_keys(self.shape)
+        zobrist: int = 0
+        for cell, code in enumerate(flat.tolist()):
+            zobrist ^= keys[code][cell]
+        self.__zobrist = zobrist
+        if self.__listeners:
+            self.__emit("reset", None, Stone.EMPTY)
 
     def __judge_win(self):
-        board = self.__board.copy()
-        for i in range(self.__board.shape[0]):
-            line: np.ndarray = board[i,:]
-            self.__find_5_stack_then_raise_winerror(line)
-
-        for i in range(self.__board.shape[1]):
-            line: np.ndarray = board[:,i]
-            self.__find_5_stack_then_raise_winerror(line)
-
-        for i in range(self.__board.shape[0]):
-            line: np.ndarray = board.diagonal(i)
-            self.__find_5_stack_then_raise_winerror(line)
-
-        for i in range(self.__board.shape[1]):
-            line: np.ndarray = board.diagonal(-i)
-            self.__find_5_stack_then_raise_winerror(line)
-
-        for i in range(self.__board.shape[0]):
-            line: np.ndarray = np.fliplr(board).diagonal(i)
-            self.__find_5_stack_then_raise_winerror(line)
-
-        for i in range(self.__board.shape[1]):
-            line: np.ndarray = np.fliplr(board).diagonal(-i)
-            self.__find_5_stack_then_raise_winerror(line)
-
-    def __find_5_stack_then_raise_winerror(self, line: np.ndarray):
-        """입력받은 line에 대해 같은 돌이 5번 연속이면 WinError"""
-        stack: int = 0
-        last_stone: Stone = Stone.EMPTY
-        for stone in line:
-            if stone == Stone.EMPTY:
-                stack = 0
-            elif last_stone != stone:
-                last_stone = stone
-                stack = 1
-            elif last_stone == stone:
-                stack += 1
-            if stack == 5:
-                raise BoardErrors.WinError
+        """보드 전체에서 rule에 맞게 같은 돌이 k번 연속이면 WinError"""
+        if self.__win_checker.any_line(self.__line_codes):
+            raise BoardErrors.WinError
 
     def deepcopy(self):
         """Board 인스턴스의 __board를 deepcopy한 새 Board 객체를 반환"""
-        newboard: Board = Board()
+        newboard: Board = Board(rule=self.__rule)
         newboard.init_board[:] = self.__board
         return newboard
 
+
+class SparseBoard:
+    """크기 제한이 없는 오목판. 놓인 돌만 좌표 dict에 저장하고
+    방향별 연속된 돌(run)의 양 끝 좌표만 기록해 승리를 판정하므로
+    메모리와 시간이 보드 크기가 아닌 둔 돌 수에 비례함"""
+    def __init__(self, candidate_radius: int = 2, rule: Rule | None = None) -> None:
+        """rule은 Board와 같이 검사하고 정규화하며, k, exact와 흑 금수 규칙만 사용하고 shape은 무시함"""
+        self.__rule: Rule = _resolve_rule(None, rule)
+        self.__stones: dict[tuple[int, int], Stone] = {}
+        self.__last_stone: Stone = Stone.EMPTY
+        self.__run_end: tuple[dict, ...] = tuple({} for _ in DIRECTIONS)
+        "방향별 run 시작 좌표 -> 끝 좌표"
+        self.__run_start: tuple[dict, ...] = tuple({} for _ in DIRECTIONS)
+        "방향별 run 끝 좌표 -> 시작 좌표"
+        self.__radius: int = candidate_radius
+        self.__candidates: set[tuple[int, int]] = set()
+
+    @property
+    def last_stone(self):
+        return self.__last_stone
+
+    @property
+    def candidates(self) -> frozenset[tuple[int, int]]:
+        """돌 주변 radius칸 이내의 빈칸"""
+        return frozenset(self.__candidates)
+
+    @property
+    def rule(self) -> Rule:
+        return self.__rule
+
+    @property
+    def bounds(self) -> tuple[tuple[int, int], tuple[int, int]] | None:
+        """돌이 놓인 영역의 ((최소 행, 최소 열), (최대 행, 최대 열)). 돌이 없으면 None"""
+        if not self.__stones:
+            return None
+        rows = [r for r, _ in self.__stones]
+        cols = [c for _, c in self.__stones]
+        return (min(rows), min(cols)), (max(rows), max(cols))
+
+    def __len__(self) -> int:
+        return len(self.__stones)
+
+    def __getitem__(self, idx: tuple[int, int]) -> Stone:
+        return self.__stones.get(idx, Stone.EMPTY)
+
+    def __setitem__(self, idx: tuple[int, int], stone: Stone) -> None:
+        """Board와 같은 규칙으로 착수. 좌표는 음수를 포함한 임의의 정수 쌍"""
+        if type(idx) != tuple or len(idx) != 2:
+            raise BoardErrors.UseSliceError
+        if not all(isinstance(v, (int, np.integer)) for v in idx):
+            raise BoardErrors.UseSliceError
+        idx = int(idx[0]), int(idx[1])
+
+        if idx in self.__stones:
+            raise BoardErrors.NotEmptyBoardError
+        if stone == Stone.EMPTY:
+            raise BoardErrors.PutEmptyStoneError
+        if self.__last_stone == stone:
+            raise BoardErrors.PutSameAgainError
+        if self.__last_stone == Stone.EMPTY and stone == Stone.WHITE:
+            raise BoardErrors.BlackFirstError
+        if stone == Stone.BLACK and self.__rule.has_forbidden and self.is_forbidden(idx):
+            raise BoardErrors.ForbiddenMoveError
+
+        self.__stones[idx] = stone
+        self.__last_stone = stone
+        self.__update_candidates(idx)
+        stacks: list[int] = [self.__merge_runs(idx, stone, k) for k in range(len(DIRECTIONS))]
+        if any(self.__rule.wins(stack) for stack in stacks):
+            raise BoardErrors.WinError
+
+    FORBIDDEN_REACH: int = _ForbiddenDetector.MAX_DEPTH + 2
+    "금수 판정에 쓰는 주변 영역의 반지름(k 배수). 진짜 삼 확인 재귀가 닿는 거리보다 넓음"
+
+    def is_forbidden(self, idx: tuple[int, int]) -> bool:
+        """빈칸 idx가 rule에 따른 흑 금수 자리인지.
+        idx 주변 영역만 잘라 Board와 같은 방법으로 판정하며 영역 경계는 판정에 닿지 않음"""
+        if not self.__rule.has_forbidden or idx in self.__stones:
+            return False
+        rad: int = self.__rule.k * self.FORBIDDEN_REACH
+        size: int = 2*rad + 1
+        codes: np.ndarray = np.zeros((size, size), dtype=np.int8)
+        for (r, c), stone in self.__stones.items():
+            r, c = r - idx[0] + rad, c - idx[1] + rad
+            if 0 <= r < size and 0 <= c < size:
+                codes[r, c] = STONE_CODES[stone]
+        detector: _ForbiddenDetector = _forbidden_detector(self.__rule._replace(shape=(size, size)))
+        return detector.is_forbidden(_codes_line_codes(codes), (rad, rad))
+
+    def run_length(self, idx: tuple[int, int], direction: int) -> int:
+        """idx의 돌이 DIRECTIONS[direction] 방향으로 이루는 run의 길이. 빈칸이면 0"""
+        if idx not in self.__stones:
+            return 0
+        dr, dc = DIRECTIONS[direction]
+        end: tuple[int, int] = idx
+        while end not in self.__run_start[direction]:
+            end = end[0] + dr, end[1] + dc
+        return self.__span(self.__run_start[direction][end], end, direction)
+
+    def __span(self, start: tuple[int, int], end: tuple[int, int], direction: int) -> int:
+        dr, _ = DIRECTIONS[direction]
+        return (end[0] - start[0] if dr else end[1] - start[1]) + 1
+
+    def __merge_runs(self, idx: tuple[int, int], stone: Stone, direction: int) -> int:
+        """idx 양옆의 같은 돌 run을 idx와 합쳐 끝 좌표만 다시 기록하고 합친 길이를 반환"""
+        dr, dc = DIRECTIONS[direction]
+        run_end: dict = self.__run_end[direction]
+        run_start: dict = self.__run_start[direction]
+        before: tuple[int, int] = idx[0] - dr, idx[1] - dc
+        after: tuple[int, int] = idx[0] + dr, idx[1] + dc
+
+        start: tuple[int, int] = idx
+        end: tuple[int, int] = idx
+        if self.__stones.get(before) == stone:
+            start = run_start.pop(before)
+        if self.__stones.get(after) == stone:
+            end = run_end.pop(after)
+        run_end[start] = end
+        run_start[end] = start
+        return self.__span(start, end, direction)
+
+    def __update_candidates(self, idx: tuple[int, int]) -> None:
+        """idx 주변 (2*radius+1)^2칸의 빈칸을 착수 후보에 추가"""
+        r, c = idx
+        rad: int = self.__radius
+        for nr in range(r - rad, r + rad + 1):
+            for nc in range(c - rad, c + rad + 1):
+                if (nr, nc) not in self.__stones:
+                    self.__candidates.add((nr, nc))
+        self.__candidates.discard(idx)
+
+    def to_dense(self, margin: int = 0) -> tuple[np.ndarray, tuple[int, int]]:
+        """돌이 놓인 영역과 주변 margin칸을 Stone ndarray로 만들고
+        ndarray [0, 0]에 해당하는 좌표와 함께 반환"""
+        bounds = self.bounds
+        if bounds is None:
+            return np.full([2*margin + 1] * 2, Stone.EMPTY, dtype=Stone), (-margin, -margin)
+        (r0, c0), (r1, c1) = bounds
+        origin: tuple[int, int] = r0 - margin, c0 - margin
+        arr: np.ndarray = np.full(
+            [r1 - r0 + 1 + 2*margin, c1 - c0 + 1 + 2*margin], Stone.EMPTY, dtype=Stone
+        )
+        for (r, c), stone in self.__stones.items():
+            arr[r - origin[0], c - origin[1]] = stone
+        return arr, origin
+
+
+class BatchBoardErrors:
+    pass
+
+    class ActionShapeError(Exception):
+        def __str__(self) -> str:
+            error: str = "actions는 보드 개수와 같은 길이의 1차원 배열이어야 함"
+            return super().__str__() + error
+
+
+class BatchBoard:
+    """Board와 같은 규칙의 게임 N판을 (N, H, W) 배열 하나로 묶어 동시에 진행함.
+    돌은 0(빈칸), 1(흑), 2(백) 정수 코드로 저장하며 흑부터 번갈아 착수.
+    rule에 흑 금수가 있으면 흑 차례인 판의 금수 자리는 규칙 위반으로 다룸"""
+    EMPTY: int = 0
+    BLACK: int = 1
+    WHITE: int = 2
+    WALL: int = 3
+    "승리 판정 시 경계 검사를 생략하기 위해 보드 바깥을 채우는 값"
+
+    def __init__(self,
+        num_boards: int, shape: tuple[int, int] | None = None, rule: Rule | None = None
+    ) -> None:
+        self.__num: int = num_boards
+        self.__rule: Rule = _resolve_rule(shape, rule)
+        self.__shape: tuple[int, int] = self.__rule.shape
+        self.__pad: int = self.__rule.k
+        "승리 판정 시 확인하는 방향별 최대 거리. exact 규칙의 장목 확인을 위해 k칸"
+        h, w = self.__shape
+        self.__padded: np.ndarray = np.full(
+            [num_boards, h + 2*self.__pad, w + 2*self.__pad], self.WALL, dtype=np.int8
+        )
+        "바깥쪽 k칸을 WALL로 채운 오목판 묶음"
+        self.__boards: np.ndarray = self.__padded[
+            :, self.__pad:self.__pad + h, self.__pad:self.__pad + w
+        ]
+        self.__last_stone: np.ndarray = np.zeros(num_boards, dtype=np.int8)
+        self.__move_count: np.ndarray = np.zeros(num_boards, dtype=np.int32)
+        self.reset()
+
+    @property
+    def num_boards(self):
+        return self.__num
+
+    @property
+    def rule(self) -> Rule:
+        return self.__rule
+
+    @property
+    def shape(self):
+        return self.__boards.shape
+
+    @property
+    def boards(self) -> np.ndarray:
+        """(N, H, W) 읽기 전용 뷰"""
+        view = self.__boards.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def next_stone(self) -> np.ndarray:
+        """각 판에서 다음에 둘 돌의 코드"""
+        return np.where(self.__last_stone == self.BLACK, self.WHITE, self.BLACK).astype(np.int8)
+
+    def reset(self, mask: np.ndarray | None = None) -> None:
+        """mask가 True인 판(생략 시 전체)을 빈 판으로 초기화"""
+        if mask is None:
+            mask = np.ones(self.__num, dtype=bool)
+        self.__boards[mask] = self.EMPTY
+        self.__last_stone[mask] = self.EMPTY
+        self.__move_count[mask] = 0
+
+    def legal_mask(self) -> np.ndarray:
+        """(N, H*W) 형태로 각 판의 착수 가능한 칸. 흑 차례인 판에서는 금수 자리를 뺌"""
+        legal: np.ndarray = self.__boards == self.EMPTY
+        if self.__rule.has_forbidden:
+            for i in np.flatnonzero(self.next_stone == self.BLACK).tolist():
+                codes: np.ndarray = self.__boards[i]
+                legal[i] &= ~_forbidden_cells(codes, _codes_line_codes(codes), self.__rule)
+        return legal.reshape(self.__num, -1)
+
+    def step(self, actions) -> tuple[np.ndarray, np.ndarray]:
+        """각 판에 actions[i] = r * W + c 위치로 다음 돌을 착수하고
+        착수한 쪽 기준 (rewards, dones)를 반환.
+        승리 1, 규칙 위반(빈칸이 아니거나 범위 밖, 흑 금수) -1로 즉시 패배, 무승부와 진행 중은 0.
+        끝난 판은 자동으로 빈 판으로 초기화됨"""
+        actions = np.asarray(actions)
+        if actions.shape != (self.__num,) or not np.issubdtype(actions.dtype, np.integer):
+            raise BatchBoardErrors.ActionShapeError
+
+        h, w = self.__shape
+        n = np.arange(self.__num)
+        stone = self.next_stone
+        in_range = (actions >= 0) & (actions < h * w)
+        r, c = np.divmod(np.where(in_range, actions, 0), w)
+        legal = in_range & (self.__boards[n, r, c] == self.EMPTY)
+        if self.__rule.has_forbidden:
+            detector: _ForbiddenDetector = _forbidden_detector(self.__rule)
+            for i in np.flatnonzero(legal & (stone == self.BLACK)).tolist():
+                line_codes: list[int] = _codes_line_codes(self.__boards[i])
+                legal[i] = not detector.is_forbidden(line_codes, (int(r[i]), int(c[i])))
+
+        self.__boards[n[legal], r[legal], c[legal]] = stone[legal]
+        self.__last_stone[legal] = stone[legal]
+        self.__move_count[legal] += 1
+
+        win = legal & self.__judge_win(r, c, stone)
+        draw = legal & ~win & (self.__move_count == h * w)
+
+        rewards = np.zeros(self.__num, dtype=np.float32)
+        rewards[win] = 1
+        rewards[~legal] = -1
+        dones = win | draw | ~legal
+        self.reset(dones)
+        return rewards, dones
+
+    def __judge_win(self, r: np.ndarray, c: np.ndarray, stone: np.ndarray) -> np.ndarray:
+        """방금 둔 (r, c)를 지나는 네 방향 중 같은 돌의 연속이 rule에 맞는 승리면 True"""
+        n = np.arange(self.__num)[:, None]
+        pr = (r + self.__pad)[:, None]
+        pc = (c + self.__pad)[:, None]
+        ks = np.arange(1, self.__pad + 1)
+        win = np.zeros(self.__num, dtype=bool)
+        for dr, dc in DIRECTIONS:
+            stack = np.ones(self.__num, dtype=np.int32)
+            for sign in (1, -1):
+                same = self.__padded[n, pr + sign*dr*ks, pc + sign*dc*ks] == stone[:, None]
+                stack += np.cumprod(same, axis=1).sum(axis=1)
+            win |= stack == self.__rule.k if self.__rule.exact else stack >= self.__rule.k
+        return win
+
+
+@lru_cache(maxsize=None)
+def _run_sequence(shape: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]:
+    """_line_cells의 모든 줄을 빈칸 두 개(인덱스 H*W)씩 사이에 두고 이은 평탄화 인덱스 열과
+    방향별로 각 칸이 그 열에서 놓인 위치 (4, H*W)"""
+    h, w = shape
+    gap: np.ndarray = np.full(2, h*w)
+    directions: np.ndarray = np.repeat(np.arange(len(DIRECTIONS)), (h, w, h + w - 1, h + w - 1))
+    positions: np.ndarray = np.empty((len(DIRECTIONS), h*w), dtype=np.intp)
+    parts: list[np.ndarray] = []
+    start: int = 0
+    for d, line in zip(directions, _line_cells(shape)):
+        positions[d, line] = start + 2 + np.arange(line.size)
+        parts += [gap, line]
+        start += 2 + line.size
+    parts.append(gap)
+    return np.concatenate(parts), positions
+
+
+def _run_lengths(ray: np.ndarray) -> np.ndarray:
+    """마지막 축을 따라 각 위치에서 끝나는 True 연속 길이. 첫 칸은 False여야 함"""
+    total: np.ndarray = np.cumsum(ray, axis=-1, dtype=np.intp)
+    return total - np.maximum.accumulate(np.where(ray, 0, total), axis=-1)
+
+
+def _spread_scoreboards(own: np.ndarray, empty: np.ndarray, stack_scores: np.ndarray) -> np.ndarray:
+    """(..., H, W) 모양의 own(내 돌), empty(빈칸) 마스크로 OmokAi.__spread_stack과 같은 점수판 계산.
+    빈칸 x에 대해 방향마다 x 바로 뒤(앞)에서 끝나는 연속 돌 stack만큼,
+    바로 뒤(앞)칸이 내 돌이 아니면 두 칸 뒤(앞)에서 끝나는 stack만큼 stack_scores[stack]를 더함.
+    네 방향의 줄을 _run_sequence로 한 열에 이어 cumsum으로 연속 길이를 구하고
+    pair[바로 옆 stack, 한 칸 건너 stack] 표로 한쪽 방향 점수를 찾으므로
+    보드 크기와 상관없이 고정된 횟수의 ndarray 연산으로 끝남"""
+    *batch, h, w = own.shape
+    sequence, positions = _run_sequence((h, w))
+    flat: np.ndarray = np.zeros((*batch, h*w + 1), dtype=bool)
+    flat[..., :-1] = own.reshape(*batch, h*w)
+    ray: np.ndarray = flat[..., sequence]
+    ends: np.ndarray = _run_lengths(ray)
+    starts: np.ndarray = _run_lengths(ray[..., ::-1])[..., ::-1]
+    pair: np.ndarray = stack_scores[:, None] + np.where(
+        np.arange(len(stack_scores))[:, None] == 0, stack_scores[None, :], 0
+    )
+    scores: np.ndarray = pair[ends[..., 1:-3], ends[..., :-4]] + pair[starts[..., 3:-1], starts[..., 4:]]
+    scoreboards: np.ndarray = scores[..., positions - 2].sum(axis=-2, dtype=stack_scores.dtype)
+    scoreboards = scoreboards.reshape(own.shape)
+    scoreboards *= empty.astype(bool)
+    return scoreboards
+
+
 class OmokAiErrors:
     pass
     
@@ -219,6 +1489,16 @@ class OmokAiErrors:
             error: str = "ai.put_stone()이 돌을 착수하지 않음"
             return super().__str__() + error
     
+    class UnknownEngineError(Exception):
+        def __str__(self) -> str:
+            error: str = "ai.engine은 OmokAi.ENGINES 중 하나여야 함"
+            return super().__str__() + error
+
+    class StoppedError(Exception):
+        def __str__(self) -> str:
+            error: str = "ai.should_stop()이 True가 되어 계산을 중단함"
+            return super().__str__() + error
+
     class Error(Exception):
         def __str__(self) -> str:
             error: str = ""
@@ -226,27 +1506,132 @@ class OmokAiErrors:
 
 class OmokAi:
     """내부 스코어링 알고리즘을 통해 다음 수를 반환할 수 있는 클래스"""
-    def __init__(self, board: Board, mystone: Stone) -> None:
+    ENGINES: tuple[str, ...] = ("line", "conv")
+    """scoring 방식. line은 한 줄씩 돌며 __spread_stack으로,
+    conv는 보드 전체 마스크에 대한 고정된 횟수의 ndarray 연산으로 계산"""
+    unit: int = 1
+    "돌 하나가 주변에 주는 점수"
+    SCORE_DTYPE: type = np.int32
+    "scoreboard와 줄 점수 캐시의 정수형"
+    __slots__ = (
+        "__board", "mystone", "attack", "defence", "engine", "should_stop",
+        "__scoreboard", "__opp_scoreboard"
+    )
+
+    def __init__(self,
+        board: Board, mystone: Stone,
+        attack: float = 1, defence: float = 1, engine: str = "line",
+        should_stop=None
+    ) -> None:
+        """should_stop은 인자 없는 함수로, 계산 도중 True를 반환하면 StoppedError로 중단"""
         if mystone == Stone.EMPTY:
             raise OmokAiErrors.EmptyMystoneError
+        if engine not in self.ENGINES:
+            raise OmokAiErrors.UnknownEngineError
 
         self.__board: Board = board
         self.mystone: Stone = mystone
-        self.__scoreboard: np.ndarray = np.zeros(board.shape, dtype=int)
+        self.attack: float = attack
+        "moveboard에서 내 scoreboard에 곱하는 가중치"
+        self.defence: float = defence
+        "moveboard에서 상대 scoreboard에 곱하는 가중치"
+        self.engine: str = engine
+        self.should_stop = should_stop
+        self.__scoreboard: np.ndarray | None = None
+        self.__opp_scoreboard: np.ndarray | None = None
+        "두 scoreboard는 scoring할 때 만들고, 그 전에는 0으로 봄"
+
+    BATCH_STONES: tuple[Stone, Stone] = (Stone.BLACK, Stone.WHITE)
+    "batch_scoring 결과의 두 번째 축 순서"
+
+    @staticmethod
+    def batch_scoring(boards, stack_scores: np.ndarray | None = None) -> np.ndarray:
+        """여러 보드를 한번에 흑/백 모두에 대해 scoring하여 (N, 2, H, W) 점수판 반환.
+        boards는 Board의 시퀀스 또는 (N, H, W) Stone/정수 코드 배열.
+        stack_scores[stack]은 stack개 연속된 돌이 주변에 주는 점수로
+        생략하면 scoring()과 같이 stack * unit을 점수로 사용.
+        Board 시퀀스에 stack_scores를 생략하면 Board.line_codes로 줄 점수 캐시를 사용.
+        Board 시퀀스는 모두 같은 크기여야 하며(아니면 BoardShapeError)
+        비어 있으면 기본 보드 크기의 (0, 2, H, W) 점수판을 반환"""
+        if isinstance(boards, np.ndarray):
+            codes: np.ndarray = to_codes(boards)
+        else:
+            boards = list(boards)
+            shape: tuple[int, int] = boards[0].shape if boards else Rule().shape
+            if any(board.shape != shape for board in boards):
+                raise BoardErrors.BoardShapeError
+            if not boards:
+                codes = np.zeros((0, *shape), dtype=np.int8)
+            elif stack_scores is None:
+                return OmokAi.__batch_line_scoring(boards, shape)
+            else:
+                codes = np.stack([board.code_view() for board in boards])
+        if stack_scores is None:
+            stack_scores = np.arange(max(codes.shape[-2:]) + 1) * OmokAi.unit
+        stack_scores = np.asarray(stack_scores)
+
+        empty: np.ndarray = codes == STONE_CODES[Stone.EMPTY]
+        return np.stack([
+            _spread_scoreboards(codes == STONE_CODES[stone], empty, stack_scores)
+            for stone in OmokAi.BATCH_STONES
+        ], axis=1)
+
+    @staticmethod
+    def __batch_line_scoring(boards: list, shape: tuple[int, int]) -> np.ndarray:
+        """shape 크기 Board들의 모든 줄 점수를 __line_scores 캐시에서 찾아
+        보드별 평탄화 인덱스로 이어 붙인 뒤 bincount 한번으로 흑/백 점수판을 합산"""
+        size: int = shape[0] * shape[1]
+        lines: tuple[np.ndarray, ...] = _line_cells(shape)
+        sizes: list[int] = [line.size for line in lines]
+        black: list[np.ndarray] = []
+        white: list[np.ndarray] = []
+        for board in boards:
+            for code, line_size in zip(board.line_codes, sizes):
+                b, w = OmokAi.__line_scores(code, line_size, OmokAi.unit)
+                black.append(b)
+                white.append(w)
+        cells: np.ndarray = np.concatenate(lines)
+        index: np.ndarray = (np.arange(len(boards))[:, None] * size + cells).ravel()
+        scores: np.ndarray = np.empty((len(boards), 2, size), dtype=OmokAi.SCORE_DTYPE)
+        for i, parts in enumerate((black, white)):
+            scores[:, i] = np.bincount(
+                index, np.concatenate(parts), minlength=len(boards) * size
+            ).reshape(len(boards), size)
+        return scores.reshape(len(boards), 2, *shape)
+
+    @property
+    def opponent(self) -> Stone:
+        return Stone.WHITE if self.mystone == Stone.BLACK else Stone.BLACK
 
     @property
     def view_scoreboard(self):
+        if self.__scoreboard is None:
+            return np.zeros(self.__board.shape, dtype=self.SCORE_DTYPE)
         return self.__scoreboard.copy()
 
+    @property
+    def view_opponent_scoreboard(self):
+        if self.__opp_scoreboard is None:
+            return np.zeros(self.__board.shape, dtype=self.SCORE_DTYPE)
+        return self.__opp_scoreboard.copy()
+
+    @property
+    def view_moveboard(self):
+        """공격(내 점수)과 수비(상대 점수)를 attack, defence로 섞은 착수 우선순위"""
+        if self.__scoreboard is None:
+            return np.zeros(self.__board.shape)
+        return self.attack * self.__scoreboard + self.defence * self.__opp_scoreboard
+
     def __init_scoreboard(self):
         """scoreboard 0으로 초기화"""
-        self.__scoreboard: np.ndarray = np.zeros(self.__board.shape, dtype=int)
+        self.__scoreboard = np.zeros(self.__board.shape, dtype=self.SCORE_DTYPE)
+        self.__opp_scoreboard = np.zeros(self.__board.shape, dtype=self.SCORE_DTYPE)
 
     def __str__(self) -> str:
         result = "\n"
         result += "mystone : " + str(self.mystone) + '\n'
         result += "\nScore View\n"
-        for line in self.__scoreboard:
+        for line in self.view_scoreboard:
             for score in line:
                 result += str(score) + ' '                
             result += '\n'
@@ -254,50 +1639,167 @@ class OmokAi:
         
 
     def put_stone(self) -> None:
-        """착수할때 전후 board차이가 없으면 에러"""
-        before: np.ndarray = self.__board.viewcopy()
+        """착수할때 전후 board.version이 같으면 에러"""
+        version: int = self.__board.version
 
-        pass
+        idx = self.choose_move()
+        if idx is not None:
+            self.__board[idx] = self.mystone
 
-        after: np.ndarray = self.__board.viewcopy()
-        if (before == after).all():
+        if self.__board.version == version:
             raise OmokAiErrors.NoStoneChangedError
 
+    def choose_move(self) -> tuple[int, int] | None:
+        """내가 이기는 칸, 상대가 이기는 칸을 막는 칸 순으로 먼저 두고,
+        없으면 scoring 후 board.candidates 중 moveboard가 가장 큰 칸을 반환.
+        후보가 없을 때 빈 보드면 중앙, 빈칸이 없으면 None"""
+        move, cells = self.__forced_move()
+        if cells is None:
+            return move
+        self.scoring()
+        return self.__best_cell(cells)
+
+    @staticmethod
+    def choose_moves(ais) -> list[tuple[int, int] | None]:
+        """여러 OmokAi의 choose_move 결과를 한번에 계산.
+        scoring이 필요한 ai들은 보드 크기별로 batch_scoring 한번으로 점수판을 구함"""
+        moves: list[tuple[int, int] | None] = [None] * len(ais)
+        groups: dict[tuple[int, int], list] = {}
+        for i, ai in enumerate(ais):
+            move, cells = ai.__forced_move()
+            if cells is None:
+                moves[i] = move
+            else:
+                groups.setdefault(ai.__board.shape, []).append((i, ai, cells))
+
+        for group in groups.values():
+            scores: np.ndarray = OmokAi.batch_scoring([ai.__board for _, ai, _ in group])
+            for (i, ai, cells), (black, white) in zip(group, scores):
+                if ai.mystone == Stone.BLACK:
+                    ai.__scoreboard, ai.__opp_scoreboard = black, white
+                else:
+                    ai.__scoreboard, ai.__opp_scoreboard = white, black
+                moves[i] = ai.__best_cell(cells)
+        return moves
+
+    def __forced_move(self) -> tuple[tuple[int, int] | None, np.ndarray | None]:
+        """scoring 없이 정해지는 수. 정해지면 (수, None),
+        아니면 (None, moveboard로 고를 후보 칸의 평탄화 인덱스).
+        금수 규칙에서는 흑의 위협 중 금수 자리는 흑이 둘 수 없으므로 무시함"""
+        self.__check_stop()
+        forbids: bool = self.__board.rule.has_forbidden
+        allowed: np.ndarray | None = None
+        if self.mystone == Stone.BLACK and forbids:
+            allowed = ~self.__board.forbidden_mask(self.should_stop)
+            self.__check_stop()
+        for stone in (self.mystone, self.opponent):
+            threats: np.ndarray = self.__board.winning_moves(stone)
+            if stone == Stone.BLACK and forbids and len(threats):
+                if allowed is None:
+                    allowed = ~self.__board.forbidden_mask(self.should_stop)
+                    self.__check_stop()
+                threats = threats[allowed[threats[:, 0], threats[:, 1]]]
+            if len(threats):
+                return (int(threats[0, 0]), int(threats[0, 1])), None
+
+        cells: np.ndarray = self.__board.candidates.flat_indices()
+        if self.mystone == Stone.BLACK and allowed is not None:
+            cells = cells[allowed.ravel()[cells]]
+        if cells.size == 0:
+            centre: tuple[int, int] = self.__board.shape[0] // 2, self.__board.shape[1] // 2
+            return (centre if self.__board[centre] == Stone.EMPTY else None), None
+        return None, cells
+
+    def __best_cell(self, cells: np.ndarray) -> tuple[int, int]:
+        best: int = cells[np.argmax(self.view_moveboard.ravel()[cells])]
+        r, c = np.unravel_index(best, self.__board.shape)
+        return int(r), int(c)
+
+    def __check_stop(self) -> None:
+        if self.should_stop is not None and self.should_stop():
+            raise OmokAiErrors.StoppedError
+
     def scoring(self):
-        """현재 board 상황에 맞춰 scoreboard 갱신"""
+        """현재 board 상황에 맞춰 내 scoreboard와 상대 scoreboard를 갱신.
+        should_stop이 True가 되면 StoppedError로 중단"""
+        self.__check_stop()
+        match self.engine:
+            case "line":
+                self.__line_scoring()
+            case "conv":
+                self.__conv_scoring()
+            case _:
+                raise OmokAiErrors.UnknownEngineError
+
+    def __conv_scoring(self):
+        """내 돌, 상대 돌 마스크를 쌓아 _spread_scoreboards 한번으로 두 scoreboard 계산"""
+        codes: np.ndarray = self.__board.code_view()
+        masks: np.ndarray = np.stack([
+            codes == STONE_CODES[self.mystone], codes == STONE_CODES[self.opponent]
+        ])
+        stack_scores: np.ndarray = (np.arange(max(codes.shape) + 1) * self.unit).astype(self.SCORE_DTYPE)
+        self.__scoreboard, self.__opp_scoreboard = _spread_scoreboards(
+            masks, codes == STONE_CODES[Stone.EMPTY], stack_scores
+        )
+
+    LINE_CACHE_SIZE: int = 1 << 14
+    "__line_scores LRU 캐시에 보관할 최대 줄 개수"
+
+    @staticmethod
+    def line_cache_info():
+        """줄 점수 캐시의 hits, misses, maxsize, currsize"""
+        return OmokAi.__line_scores.cache_info()
+
+    @staticmethod
+    def line_cache_clear() -> None:
+        OmokAi.__line_scores.cache_clear()
+
+    def __line_scoring(self):
+        """한 줄씩 흑/백 line_score를 구해 두 scoreboard 계산.
+        Board가 유지하는 줄 정수 코드를 키로 line_score를 LRU 캐시에 저장해 재사용"""
         self.__init_scoreboard()
-        for line, flag, i in self.__line_range():
+        black_first: bool = self.mystone == Stone.BLACK
+        scoreboard: np.ndarray = self.__scoreboard.reshape(-1)
+        opp_scoreboard: np.ndarray = self.__opp_scoreboard.reshape(-1)
+        should_stop = self.should_stop
+        for code, cells in self.__line_range():
+            if should_stop is not None and should_stop():
+                raise OmokAiErrors.StoppedError
+            black, white = OmokAi.__line_scores(code, cells.size, self.unit)
+            scoreboard[cells] += black if black_first else white
+            opp_scoreboard[cells] += white if black_first else black
+
+    @staticmethod
+    @lru_cache(maxsize=LINE_CACHE_SIZE)
+    def __line_scores(code: int, size: int, unit: int) -> tuple[ndarray, ndarray]:
+        """Board.line_codes 형식의 한 줄에 대한 흑, 백 line_score.
+        stack을 세다가 끊기는 곳에서 __spread_stack으로 점수 전파"""
+        line: np.ndarray = np.array(
+            [_CODE_STONES[(code >> Board.LINE_BITS*j) & 3] for j in range(size)] + [Stone.EMPTY],
+            dtype=object
+        )
+        scores: list[ndarray] = []
+        for mystone in (Stone.BLACK, Stone.WHITE):
             stack: int = 0
-            line = np.concatenate([line, [Stone.EMPTY]])
-            line_score: np.ndarray = np.zeros(line.size, int)
+            line_score: np.ndarray = np.zeros(line.size, OmokAi.SCORE_DTYPE)
             for j, stone in enumerate(line):
-                if stone == self.mystone:
+                if stone == mystone:
                     stack += 1
                 elif stack != 0:
-                    self.__spread_stack(line, line_score, stack, j)
+                    OmokAi.__spread_stack(line, line_score, stack, j, unit)
                     stack = 0
             line_score = line_score[:-1]
-            match flag:
-                case 'x':
-                    self.__scoreboard[i,:] += line_score
-                case 'y':
-                    self.__scoreboard[:,i] += line_score
-                case 'xy+':
-                    self.__scoreboard += np.diag(line_score, k=i)
-                case 'xy-':
-                    self.__scoreboard += np.diag(line_score, k=-i)
-                case 'yx+':
-                    self.__scoreboard += np.fliplr(np.diag(line_score, k=i))
-                case 'yx-':
-                    self.__scoreboard += np.fliplr(np.diag(line_score, k=-i))
-
-    def __spread_stack(self,
-        line: ndarray, line_score: ndarray, stack: int, j: int
+            line_score.flags.writeable = False
+            scores.append(line_score)
+        return scores[0], scores[1]
+
+    @staticmethod
+    def __spread_stack(
+        line: ndarray, line_score: ndarray, stack: int, j: int, unit: int
     ) -> None:
         """한 줄에 대해 mystone이 있으면 주변으로 score 전파. 
         mystone이 여러개가 같이 있으면 주위 2칸에 해당 개수만큼 점수를 부여하며
         점수를 부여하는 위치에 mystone이 있으면 해당 칸을 무시하고 다음 칸에 부여"""
-        self.unit: int = 1
         target_idx: tuple = j, j+1, j-stack-1, j-stack-2
         
         for idx in target_idx:
@@ -305,33 +1807,10 @@ class OmokAi:
                 continue
             
             if line[idx] == Stone.EMPTY:
-                line_score[idx] += stack * self.unit
+                line_score[idx] += stack * unit
                 
 
     def __line_range(self):
         """점수 계산을 위해 board의 가로, 세로, 양대각선, 음대각선을 
-        한줄씩 반환하는 제너레이터"""
-        board = self.__board.viewcopy()
-        for i in range(self.__board.shape[0]):
-            line: np.ndarray = board[i,:]
-            yield line, "x", i
-
-        for i in range(self.__board.shape[1]):
-            line: np.ndarray = board[:,i]
-            yield line, "y", i
-
-        for i in range(self.__board.shape[0]):
-            line: np.ndarray = board.diagonal(i)
-            yield line, "xy+", i
-
-        for i in range(1, self.__board.shape[1]):
-            line: np.ndarray = board.diagonal(-i)
-            yield line, "xy-", i
-
-        for i in range(self.__board.shape[0]):
-            line: np.ndarray = np.fliplr(board).diagonal(i)
-            yield line, "yx+", i
-
-        for i in range(1, self.__board.shape[1]):
-            line: np.ndarray = np.fliplr(board).diagonal(-i)
-            yield line, "yx-", i
+        줄 정수 코드와 그 줄의 평탄화 인덱스로 한줄씩 반환하는 제너레이터"""
+        yield from zip(self.__board.line_codes, _line_cells(self.__board.shape))
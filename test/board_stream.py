@@ -0,0 +1,99 @@
+"""Board 변경을 접속한 클라이언트에게 최소한의 patch 메시지로 전달
+
+메시지는 json으로 바로 보낼 수 있는 dict이며 type에 따라
+checkpoint : 전체 상태. {"type", "version", "shape", "last_stone", "html"[, "heat"]}
+patch      : 한 칸 변경. {"type", "version", "cell", "stone"[, "heat"]}
+stone은 STONE_CODES 정수, heat는 바뀐 칸의 [행, 열, 점수] 목록
+"""
+import numpy as np
+from board_calculator import STONE_CODES, Board, BoardEvent, OmokAi, Stone
+
+
+class BoardStream:
+    """Board를 구독해 착수/무르기는 patch로, init_board 수정은 checkpoint로 보냄.
+    checkpoint_every개 patch마다 checkpoint를 새로 만들고,
+    늦게 들어온 클라이언트는 마지막 checkpoint와 그 뒤 patch들을 받아 따라잡음"""
+    def __init__(self, board: Board, checkpoint_every: int = 32, scorer: OmokAi | None = None) -> None:
+        """scorer를 주면 scorer.view_moveboard의 바뀐 칸을 heat로 함께 보냄"""
+        self.__board: Board = board
+        self.__checkpoint_every: int = checkpoint_every
+        self.__scorer: OmokAi | None = scorer
+        self.__clients: list = []
+        self.__heat: np.ndarray | None = None
+        "마지막으로 보낸 moveboard"
+        self.__checkpoint: dict = self.__make_checkpoint()
+        self.__backlog: list[dict] = []
+        "마지막 checkpoint 이후의 patch"
+        board.subscribe(self.__on_event)
+
+    @property
+    def checkpoint(self) -> dict:
+        return self.__checkpoint
+
+    @property
+    def backlog(self) -> tuple[dict, ...]:
+        return tuple(self.__backlog)
+
+    @property
+    def clients(self) -> tuple:
+        return tuple(self.__clients)
+
+    def join(self, client) -> None:
+        """client(message)를 등록하고 마지막 checkpoint와 밀린 patch를 먼저 보냄"""
+        client(self.__checkpoint)
+        for patch in self.__backlog:
+            client(patch)
+        self.__clients.append(client)
+
+    def leave(self, client) -> None:
+        self.__clients.remove(client)
+
+    def close(self) -> None:
+        """Board 구독을 해제"""
+        self.__board.unsubscribe(self.__on_event)
+        self.__clients.clear()
+
+    def __make_checkpoint(self) -> dict:
+        board: Board = self.__board
+        message: dict = {
+            "type": "checkpoint",
+            "version": board.version,
+            "shape": list(board.shape),
+            "last_stone": STONE_CODES[board.last_stone],
+            "html": board.to_html(),
+        }
+        if self.__scorer is not None:
+            self.__heat = self.__moveboard()
+            message["heat"] = self.__heat.tolist()
+        return message
+
+    def __moveboard(self) -> np.ndarray:
+        self.__scorer.scoring()
+        return self.__scorer.view_moveboard
+
+    def __heat_delta(self) -> list[list]:
+        """지난번 보낸 moveboard와 달라진 칸만 [행, 열, 점수]로.
+        점수는 checkpoint의 heat와 같은 float"""
+        heat: np.ndarray = self.__moveboard()
+        changed: np.ndarray = np.argwhere(heat != self.__heat)
+        self.__heat = heat
+        return [[int(r), int(c), float(heat[r, c])] for r, c in changed]
+
+    def __on_event(self, event: BoardEvent) -> None:
+        if event.kind == "reset" or len(self.__backlog) + 1 >= self.__checkpoint_every:
+            self.__checkpoint = self.__make_checkpoint()
+            self.__backlog.clear()
+            message: dict = self.__checkpoint
+        else:
+            stone: Stone = event.stone if event.kind == "place" else Stone.EMPTY
+            message = {
+                "type": "patch",
+                "version": event.version,
+                "cell": list(event.cell),
+                "stone": STONE_CODES[stone],
+            }
+            if self.__scorer is not None:
+                message["heat"] = self.__heat_delta()
+            self.__backlog.append(message)
+        for client in tuple(self.__clients):
+            client(message)
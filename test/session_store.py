@@ -0,0 +1,186 @@
+"""게임별 Board를 메모리에 두거나 디스크로 내보내는 세션 저장소
+
+최근에 쓴 max_active개의 Board만 메모리에 두고, 오래 쓰지 않은 Board는
+착수 기록(한 수에 2바이트)으로 파일에 저장한 뒤 메모리에서 버림.
+다시 요청되면 파일의 착수 기록을 순서대로 두어 Board와 부가 정보를 복원함
+"""
+import os
+import struct
+import time
+from collections import OrderedDict
+
+import numpy as np
+from board_calculator import Board, BoardErrors, Rule, Stone
+
+_HEADER: struct.Struct = struct.Struct("<BBBBB")
+"저장 형식, 높이, 너비, rule.k, rule.flags"
+
+_MOVES: int = 0
+"흑부터 번갈아 둔 착수 기록"
+_BYTES: int = 1
+"init_board 등으로 착수 기록만으로는 만들 수 없는 배치의 Board.to_bytes"
+
+
+def dump_board(board: Board) -> bytes:
+    """빈 보드에서 흑부터 둔 착수 기록만으로 현재 배치가 되면 착수 기록을,
+    아니면 Board.to_bytes를 담은 바이트열. 한 변이 255칸을 넘으면 BoardErrors.BytesLimitError"""
+    if max(board.shape) > 0xFF:
+        raise BoardErrors.BytesLimitError
+    moves: tuple[tuple[int, int], ...] = board.moves
+    header: tuple = (*board.shape, board.rule.k, board.rule.flags)
+    replayable: bool = (
+        board.move_count == len(moves)
+        and int(np.count_nonzero(board.code_view())) == len(moves)
+        and (not moves or board[moves[0]] == Stone.BLACK)
+    )
+    if replayable:
+        return _HEADER.pack(_MOVES, *header) + bytes(v for move in moves for v in move)
+    return _HEADER.pack(_BYTES, *header) + board.to_bytes()
+
+
+def load_board(data: bytes) -> Board:
+    """dump_board의 역변환. 착수 기록은 다시 두어 moves와 undo도 복원함"""
+    kind, height, width, k, flags = _HEADER.unpack_from(data)
+    rule: Rule = Rule.from_flags(k, flags, (height, width))
+    body: bytes = data[_HEADER.size:]
+    if kind == _BYTES:
+        return Board.from_bytes(body, rule)
+    if kind != _MOVES or len(body) % 2:
+        raise BoardErrors.BoardBytesError
+    board: Board = Board(rule=rule)
+    stones: tuple[Stone, Stone] = (Stone.BLACK, Stone.WHITE)
+    for i in range(0, len(body), 2):
+        try:
+            board[body[i], body[i + 1]] = stones[i // 2 % 2]
+        except BoardErrors.WinError:
+            pass
+    return board
+
+
+class SessionStore:
+    """게임 id -> Board 저장소. checkout한 Board는 checkin할 때까지 메모리에서 내보내지 않음"""
+    SUFFIX: str = ".omok"
+
+    def __init__(self, directory: str, max_active: int = 1024, clock=time.monotonic) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory: str = directory
+        self.max_active: int = max_active
+        "메모리에 둘 최대 Board 수. checkout 중인 Board가 더 많으면 그만큼 넘을 수 있음"
+        self.__clock = clock
+        self.__boards: OrderedDict[str, Board] = OrderedDict()
+        "메모리의 Board. 최근에 쓴 것이 뒤쪽"
+        self.__used: dict[str, float] = {}
+        "마지막으로 쓴 시각"
+        self.__pins: dict[str, int] = {}
+        "checkout 횟수"
+        self.spills: int = 0
+        self.loads: int = 0
+
+    @property
+    def active(self) -> int:
+        """메모리에 있는 Board 수"""
+        return len(self.__boards)
+
+    def __contains__(self, game_id: str) -> bool:
+        """쓸 수 없는 game_id는 False"""
+        if not self.valid_id(game_id):
+            return False
+        return game_id in self.__boards or os.path.exists(self.__path(game_id))
+
+    @staticmethod
+    def valid_id(game_id: str) -> bool:
+        """영문, 숫자, '-', '_'로만 이루어진 비어 있지 않은 id인지"""
+        return bool(game_id) and all(ch.isascii() and (ch.isalnum() or ch in "-_") for ch in game_id)
+
+    def __path(self, game_id: str) -> str:
+        if not self.valid_id(game_id):
+            raise KeyError(game_id)
+        return os.path.join(self.directory, game_id + self.SUFFIX)
+
+    def create(self, game_id: str, rule: Rule | None = None) -> Board:
+        board: Board = Board(rule=rule)
+        self.__path(game_id)
+        self.__add(game_id, board)
+        return board
+
+    def get(self, game_id: str) -> Board:
+        """메모리에 없으면 파일에서 복원. 없는 게임이면 KeyError"""
+        board: Board | None = self.__boards.get(game_id)
+        if board is None:
+            path: str = self.__path(game_id)
+            if not os.path.exists(path):
+                raise KeyError(game_id)
+            with open(path, "rb") as file:
+                board = load_board(file.read())
+            self.loads += 1
+            self.__add(game_id, board)
+        else:
+            self.__boards.move_to_end(game_id)
+            self.__used[game_id] = self.__clock()
+        return board
+
+    def checkout(self, game_id: str) -> Board:
+        """get과 같지만 checkin할 때까지 디스크로 내보내지 않음"""
+        board: Board = self.get(game_id)
+        self.__pins[game_id] = self.__pins.get(game_id, 0) + 1
+        return board
+
+    def checkin(self, game_id: str) -> None:
+        pins: int = self.__pins.pop(game_id) - 1
+        if pins:
+            self.__pins[game_id] = pins
+        self.__used[game_id] = self.__clock()
+        self.__evict()
+
+    def spill(self, game_id: str) -> None:
+        """Board를 파일로 저장하고 메모리에서 버림. checkout 중이면 저장만 함"""
+        self.__write(game_id, self.__boards[game_id])
+        if game_id not in self.__pins:
+            del self.__boards[game_id]
+            del self.__used[game_id]
+            self.spills += 1
+
+    def spill_idle(self, idle_seconds: float) -> int:
+        """idle_seconds 넘게 쓰지 않은 Board를 모두 내보내고 그 수를 반환"""
+        deadline: float = self.__clock() - idle_seconds
+        idle: list[str] = [
+            game_id for game_id, used in self.__used.items()
+            if used <= deadline and game_id not in self.__pins
+        ]
+        for game_id in idle:
+            self.spill(game_id)
+        return len(idle)
+
+    def flush(self) -> None:
+        """메모리의 모든 Board를 메모리에 둔 채 파일로 저장"""
+        for game_id, board in self.__boards.items():
+            self.__write(game_id, board)
+
+    def delete(self, game_id: str) -> None:
+        self.__boards.pop(game_id, None)
+        self.__used.pop(game_id, None)
+        self.__pins.pop(game_id, None)
+        try:
+            os.remove(self.__path(game_id))
+        except FileNotFoundError:
+            pass
+
+    def __add(self, game_id: str, board: Board) -> None:
+        self.__boards[game_id] = board
+        self.__used[game_id] = self.__clock()
+        self.__evict()
+
+    def __evict(self) -> None:
+        """max_active를 넘으면 checkout 중이 아닌 Board를 오래된 순서로 내보냄"""
+        excess: int = len(self.__boards) - self.max_active
+        if excess <= 0:
+            return
+        for game_id in [gid for gid in self.__boards if gid not in self.__pins][:excess]:
+            self.spill(game_id)
+
+    def __write(self, game_id: str, board: Board) -> None:
+        """임시 파일에 쓴 뒤 교체해서 중간에 끊겨도 이전 파일이 남도록 저장"""
+        path: str = self.__path(game_id)
+        with open(path + ".tmp", "wb") as file:
+            file.write(dump_board(board))
+        os.replace(path + ".tmp", path)
@@ -1,13 +1,41 @@
+import asyncio
+import json
+import os
+import struct
+import sys
+import tempfile
+import threading
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 from board_calculator import (
+    BatchBoard,
+    BatchBoardErrors,
     Board,
     BoardErrors,
+    BoardEvent,
+    BoardSnapshot,
+    KOREAN_RULE,
     OmokAi,
     OmokAiErrors,
+    RENJU_RULE,
+    Rule,
+    SparseBoard,
     Stone,
+    pack_codes,
+    to_codes,
+    unpack_codes,
 )
+from ai_analysis import AnalysisService
+from ai_batch import BatchQueue
+from ai_cache import Reply, ReplyCache
+from ai_pool import AiPool
+from board_stream import BoardStream
+from session_store import SessionStore, dump_board, load_board
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main
 
 
 class TestBoard(unittest.TestCase):
@@ -229,6 +257,177 @@ class TestBoard(unittest.TestCase):
         arr[3] = Stone.BLACK
         self.assertTrue((board[:] == Stone.EMPTY).all())
 
+    def test_view_read_only(self):
+        """board.view(), board.code_view()는 복사 없이 원본을 보여주고 수정은 막아야 함"""
+        board: Board = Board()
+        view: np.ndarray = board.view()
+        codes: np.ndarray = board.code_view()
+        with self.assertRaises(ValueError):
+            view[3, 3] = Stone.BLACK
+        with self.assertRaises(ValueError):
+            codes[3, 3] = 1
+        board[3,3] = Stone.BLACK
+        self.assertEqual(view[3, 3], Stone.BLACK)
+        self.assertEqual(codes[3, 3], 1)
+        board.init_board[4] = Stone.WHITE
+        self.assertTrue((codes[4] == 2).all())
+        self.assertTrue((to_codes(board.view()) == codes).all())
+
+    def test_version(self):
+        """착수, 무르기, init_board 수정마다 version이 증가해야 함"""
+        board: Board = Board()
+        versions: list[int] = [board.version]
+        board[7,7] = Stone.BLACK
+        versions.append(board.version)
+        board.undo()
+        versions.append(board.version)
+        board.init_board[0,0] = Stone.WHITE
+        versions.append(board.version)
+        with self.assertRaises(BoardErrors.NotEmptyBoardError):
+            board[0,0] = Stone.BLACK
+        versions.append(board.version)
+        self.assertEqual(versions, [0, 1, 2, 3, 3])
+
+    def test_subscribe(self):
+        """착수, 무르기, init_board 수정마다 구독자에게 BoardEvent가 전달되어야 함"""
+        board: Board = Board()
+        events: list[BoardEvent] = []
+        board.subscribe(events.append)
+        board[7,7] = Stone.BLACK
+        board[7,8] = Stone.WHITE
+        board.undo()
+        board.init_board[0] = Stone.WHITE
+        with self.assertRaises(BoardErrors.NotEmptyBoardError):
+            board[0,0] = Stone.BLACK
+        self.assertEqual(events, [
+            BoardEvent("place", (7, 7), Stone.BLACK, 1),
+            BoardEvent("place", (7, 8), Stone.WHITE, 2),
+            BoardEvent("remove", (7, 8), Stone.WHITE, 3),
+            BoardEvent("reset", None, Stone.EMPTY, 4),
+        ])
+
+        board.unsubscribe(events.append)
+        board[5,5] = Stone.WHITE
+        self.assertEqual(len(events), 4)
+
+    def test_subscribe_winning_move(self):
+        """WinError가 나는 착수도 알림이 먼저 전달되어야 함"""
+        board: Board = Board()
+        board.init_board[7, 3:7] = Stone.BLACK
+        events: list[BoardEvent] = []
+        board.subscribe(events.append)
+        with self.assertRaises(BoardErrors.WinError):
+            board[7,7] = Stone.BLACK
+        self.assertEqual(events, [BoardEvent("place", (7, 7), Stone.BLACK, board.version)])
+
+    def test_snapshot(self):
+        """snapshot은 이후 수정에 영향을 받지 않고 같은 배치끼리 같은 값이어야 함"""
+        board: Board = Board()
+        board[7,7] = Stone.BLACK
+        snapshot: BoardSnapshot = board.snapshot()
+        self.assertIs(board.snapshot(), snapshot)
+        self.assertTrue(np.shares_memory(snapshot.codes, board.code_view()))
+        with self.assertRaises(ValueError):
+            snapshot.codes[0, 0] = 1
+
+        board[7,8] = Stone.WHITE
+        self.assertFalse(np.shares_memory(snapshot.codes, board.code_view()))
+        self.assertEqual(snapshot[7,8], Stone.EMPTY)
+        self.assertEqual(snapshot[7,7], Stone.BLACK)
+        self.assertEqual((snapshot.last_stone, snapshot.version, snapshot.moves),
+                         (Stone.BLACK, 1, ((7, 7),)))
+        self.assertEqual(int((snapshot[7] == board.viewcopy()[7]).sum()), 14)
+
+        later: BoardSnapshot = board.snapshot()
+        self.assertNotEqual(later, snapshot)
+        board.undo()
+        self.assertEqual(later[7,8], Stone.WHITE)
+        self.assertEqual(board.snapshot(), snapshot)
+        self.assertEqual(hash(board.snapshot()), hash(snapshot))
+        self.assertEqual(len({snapshot, board.snapshot(), later}), 2)
+
+    def test_snapshot_after_init_board(self):
+        """init_board 수정 뒤에도 이전 snapshot은 그대로여야 함"""
+        board: Board = Board()
+        snapshot: BoardSnapshot = board.snapshot()
+        board.init_board[3] = Stone.BLACK
+        self.assertTrue((snapshot.codes == 0).all())
+        self.assertTrue((board.snapshot()[3] == Stone.BLACK).all())
+
+    def test_bytes_round_trip(self):
+        """to_bytes는 칸당 2비트로 묶고 from_bytes는 배치, last_stone, move_count를 복원해야 함"""
+        board: Board = Board()
+        for idx, stone in (((7,7), Stone.BLACK), ((7,8), Stone.WHITE), ((0,14), Stone.BLACK)):
+            board[idx] = stone
+        data: bytes = board.to_bytes()
+        self.assertEqual(len(data), Board.BYTES_HEADER.size + 57)
+
+        restored: Board = Board.from_bytes(data)
+        self.assertTrue((restored.viewcopy() == board.viewcopy()).all())
+        self.assertEqual(restored.last_stone, Stone.BLACK)
+        self.assertEqual(restored.move_count, 3)
+        self.assertEqual(restored.moves, ())
+        self.assertEqual(restored.zobrist, board.zobrist)
+        restored[8,8] = Stone.WHITE
+        self.assertEqual(restored.move_count, 4)
+
+        odd: Board = Board((9, 7))
+        odd.init_board[8, :] = Stone.WHITE
+        self.assertTrue((Board.from_bytes(odd.to_bytes()).viewcopy() == odd.viewcopy()).all())
+
+    def test_bytes_errors(self):
+        """잘못된 바이트열이나 다른 크기의 rule은 에러"""
+        data: bytes = Board().to_bytes()
+        with self.assertRaises(BoardErrors.BoardBytesError):
+            Board.from_bytes(data[:-1])
+        with self.assertRaises(BoardErrors.BoardBytesError):
+            Board.from_bytes(data[:-1] + b"\xff")
+        with self.assertRaises(BoardErrors.BoardShapeError):
+            Board.from_bytes(data, Rule(shape=(19, 19)))
+        self.assertEqual(Board.from_bytes(data, Rule(k=4)).rule.k, 4)
+
+    def test_bytes_limits(self):
+        """머리말에 담을 수 없는 보드 크기나 move_count는 struct.error가 아닌 BytesLimitError"""
+        with self.assertRaises(BoardErrors.BytesLimitError):
+            Board((256, 1)).to_bytes()
+        self.assertEqual(len(Board((255, 1)).to_bytes()), Board.BYTES_HEADER.size + 64)
+        height, width, last, _ = Board.BYTES_HEADER.unpack_from(Board().to_bytes())
+        board: Board = Board.from_bytes(Board.BYTES_HEADER.pack(height, width, last, 0xFFFF) + bytes(57))
+        board.to_bytes()
+        board[7,7] = Stone.BLACK
+        with self.assertRaises(BoardErrors.BytesLimitError):
+            board.to_bytes()
+        with self.assertRaises(BoardErrors.BytesLimitError):
+            dump_board(Board((300, 300)))
+
+    def test_pack_codes_batch(self):
+        """pack_codes, unpack_codes는 (N, H, W) 배열을 한번에 변환해야 함"""
+        rng = np.random.default_rng(0)
+        codes: np.ndarray = rng.integers(0, 3, size=(6, 15, 15)).astype(np.int8)
+        packed: np.ndarray = pack_codes(codes)
+        self.assertEqual(packed.shape, (6, 57))
+        self.assertTrue((unpack_codes(packed, (15, 15)) == codes).all())
+        self.assertTrue((packed[2] == pack_codes(codes[2])).all())
+
+    def test_render(self):
+        """to_text는 print(board)의 보드 부분과 같고 to_html은 칸마다 돌 class를 가져야 함"""
+        board: Board = Board((3, 4))
+        board[1,2] = Stone.BLACK
+        board[0,0] = Stone.WHITE
+        self.assertEqual(board.to_text(), "○ ` ` ` \n` ` ● ` \n` ` ` ` \n")
+        self.assertTrue(str(board).endswith("\nBoard View\n" + board.to_text()))
+
+        html: str = board.to_html()
+        self.assertTrue(html.startswith('<table class="omok-board"><tr><td class="white"></td>'))
+        self.assertEqual(html.count("<tr>"), 3)
+        self.assertEqual(html.count('class="empty"'), 10)
+        self.assertEqual(html.count('class="black"'), 1)
+
+        snapshot = board.snapshot()
+        board.undo()
+        self.assertEqual(snapshot.to_html(), html)
+        self.assertNotEqual(board.to_html(), html)
+
     def test_deepcopy_integrity(self):
         """board.deepcopy() 기능이 board에 대해 깊은 복사인지 확인"""
         board: Board = Board()
@@ -237,6 +436,201 @@ class TestBoard(unittest.TestCase):
         boardcopy.init_board[3] = Stone.BLACK
         self.assertFalse((boardcopy.viewcopy() == board.viewcopy()).all())
 
+    def test_undo(self):
+        """board.undo()는 마지막 착수와 last_stone을 되돌려야 함"""
+        board: Board = Board()
+        with self.assertRaises(BoardErrors.NoMoveToUndoError):
+            board.undo()
+        board[7,7] = Stone.BLACK
+        board[7,8] = Stone.WHITE
+        self.assertEqual(board.moves, ((7,7), (7,8)))
+        self.assertEqual(board.undo(), (7,8))
+        self.assertEqual(board[7,8], Stone.EMPTY)
+        self.assertEqual(board.last_stone, Stone.BLACK)
+        board.undo()
+        self.assertEqual(board.last_stone, Stone.EMPTY)
+        self.assertTrue((board[:] == Stone.EMPTY).all())
+
+    def test_candidates(self):
+        """돌 주변 2칸 이내의 빈칸만 착수 후보가 되어야 함"""
+        board: Board = Board()
+        self.assertEqual(len(board.candidates), 0)
+        board[0,0] = Stone.BLACK
+        self.assertEqual(len(board.candidates), 8)
+        board[7,7] = Stone.WHITE
+        self.assertEqual(len(board.candidates), 8 + 24)
+        self.assertFalse(board.candidates.mask[7,7])
+        self.assertTrue(board.candidates.mask[5,9])
+        self.assertFalse(board.candidates.mask[4,7])
+        with self.assertRaises(ValueError):
+            board.candidates.mask[4,7] = True
+
+        board.undo()
+        self.assertEqual(len(board.candidates), 8)
+        self.assertEqual(
+            sorted(map(tuple, board.candidates.indices().tolist())),
+            [(0,1), (0,2), (1,0), (1,1), (1,2), (2,0), (2,1), (2,2)]
+        )
+
+    def test_candidates_after_init_board(self):
+        """init_board로 수정하면 착수 후보를 다시 계산해야 함"""
+        board: Board = Board()
+        board[3,3] = Stone.BLACK
+        board.init_board[10,10:12] = Stone.WHITE
+        expected = np.zeros(board.shape, dtype=bool)
+        expected[1:6, 1:6] = True
+        expected[8:13, 8:14] = True
+        expected[3,3] = expected[10,10] = expected[10,11] = False
+        self.assertTrue((board.candidates.mask == expected).all())
+        self.assertEqual(board.moves, ())
+
+    def test_windows_count(self):
+        """15x15 보드에는 길이 5 구간이 572개 있고 각 칸은 최대 20개 구간에 속함"""
+        board: Board = Board()
+        self.assertEqual(len(board.windows), 572)
+        board[7,7] = Stone.BLACK
+        self.assertEqual(board.windows.counts(Stone.BLACK).sum(), 20)
+        board[0,0] = Stone.WHITE
+        self.assertEqual(board.windows.counts(Stone.WHITE).sum(), 3)
+
+    def test_windows_incremental_same_with_rebuild(self):
+        """착수/무르기로 갱신한 구간별 개수와 평가가 처음부터 계산한 값과 같아야 함"""
+        rng = np.random.default_rng(1)
+        board: Board = Board()
+        board.windows
+        stones = (Stone.BLACK, Stone.WHITE)
+        cells = rng.permutation(225)[:40]
+        for i, cell in enumerate(cells):
+            try:
+                board[divmod(int(cell), 15)] = stones[i % 2]
+            except BoardErrors.WinError:
+                pass
+        for _ in range(10):
+            board.undo()
+        rebuilt: Board = board.deepcopy()
+        for stone in stones:
+            self.assertTrue((board.windows.counts(stone) == rebuilt.windows.counts(stone)).all())
+            self.assertEqual(board.windows.evaluate(stone), rebuilt.windows.evaluate(stone))
+        self.assertEqual(board.windows.evaluate(Stone.BLACK), -board.windows.evaluate(Stone.WHITE))
+
+    def test_lazy_auxiliary(self):
+        """착수 뒤 처음 만든 windows, candidates는 처음부터 갱신한 것과 같아야 함"""
+        eager: Board = Board()
+        eager.windows, eager.candidates
+        lazy: Board = Board()
+        for board in (eager, lazy):
+            board[7,7] = Stone.BLACK
+            board[7,8] = Stone.WHITE
+            board[8,8] = Stone.BLACK
+            board.undo()
+        self.assertEqual(lazy.windows.evaluate(Stone.BLACK), eager.windows.evaluate(Stone.BLACK))
+        self.assertTrue((lazy.windows.counts(Stone.WHITE) == eager.windows.counts(Stone.WHITE)).all())
+        self.assertTrue((lazy.candidates.mask == eager.candidates.mask).all())
+        self.assertFalse(hasattr(lazy, "__dict__"))
+        with self.assertRaises(AttributeError):
+            lazy.score = 0
+
+    def test_windows_threats(self):
+        """내 돌 4개, 상대 돌 0개인 구간의 빈칸이 승리 위협"""
+        board: Board = Board()
+        board.init_board[7,(3,4,6,7)] = Stone.BLACK
+        board.init_board[(2,3,4,5),(2,3,4,5)] = Stone.WHITE
+        board.init_board[6,6] = Stone.BLACK
+        self.assertEqual(board.windows.threats(Stone.BLACK).tolist(), [[7,5]])
+        self.assertEqual(board.windows.threats(Stone.WHITE).tolist(), [[1,1]])
+        self.assertFalse(board.windows.has_five(Stone.BLACK))
+        board.init_board[7,5] = Stone.BLACK
+        self.assertTrue(board.windows.has_five(Stone.BLACK))
+
+    def test_winning_moves_exact_overline(self):
+        """exact 규칙에서는 장목이 되는 위협 칸은 승리하는 수가 아니므로 두거나 막지 않아야 함"""
+        black = [(7,8), (7,10), (7,11), (7,12), (7,13)]
+        for rule, expected in ((Rule(), [[7,9], [7,14]]), (Rule(exact=True), [[7,14]])):
+            board: Board = Board(rule=rule)
+            board.init_board[tuple(zip(*black))] = Stone.BLACK
+            board.init_board[(0,0,0),(0,2,4)] = Stone.WHITE
+            self.assertEqual(board.windows.threats(Stone.BLACK).tolist(), [[7,9], [7,14]])
+            self.assertEqual(board.winning_moves(Stone.BLACK).tolist(), expected)
+            self.assertEqual(board.winning_moves(Stone.WHITE).tolist(), [])
+            self.assertEqual(OmokAi(board, Stone.BLACK).choose_move(), tuple(expected[0]))
+            self.assertEqual(OmokAi(board, Stone.WHITE).choose_move(), tuple(expected[0]))
+
+    def __assert_line_codes(self, board: Board):
+        """board.line_codes가 보드 내용으로 새로 계산한 값과 같은지 확인"""
+        codes = {Stone.EMPTY: 0, Stone.BLACK: 1, Stone.WHITE: 2}
+        arr = board.viewcopy()
+        lines = [arr[i,:] for i in range(15)] + [arr[:,i] for i in range(15)]
+        lines += [arr.diagonal(i) for i in range(15)] + [arr.diagonal(-i) for i in range(1, 15)]
+        flipped = np.fliplr(arr)
+        lines += [flipped.diagonal(i) for i in range(15)] + [flipped.diagonal(-i) for i in range(1, 15)]
+        expected = tuple(
+            sum(codes[stone] << Board.LINE_BITS*j for j, stone in enumerate(line))
+            for line in lines
+        )
+        self.assertEqual(board.line_codes, expected)
+
+    def test_line_codes(self):
+        """착수, 무르기, init_board마다 줄 정수 코드가 갱신되어야 함"""
+        board: Board = Board()
+        self.assertEqual(len(board.line_codes), 15 + 15 + 29 + 29)
+        self.assertTrue(all(code == 0 for code in board.line_codes))
+        board[7,3] = Stone.BLACK
+        board[2,4] = Stone.WHITE
+        self.assertEqual(board.line_codes[7], 1 << 2*3)
+        self.assertEqual(board.line_codes[15 + 4], 2 << 2*2)
+        self.__assert_line_codes(board)
+        self.assertEqual(len(board.cell_lines((7,3))), 4)
+
+        board.undo()
+        self.__assert_line_codes(board)
+        board.init_board[(1,2,3),(5,5,9)] = Stone.WHITE
+        self.__assert_line_codes(board)
+
+    def test_board_shape(self):
+        """Board(shape)로 15x15가 아닌 보드를 만들 수 있어야 함"""
+        for shape in ((9, 9), (19, 19), (9, 19)):
+            board: Board = Board(shape)
+            self.assertEqual(board.shape, shape)
+            self.assertEqual(board[shape[0] - 1, shape[1] - 1], Stone.EMPTY)
+        with self.assertRaises(BoardErrors.BoardShapeError):
+            Board((0, 15))
+        with self.assertRaises(BoardErrors.BoardShapeError):
+            Board((15,))
+
+    def test_win_on_other_shapes(self):
+        """보드 크기와 상관없이 모든 방향의 오목을 판정해야 함"""
+        board: Board = Board((9, 19))
+        board.init_board[(0,1,2,3,4),(14,15,16,17,18)] = Stone.BLACK
+        with self.assertRaises(BoardErrors.WinError):
+            board._Board__judge_win()
+        board: Board = Board((9, 19))
+        board.init_board[(4,5,6,7,8),(18,17,16,15,14)] = Stone.WHITE
+        with self.assertRaises(BoardErrors.WinError):
+            board._Board__judge_win()
+        board: Board = Board((19, 19))
+        board[18,14] = Stone.BLACK
+        board[0,0] = Stone.WHITE
+        self.assertEqual(len(board.windows), 19*15*2 + 15*15*2)
+
+    def test_zobrist(self):
+        """같은 배치는 수순과 상관없이 같은 zobrist 해시를 가져야 함"""
+        board: Board = Board()
+        self.assertEqual(board.zobrist, 0)
+        board[7,7] = Stone.BLACK
+        board[7,8] = Stone.WHITE
+        board[8,8] = Stone.BLACK
+        other: Board = Board()
+        other[8,8] = Stone.BLACK
+        other[7,8] = Stone.WHITE
+        other[7,7] = Stone.BLACK
+        self.assertEqual(board.zobrist, other.zobrist)
+        self.assertEqual(board.zobrist, board.deepcopy().zobrist)
+        board.undo()
+        self.assertNotEqual(board.zobrist, other.zobrist)
+        board.undo()
+        board.undo()
+        self.assertEqual(board.zobrist, 0)
+
 
 class TestOmokAi(unittest.TestCase):
     def test_has_its_color_var(self):
@@ -266,7 +660,7 @@ class TestOmokAi(unittest.TestCase):
         ai: OmokAi = OmokAi(board, Stone.BLACK)
         self.assertEqual(ai.view_scoreboard.shape, board.shape)
 
-    def untest_has_output_to_board(self):
+    def test_has_output_to_board(self):
         """스스로 보드에 착수할 수 있어야 함"""
         board: Board = Board()
         ai: OmokAi = OmokAi(board, Stone.BLACK)
@@ -281,10 +675,13 @@ class TestOmokAi(unittest.TestCase):
         ai_b: OmokAi = OmokAi(board, Stone.BLACK)
         ai_w: OmokAi = OmokAi(board, Stone.WHITE)
 
+        for _ in range(5):
+            ai_b.put_stone()
+            ai_w.put_stone()
+
+        board.init_board[:] = Stone.WHITE
         with self.assertRaises(OmokAiErrors.NoStoneChangedError):
-            for _ in range(5):
-                ai_b.put_stone()
-                ai_w.put_stone()
+            ai_b.put_stone()
 
     def test_basic_scoring(self):
         """해당 줄에서 돌이 연속된 정도에 비례해 점수 부여"""
@@ -325,5 +722,1183 @@ class TestOmokAi(unittest.TestCase):
             print(i)
         self.assertFalse(True)
 
+    def test_dual_scoring(self):
+        """scoring 한번으로 상대 scoreboard도 상대 ai의 scoreboard와 같게 계산"""
+        board: Board = Board()
+        board.init_board[(7,7,8,6,9),(7,8,8,9,5)] = Stone.BLACK
+        board.init_board[(6,7,5,10),(6,9,9,10)] = Stone.WHITE
+        ai_b: OmokAi = OmokAi(board, Stone.BLACK)
+        ai_w: OmokAi = OmokAi(board, Stone.WHITE)
+        ai_b.scoring()
+        ai_w.scoring()
+        self.assertTrue((ai_b.view_opponent_scoreboard == ai_w.view_scoreboard).all())
+        self.assertTrue((ai_w.view_opponent_scoreboard == ai_b.view_scoreboard).all())
+
+    def test_moveboard_blend(self):
+        """moveboard는 attack, defence 가중치로 두 scoreboard를 섞은 값"""
+        board: Board = Board()
+        board.init_board[7,7:9] = Stone.BLACK
+        board.init_board[3,3] = Stone.WHITE
+        ai: OmokAi = OmokAi(board, Stone.WHITE, attack=2, defence=0.5)
+        ai.scoring()
+        expected = 2*ai.view_scoreboard + 0.5*ai.view_opponent_scoreboard
+        self.assertTrue((ai.view_moveboard == expected).all())
+
+    def test_put_stone_on_best_moveboard(self):
+        """빈 보드에서는 중앙에, 이후에는 moveboard가 가장 큰 빈칸에 착수"""
+        board: Board = Board()
+        ai_b: OmokAi = OmokAi(board, Stone.BLACK)
+        ai_w: OmokAi = OmokAi(board, Stone.WHITE, attack=1, defence=2)
+        ai_b.put_stone()
+        self.assertEqual(board[7,7], Stone.BLACK)
+
+        ai_w.scoring()
+        moveboard = ai_w.view_moveboard
+        best = moveboard[board.viewcopy() == Stone.EMPTY].max()
+        ai_w.put_stone()
+        placed = np.argwhere(board.viewcopy() == Stone.WHITE)[0]
+        self.assertEqual(moveboard[tuple(placed)], best)
+
+    def test_put_stone_wins_or_blocks(self):
+        """이길 수 있으면 이기고, 아니면 상대의 승리 위협을 막아야 함"""
+        board: Board = Board()
+        board.init_board[7,3:7] = Stone.BLACK
+        board.init_board[(0,0,0),(0,1,2)] = Stone.WHITE
+        ai_w: OmokAi = OmokAi(board, Stone.WHITE)
+        self.assertIn(ai_w.choose_move(), [(7,2), (7,7)])
+
+        board.init_board[0,3] = Stone.WHITE
+        self.assertEqual(ai_w.choose_move(), (0,4))
+
+    def test_unknown_engine(self):
+        """ENGINES에 없는 engine은 UnknownEngineError"""
+        with self.assertRaises(OmokAiErrors.UnknownEngineError):
+            OmokAi(Board(), Stone.BLACK, engine="tree")
+
+    def test_conv_engine_basic_scoring(self):
+        """conv engine도 돌 하나가 주변 2칸에 unit만큼 점수 부여"""
+        board: Board = Board()
+        ai_b: OmokAi = OmokAi(board, Stone.BLACK, engine="conv")
+        board.init_board[7,7] = Stone.BLACK
+        ai_b.scoring()
+        self.assertTrue((ai_b.view_scoreboard[(5,6,8,9),(5,6,8,9)] == ai_b.unit).all())
+        self.assertTrue((ai_b.view_scoreboard[(7,7,7,7),(5,6,8,9)] == ai_b.unit).all())
+        self.assertEqual(ai_b.view_scoreboard.sum(), 16*ai_b.unit)
+
+    def test_conv_engine_same_with_line_engine(self):
+        """conv engine의 두 scoreboard가 line engine과 같아야 함"""
+        rng = np.random.default_rng(2)
+        for p in np.linspace(0.05, 0.9, 10):
+            board: Board = Board()
+            board.init_board[:] = rng.choice(
+                [Stone.EMPTY, Stone.BLACK, Stone.WHITE],
+                size=board.shape, p=[1 - p, p*0.5, p*0.5]
+            )
+            line: OmokAi = OmokAi(board, Stone.WHITE)
+            conv: OmokAi = OmokAi(board, Stone.WHITE, engine="conv")
+            line.scoring()
+            conv.scoring()
+            self.assertTrue((line.view_scoreboard == conv.view_scoreboard).all())
+            self.assertTrue((line.view_opponent_scoreboard == conv.view_opponent_scoreboard).all())
+
+    def test_line_cache(self):
+        """같은 줄은 캐시된 line_score를 재사용하고 hits/misses를 집계해야 함"""
+        OmokAi.line_cache_clear()
+        board: Board = Board()
+        board.init_board[7,7:9] = Stone.BLACK
+        board.init_board[3,3] = Stone.WHITE
+        ai: OmokAi = OmokAi(board, Stone.BLACK)
+        ai.scoring()
+        before = ai.view_scoreboard
+        first = OmokAi.line_cache_info()
+        self.assertGreater(first.misses, 0)
+        self.assertLessEqual(first.currsize, OmokAi.LINE_CACHE_SIZE)
+
+        OmokAi(board, Stone.WHITE).scoring()
+        ai.scoring()
+        second = OmokAi.line_cache_info()
+        self.assertEqual(second.misses, first.misses)
+        self.assertGreater(second.hits, first.hits)
+        self.assertTrue((ai.view_scoreboard == before).all())
+
+    def test_scoring_on_other_shapes(self):
+        """직사각형 보드에서도 line, conv engine 점수가 같아야 함"""
+        rng = np.random.default_rng(3)
+        board: Board = Board((9, 13))
+        board.init_board[:] = rng.choice(
+            [Stone.EMPTY, Stone.BLACK, Stone.WHITE], size=board.shape, p=[0.6, 0.2, 0.2]
+        )
+        line: OmokAi = OmokAi(board, Stone.BLACK)
+        conv: OmokAi = OmokAi(board, Stone.BLACK, engine="conv")
+        line.scoring()
+        conv.scoring()
+        self.assertEqual(line.view_scoreboard.shape, (9, 13))
+        self.assertTrue((line.view_scoreboard == conv.view_scoreboard).all())
+        self.assertTrue((line.view_scoreboard == OmokAi.batch_scoring([board])[0, 0]).all())
+
+    def test_batch_scoring_shape(self):
+        """batch_scoring은 (N, 2, H, W) 흑/백 점수판을 반환해야 함"""
+        boards = [Board() for _ in range(3)]
+        scores = OmokAi.batch_scoring(boards)
+        self.assertEqual(scores.shape, (3, 2) + boards[0].shape)
+        self.assertTrue((scores == 0).all())
+
+    def test_batch_scoring_mixed_shapes(self):
+        """크기가 다른 Board를 섞으면 BoardShapeError를 내야 함"""
+        boards: list[Board] = [Board((9, 9)), Board()]
+        with self.assertRaises(BoardErrors.BoardShapeError):
+            OmokAi.batch_scoring(boards)
+        with self.assertRaises(BoardErrors.BoardShapeError):
+            OmokAi.batch_scoring(boards, np.arange(16))
+
+    def test_batch_scoring_empty(self):
+        """빈 시퀀스는 빈 배열과 같이 (0, 2, H, W) 점수판을 반환해야 함"""
+        expected = OmokAi.batch_scoring(np.zeros((0,) + Board().shape, dtype=int)).shape
+        self.assertEqual(expected, (0, 2) + Board().shape)
+        self.assertEqual(OmokAi.batch_scoring([]).shape, expected)
+        self.assertEqual(OmokAi.batch_scoring([], np.arange(16)).shape, expected)
+
+    def test_batch_scoring_same_with_scoring(self):
+        """batch_scoring 결과가 보드, 색깔별 scoring 결과와 같아야 함"""
+        rng = np.random.default_rng(0)
+        boards: list[Board] = []
+        for p in np.linspace(0.05, 0.9, 20):
+            board: Board = Board()
+            board.init_board[:] = rng.choice(
+                [Stone.EMPTY, Stone.BLACK, Stone.WHITE],
+                size=board.shape, p=[1 - p, p*0.5, p*0.5]
+            )
+            boards.append(board)
+        scores = OmokAi.batch_scoring(np.stack([board.viewcopy() for board in boards]))
+        self.assertTrue((OmokAi.batch_scoring(boards) == scores).all())
+        for board, score in zip(boards, scores):
+            for stone, expected in zip(OmokAi.BATCH_STONES, score):
+                ai: OmokAi = OmokAi(board, stone)
+                ai.scoring()
+                self.assertTrue((ai.view_scoreboard == expected).all())
+
+    def test_batch_scoring_stack_scores(self):
+        """stack_scores로 stack별 점수를 바꿀 수 있어야 함"""
+        board: Board = Board()
+        board.init_board[7,7:9] = Stone.BLACK
+        stack_scores = np.array([0, 1, 10, 100, 1000, 10000, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+        scores = OmokAi.batch_scoring([board], stack_scores)
+        self.assertEqual(scores[0, 0, 7, 6], 10)
+        self.assertEqual(scores[0, 0, 7, 5], 10)
+        self.assertEqual(scores[0, 0, 5, 7], 1)
+        self.assertTrue((scores[0, 1] == 0).all())
+
+    def test_choose_moves(self):
+        """choose_moves는 각 ai의 choose_move와 같은 수를 반환해야 함"""
+        boards: list[Board] = [Board() for _ in range(4)] + [Board((9, 9)), Board(rule=RENJU_RULE)]
+        boards[1][7,7] = Stone.BLACK
+        boards[2].init_board[(7, 3, 3), (3, 7, 8)] = Stone.BLACK
+        boards[2].init_board[(8, 9), (8, 9)] = Stone.WHITE
+        boards[3].init_board[7, 3:7] = Stone.WHITE
+        boards[4].init_board[(4, 5), (4, 5)] = Stone.BLACK
+        boards[5].init_board[(7, 7, 5, 6), (5, 6, 7, 7)] = Stone.BLACK
+        boards[5].init_board[(0, 14), (0, 14)] = Stone.WHITE
+        stones = [Stone.BLACK, Stone.WHITE, Stone.WHITE, Stone.BLACK, Stone.WHITE, Stone.BLACK]
+        expected = [OmokAi(board, stone).choose_move() for board, stone in zip(boards, stones)]
+        ais: list[OmokAi] = [OmokAi(board, stone) for board, stone in zip(boards, stones)]
+        self.assertEqual(OmokAi.choose_moves(ais), expected)
+        self.assertEqual(OmokAi.choose_moves([]), [])
+        moveboard = ais[2].view_moveboard
+        ai: OmokAi = OmokAi(boards[2], Stone.WHITE)
+        ai.scoring()
+        self.assertTrue((moveboard == ai.view_moveboard).all())
+
+    def test_batch_queue(self):
+        """동시에 들어온 요청은 한 묶음으로 계산하고 각 요청에 choose_move 결과를 돌려줘야 함"""
+        boards: list[Board] = [Board() for _ in range(5)]
+        for i, board in enumerate(boards):
+            board[7, i] = Stone.BLACK
+        queue: BatchQueue = BatchQueue(max_batch=8, max_delay=0.01)
+
+        async def request_all():
+            return await asyncio.gather(*[queue.choose_move(board, Stone.WHITE) for board in boards])
+
+        moves = asyncio.run(request_all())
+        self.assertEqual(moves, [OmokAi(board, Stone.WHITE).choose_move() for board in boards])
+        self.assertEqual(queue.average_batch, 5)
+
+        queue.max_batch = 2
+        asyncio.run(request_all())
+        self.assertEqual(queue.pending, 0)
+        self.assertEqual(queue.average_batch, 10 / 4)
+
+        ai: OmokAi = OmokAi(boards[0], Stone.WHITE)
+        move = ai.choose_move()
+        self.assertEqual(asyncio.run(queue.choose_reply(boards[0], Stone.WHITE)),
+                         Reply(move, ai.view_moveboard[move].item()))
+
+    def test_batch_queue_off_loop(self):
+        """묶음 계산은 executor에서 실행되어 그동안 이벤트 루프가 다른 작업을 처리해야 함"""
+        board: Board = Board()
+        board[7,7] = Stone.BLACK
+        gate: threading.Event = threading.Event()
+
+        async def request_while_busy():
+            with ThreadPoolExecutor(1) as executor:
+                executor.submit(gate.wait)
+                queue: BatchQueue = BatchQueue(max_batch=1, executor=executor)
+                task: asyncio.Task = asyncio.create_task(queue.choose_move(board, Stone.WHITE))
+                ticks: int = 0
+                for _ in range(10):
+                    await asyncio.sleep(0)
+                    ticks += 1
+                self.assertFalse(task.done())
+                gate.set()
+                return ticks, await task
+
+        ticks, move = asyncio.run(request_while_busy())
+        self.assertEqual(ticks, 10)
+        self.assertEqual(move, OmokAi(board, Stone.WHITE).choose_move())
+
+
+class TestRule(unittest.TestCase):
+    def __play(self, board, black, white):
+        """흑, 백 수순을 번갈아 두고 마지막 흑 착수의 WinError 여부를 반환"""
+        for b, w in zip(black, white):
+            board[b] = Stone.BLACK
+            board[w] = Stone.WHITE
+        try:
+            board[black[-1]] = Stone.BLACK
+        except BoardErrors.WinError:
+            return True
+        return False
+
+    def test_default_rule(self):
+        """기본 규칙은 15x15 보드에서 5개 이상 연속이면 승리"""
+        board: Board = Board()
+        self.assertEqual(board.rule, Rule(5, False, (15, 15)))
+        self.assertEqual(Board((9, 9)).rule.shape, (9, 9))
+        self.assertEqual(Board(rule=Rule(shape=(19, 19))).shape, (19, 19))
+        with self.assertRaises(BoardErrors.BoardShapeError):
+            Board((15, 15), Rule(shape=(19, 19)))
+        with self.assertRaises(BoardErrors.RuleError):
+            Board(rule=Rule(k=0))
+
+    def test_connect_k(self):
+        """rule.k개 연속일 때 승리"""
+        black = [(4,0), (4,1), (4,2), (4,3)]
+        white = [(0,0), (0,2), (0,4)]
+        self.assertTrue(self.__play(Board(rule=Rule(k=4, shape=(9, 9))), black, white))
+        self.assertTrue(self.__play(SparseBoard(rule=Rule(k=4)), black, white))
+
+        black = [(4,0), (4,1), (4,2), (4,3), (4,4), (4,5)]
+        white = [(0,0), (0,2), (0,4), (0,6), (0,8)]
+        board: Board = Board(rule=Rule(k=6, shape=(19, 19)))
+        for b, w in zip(black[:-1], white):
+            board[b] = Stone.BLACK
+            board[w] = Stone.WHITE
+        with self.assertRaises(BoardErrors.WinError):
+            board[black[-1]] = Stone.BLACK
+
+    def test_exact_rule_overline(self):
+        """exact 규칙에서는 k개를 넘는 장목이 승리가 아님"""
+        black = [(7,1), (7,2), (7,4), (7,5), (7,6), (7,3)]
+        white = [(0,0), (0,2), (0,4), (0,6), (0,8)]
+        self.assertFalse(self.__play(Board(rule=Rule(exact=True)), black, white))
+        self.assertTrue(self.__play(Board(), black, white))
+        self.assertFalse(self.__play(SparseBoard(rule=Rule(exact=True)), black, white))
+
+        board: Board = Board(rule=Rule(exact=True))
+        board.init_board[7,1:7] = Stone.BLACK
+        board._Board__judge_win()
+        board.init_board[7,1] = Stone.EMPTY
+        with self.assertRaises(BoardErrors.WinError):
+            board._Board__judge_win()
+
+    def test_flags(self):
+        """flags와 from_flags로 k, shape을 뺀 규칙을 되돌릴 수 있어야 함"""
+        for rule in (Rule(), Rule(k=4, exact=True, shape=(9, 9)), KOREAN_RULE, RENJU_RULE):
+            self.assertEqual(Rule.from_flags(rule.k, rule.flags, rule.shape), rule)
+        self.assertEqual(RENJU_RULE.flags, 0b1110)
+
+    def test_batch_board_rule(self):
+        """BatchBoard도 rule의 k, exact, shape을 따라야 함"""
+        batch: BatchBoard = BatchBoard(2, rule=Rule(k=4, exact=True, shape=(7, 7)))
+        self.assertEqual(batch.shape, (2, 7, 7))
+        for col in (0, 1, 3):
+            batch.step(np.array([col, 7*6 + col]))
+            batch.step(np.array([7*4 + col, 7*4 + col]))
+        batch.step(np.array([4, 7*6 + 4]))
+        batch.step(np.array([7*4 + 4, 7*4 + 5]))
+        rewards, dones = batch.step(np.array([2, 7*6 + 6]))
+        self.assertEqual(rewards.tolist(), [0, 0])
+        self.assertFalse(dones.any())
+        rewards, dones = batch.step(np.array([7*5, 7*4 + 2]))
+        self.assertEqual(rewards.tolist(), [0, 1])
+
+
+class TestForbiddenMove(unittest.TestCase):
+    def __board(self, rule: Rule, black, white=()) -> Board:
+        board: Board = Board(rule=rule)
+        if black:
+            board.init_board[tuple(zip(*black))] = Stone.BLACK
+        if white:
+            board.init_board[tuple(zip(*white))] = Stone.WHITE
+        return board
+
+    def test_double_three(self):
+        """열린 삼이 두 개 생기는 자리는 삼삼 금수"""
+        black = [(7,5), (7,6), (5,7), (6,7)]
+        for rule in (KOREAN_RULE, RENJU_RULE):
+            board: Board = self.__board(rule, black)
+            self.assertTrue(board.is_forbidden((7,7)))
+            with self.assertRaises(BoardErrors.ForbiddenMoveError):
+                board[7,7] = Stone.BLACK
+            self.assertEqual(board[7,7], Stone.EMPTY)
+        self.assertFalse(self.__board(Rule(), black).is_forbidden((7,7)))
+
+    def test_other_boards_same_with_board(self):
+        """SparseBoard와 BatchBoard도 같은 수순에서 Board와 같은 착수를 금수로 막아야 함"""
+        rng = np.random.default_rng(4)
+        forbidden: int = 0
+        for rule in (Rule(shape=(31, 31)), KOREAN_RULE._replace(shape=(31, 31)), RENJU_RULE._replace(shape=(31, 31))):
+            for _ in range(15):
+                board: Board = Board(rule=rule)
+                sparse: SparseBoard = SparseBoard(rule=rule)
+                batch: BatchBoard = BatchBoard(1, rule=rule)
+                stones = (Stone.BLACK, Stone.WHITE)
+                for i, cell in enumerate(rng.permutation(49).tolist()):
+                    idx: tuple[int, int] = 12 + cell // 7, 12 + cell % 7
+                    action: int = idx[0]*31 + idx[1]
+                    results: list[str] = []
+                    for target in (board, sparse):
+                        try:
+                            target[idx] = stones[i % 2]
+                            results.append("ok")
+                        except BoardErrors.WinError:
+                            results.append("win")
+                        except BoardErrors.ForbiddenMoveError:
+                            results.append("forbidden")
+                    self.assertEqual(results[0], results[1], (rule, board.moves, idx))
+                    self.assertEqual(batch.legal_mask()[0, action], results[0] != "forbidden")
+                    rewards, _ = batch.step(np.array([action]))
+                    self.assertEqual(rewards[0], {"ok": 0, "win": 1, "forbidden": -1}[results[0]])
+                    if results[0] != "ok":
+                        forbidden += results[0] == "forbidden"
+                        break
+        self.assertGreater(forbidden, 0)
+
+    def test_split_double_three(self):
+        """띈 삼도 열린 삼으로 셈"""
+        board: Board = self.__board(KOREAN_RULE, [(7,4), (7,6), (4,7), (5,7)])
+        self.assertTrue(board.is_forbidden((7,7)))
+
+    def test_blocked_three_is_not_three(self):
+        """한쪽이 막혀 열린 사를 만들 수 없는 삼은 삼삼에 포함되지 않음"""
+        black = [(7,5), (7,6), (5,7), (6,7)]
+        board: Board = self.__board(KOREAN_RULE, black, [(7,4)])
+        self.assertFalse(board.is_forbidden((7,7)))
+        board: Board = self.__board(KOREAN_RULE, black, [(7,8)])
+        self.assertFalse(board.is_forbidden((7,7)))
+
+    def test_double_four(self):
+        """사가 두 개 생기는 자리는 렌주에서만 사사 금수"""
+        black = [(7,4), (7,5), (7,6), (4,7), (5,7), (6,7)]
+        white = [(7,3), (3,7)]
+        self.assertTrue(self.__board(RENJU_RULE, black, white).is_forbidden((7,7)))
+        self.assertFalse(self.__board(KOREAN_RULE, black, white).is_forbidden((7,7)))
+        one_line = [(7,1), (7,3), (7,4), (7,5), (7,7)]
+        self.assertFalse(self.__board(RENJU_RULE, one_line).is_forbidden((7,2)))
+        self.assertTrue(self.__board(RENJU_RULE, [(7,1), (7,3), (7,4), (7,7)]).is_forbidden((7,5)))
+
+    def test_overline(self):
+        """렌주에서 흑 장목은 금수, 오목과 동시에 생기면 오목이 우선"""
+        black = [(7,1), (7,2), (7,3), (7,5), (7,6)]
+        self.assertTrue(self.__board(RENJU_RULE, black).is_forbidden((7,4)))
+        self.assertFalse(self.__board(KOREAN_RULE, black).is_forbidden((7,4)))
+        board: Board = self.__board(
+            RENJU_RULE, [(7,3), (7,4), (7,5), (7,6), (4,7), (5,7), (6,7), (3,7)]
+        )
+        self.assertFalse(board.is_forbidden((7,7)))
+        with self.assertRaises(BoardErrors.WinError):
+            board[7,7] = Stone.BLACK
+
+    def test_white_never_forbidden(self):
+        """금수는 흑에만 적용"""
+        board: Board = self.__board(RENJU_RULE, [(7,5), (7,6), (5,7), (6,7), (0,0)])
+        board.init_board[14,14] = Stone.WHITE
+        board[10,10] = Stone.BLACK
+        board.init_board[(7,5,7,6),(5,7,6,7)] = Stone.WHITE
+        board[7,7] = Stone.WHITE
+        self.assertEqual(board[7,7], Stone.WHITE)
+
+    def test_forbidden_mask(self):
+        """forbidden_mask는 모든 빈칸의 금수 여부를 한번에 반환"""
+        board: Board = self.__board(RENJU_RULE, [(7,5), (7,6), (5,7), (6,7)])
+        mask = board.forbidden_mask()
+        self.assertEqual(mask.shape, board.shape)
+        self.assertEqual(np.argwhere(mask).tolist(), [[7,7]])
+        self.assertFalse(Board().forbidden_mask().any())
+
+    def test_ai_avoids_forbidden(self):
+        """흑 ai는 금수 자리에 착수하지 않아야 함"""
+        board: Board = self.__board(RENJU_RULE, [(7,5), (7,6), (5,7), (6,7)])
+        ai: OmokAi = OmokAi(board, Stone.BLACK)
+        for _ in range(3):
+            self.assertNotEqual(ai.choose_move(), (7,7))
+            ai.put_stone()
+            board.undo()
+
+
+    def test_ai_ignores_forbidden_threat(self):
+        """흑의 사를 완성하는 칸이 금수(장목)면 백 ai는 막으러 가지 않고 scoring으로 골라야 함"""
+        black: list[tuple[int, int]] = [(7,3), (7,4), (7,5), (7,6), (7,8)]
+        white: list[tuple[int, int]] = [(7,2), (0,0), (0,14), (14,0), (14,14)]
+        for rule in (RENJU_RULE, Rule()):
+            board: Board = Board(rule=rule)
+            for b, w in zip(black, white):
+                board[b] = Stone.BLACK
+                board[w] = Stone.WHITE
+            ai: OmokAi = OmokAi(board, Stone.WHITE)
+            move = ai.choose_move()
+            if rule.has_forbidden:
+                self.assertTrue(board.forbidden_mask()[7,7])
+                self.assertTrue(ai.view_moveboard.any())
+            else:
+                self.assertEqual(move, (7,7))
+                self.assertFalse(ai.view_moveboard.any())
+
+
+class TestBoardStream(unittest.TestCase):
+    def test_patch_messages(self):
+        """착수와 무르기는 한 칸짜리 patch로 전달되어야 함"""
+        board: Board = Board()
+        stream: BoardStream = BoardStream(board)
+        messages: list[dict] = []
+        stream.join(messages.append)
+        board[7,7] = Stone.BLACK
+        board.undo()
+        self.assertEqual([m["type"] for m in messages], ["checkpoint", "patch", "patch"])
+        self.assertEqual(messages[1], {"type": "patch", "version": 1, "cell": [7, 7], "stone": 1})
+        self.assertEqual(messages[2], {"type": "patch", "version": 2, "cell": [7, 7], "stone": 0})
+
+    def test_checkpoint(self):
+        """checkpoint_every개마다, 그리고 init_board 수정 시 전체 상태를 보내야 함"""
+        board: Board = Board()
+        stream: BoardStream = BoardStream(board, checkpoint_every=3)
+        messages: list[dict] = []
+        stream.join(messages.append)
+        board[7,7] = Stone.BLACK
+        board[7,8] = Stone.WHITE
+        board[8,8] = Stone.BLACK
+        board.init_board[0,0] = Stone.WHITE
+        self.assertEqual(
+            [m["type"] for m in messages],
+            ["checkpoint", "patch", "patch", "checkpoint", "checkpoint"]
+        )
+        self.assertEqual(messages[3]["html"].count('class="empty"'), 222)
+        self.assertEqual(messages[4]["version"], board.version)
+        self.assertEqual(messages[4]["html"], board.to_html())
+
+    def test_late_join(self):
+        """늦게 들어온 클라이언트는 마지막 checkpoint와 밀린 patch를 받아야 함"""
+        board: Board = Board()
+        stream: BoardStream = BoardStream(board)
+        board[7,7] = Stone.BLACK
+        board[7,8] = Stone.WHITE
+        late: list[dict] = []
+        stream.join(late.append)
+        self.assertEqual([m["type"] for m in late], ["checkpoint", "patch", "patch"])
+        self.assertEqual(late[-1]["version"], board.version)
+
+        stream.close()
+        board[8,8] = Stone.BLACK
+        self.assertEqual(len(late), 3)
+
+    def test_heat_delta(self):
+        """scorer를 주면 moveboard가 바뀐 칸만 heat로 보내야 함"""
+        board: Board = Board()
+        ai: OmokAi = OmokAi(board, Stone.WHITE)
+        stream: BoardStream = BoardStream(board, scorer=ai)
+        messages: list[dict] = []
+        stream.join(messages.append)
+        self.assertEqual(np.array(messages[0]["heat"]).shape, board.shape)
+        board[7,7] = Stone.BLACK
+        heat: dict = {(r, c): v for r, c, v in messages[1]["heat"]}
+        self.assertIn((7, 6), heat)
+        self.assertNotIn((0, 0), heat)
+        ai.scoring()
+        for (r, c), v in heat.items():
+            self.assertEqual(ai.view_moveboard[r, c], v)
+
+    def test_heat_patches_match_checkpoint(self):
+        """정수가 아닌 가중치에서도 patch의 heat를 차례로 적용한 결과가 checkpoint의 heat와 같아야 함"""
+        board: Board = Board()
+        stream: BoardStream = BoardStream(board, scorer=OmokAi(board, Stone.WHITE, attack=0.5, defence=1.5))
+        messages: list[dict] = []
+        stream.join(messages.append)
+        board[7,7] = Stone.BLACK
+        board[7,8] = Stone.WHITE
+        board[8,8] = Stone.BLACK
+        board.undo()
+        board[6,6] = Stone.BLACK
+        heat: np.ndarray = np.array(messages[0]["heat"])
+        for message in messages[1:]:
+            for r, c, v in message["heat"]:
+                heat[r, c] = v
+        expected: np.ndarray = np.array(
+            BoardStream(board, scorer=OmokAi(board, Stone.WHITE, attack=0.5, defence=1.5)).checkpoint["heat"]
+        )
+        self.assertTrue((heat % 1 != 0).any())
+        self.assertTrue((heat == expected).all())
+
+
+class TestAiPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.pool = AiPool(max_workers=1, max_jobs=2)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.pool.close()
+
+    def test_should_stop(self):
+        """should_stop이 True가 되면 scoring 도중에도 StoppedError로 멈춰야 함"""
+        board: Board = Board()
+        board[7,7] = Stone.BLACK
+        calls: list[int] = []
+        def should_stop() -> bool:
+            calls.append(1)
+            return len(calls) > 5
+        ai: OmokAi = OmokAi(board, Stone.WHITE, should_stop=should_stop)
+        with self.assertRaises(OmokAiErrors.StoppedError):
+            ai.choose_move()
+        self.assertEqual(OmokAi(board, Stone.WHITE, should_stop=lambda: False).choose_move(),
+                         OmokAi(board, Stone.WHITE).choose_move())
+
+    def test_should_stop_forbidden(self):
+        """흑 차례의 금수 규칙 보드에서는 금수 계산 전이나 도중에 멈춰도 StoppedError를 내고,
+        중단된 금수 계산이 forbidden_mask 캐시에 남지 않아야 함"""
+        board: Board = Board(rule=RENJU_RULE)
+        for idx, stone in (((7,7), Stone.BLACK), ((0,0), Stone.WHITE), ((7,9), Stone.BLACK),
+                           ((0,2), Stone.WHITE), ((9,7), Stone.BLACK), ((0,4), Stone.WHITE)):
+            board[idx] = stone
+        for allowed_calls in range(3):
+            calls: list[int] = []
+            def should_stop() -> bool:
+                calls.append(1)
+                return len(calls) > allowed_calls
+            ai: OmokAi = OmokAi(board, Stone.BLACK, should_stop=should_stop)
+            with self.assertRaises(OmokAiErrors.StoppedError):
+                ai.choose_move()
+        self.assertEqual(OmokAi(board, Stone.BLACK, should_stop=lambda: False).choose_move(),
+                         OmokAi(board, Stone.BLACK).choose_move())
+        fresh: Board = Board.from_bytes(board.to_bytes(), RENJU_RULE)
+        self.assertTrue((board.forbidden_mask() == fresh.forbidden_mask()).all())
+
+    def test_choose_move(self):
+        """프로세스 풀 결과가 같은 프로세스에서 계산한 결과와 같아야 함"""
+        board: Board = Board()
+        board[7,7] = Stone.BLACK
+        board[7,8] = Stone.WHITE
+        board[6,6] = Stone.BLACK
+        ai: OmokAi = OmokAi(board, Stone.WHITE)
+        expected = ai.choose_move()
+        self.assertEqual(asyncio.run(self.pool.choose_move(board, Stone.WHITE)), expected)
+        self.assertEqual(asyncio.run(self.pool.choose_reply(board, Stone.WHITE)),
+                         Reply(expected, ai.view_moveboard[expected].item()))
+
+        idx = asyncio.run(self.pool.put_stone(board, Stone.WHITE))
+        self.assertEqual(idx, expected)
+        self.assertEqual(board[idx], Stone.WHITE)
+
+    def test_cancel(self):
+        """취소된 작업은 CancelledError를 내고 작업 칸을 돌려줘야 함"""
+        board: Board = Board()
+        board[7,7] = Stone.BLACK
+
+        async def cancel_then_play():
+            tasks = [asyncio.create_task(self.pool.choose_move(board, Stone.WHITE)) for _ in range(3)]
+            await asyncio.sleep(0)
+            for task in tasks:
+                task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            move = await self.pool.choose_move(board, Stone.WHITE)
+            for _ in range(100):
+                if self.pool.active == 0:
+                    break
+                await asyncio.sleep(0.01)
+            return results, move
+
+        results, move = asyncio.run(cancel_then_play())
+        self.assertTrue(all(isinstance(r, asyncio.CancelledError) for r in results))
+        self.assertEqual(move, OmokAi(board, Stone.WHITE).choose_move())
+        self.assertEqual(self.pool.active, 0)
+
+
+class TestAnalysisService(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now: float = 0.0
+        self.service: AnalysisService = AnalysisService(ttl=1.0, clock=lambda: self.now)
+        self.board: Board = Board()
+        self.board[7,7] = Stone.BLACK
+
+    def __analyse_many(self, board: Board, n: int):
+        async def run():
+            return await asyncio.gather(*[self.service.analyse(board, Stone.WHITE) for _ in range(n)])
+        return asyncio.run(run())
+
+    def test_single_flight(self):
+        """같은 국면의 동시 요청은 한번만 계산하고 결과를 공유해야 함"""
+        results = self.__analyse_many(self.board, 5)
+        self.assertEqual(self.service.computed, 1)
+        self.assertEqual(self.service.coalesced, 4)
+        self.assertTrue(all(result is results[0] for result in results))
+
+        ai: OmokAi = OmokAi(self.board, Stone.WHITE)
+        self.assertEqual(results[0].move, ai.choose_move())
+        self.assertTrue((results[0].moveboard == ai.view_moveboard).all())
+        with self.assertRaises(ValueError):
+            results[0].moveboard[0, 0] = 1
+
+    def test_ttl_cache(self):
+        """ttl 안에는 캐시에서 돌려주고, 지나거나 국면이 바뀌면 다시 계산해야 함"""
+        first = self.__analyse_many(self.board, 1)[0]
+        self.now = 0.5
+        self.assertIs(self.__analyse_many(self.board, 1)[0], first)
+        self.assertEqual((self.service.computed, self.service.hits), (1, 1))
+
+        self.board[7,8] = Stone.WHITE
+        self.__analyse_many(self.board, 1)
+        self.assertEqual(self.service.computed, 2)
+        self.board.undo()
+        self.assertIs(self.__analyse_many(self.board, 1)[0], first)
+
+        self.now = 2.0
+        self.assertIsNot(self.__analyse_many(self.board, 1)[0], first)
+        self.assertEqual(self.service.computed, 3)
+
+    def test_cancelled_waiter(self):
+        """기다리던 요청 하나가 취소되어도 다른 요청은 결과를 받아야 함"""
+        async def run():
+            tasks = [asyncio.create_task(self.service.analyse(self.board, Stone.WHITE)) for _ in range(3)]
+            await asyncio.sleep(0)
+            tasks[0].cancel()
+            return await asyncio.gather(*tasks, return_exceptions=True)
+        results = asyncio.run(run())
+        self.assertIsInstance(results[0], asyncio.CancelledError)
+        self.assertIs(results[1], results[2])
+        self.assertEqual(self.service.computed, 1)
+
+
+class TestReplyCache(unittest.TestCase):
+    def __boards(self):
+        """같은 국면을 돌리고 뒤집은 보드 두 개"""
+        board: Board = Board()
+        board.init_board[(7, 7, 6), (7, 8, 8)] = Stone.BLACK
+        board.init_board[(8, 5), (8, 9)] = Stone.WHITE
+        mirrored: Board = Board()
+        mirrored.init_board[:] = np.rot90(board.viewcopy()).T
+        return board, mirrored
+
+    def test_symmetric_positions(self):
+        """대칭 국면은 한 항목을 공유하고 수는 각 보드 좌표로 돌려줘야 함"""
+        board, mirrored = self.__boards()
+        cache: ReplyCache = ReplyCache()
+        move = cache.choose_move(board, Stone.WHITE)
+        self.assertEqual(move, OmokAi(board, Stone.WHITE).choose_move())
+        self.assertEqual(len(cache), 1)
+
+        reply: Reply = cache.get(mirrored, Stone.WHITE)
+        self.assertEqual(len(cache), 1)
+        expected = np.zeros(board.shape, dtype=int)
+        expected[move] = 1
+        self.assertEqual(reply.move, tuple(np.argwhere(np.rot90(expected).T)[0].tolist()))
+        self.assertEqual(mirrored[reply.move], Stone.EMPTY)
+        self.assertIsNotNone(reply.score)
+
+        self.assertIsNone(cache.get(board, Stone.BLACK))
+        self.assertIsNone(cache.get(board, Stone.WHITE, attack=2))
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        self.assertEqual(cache.hit_rate, 0.25)
+
+    def test_lru(self):
+        """max_entries를 넘으면 가장 오래 쓰지 않은 항목부터 버려야 함"""
+        cache: ReplyCache = ReplyCache(max_entries=2)
+        boards: list[Board] = [Board() for _ in range(3)]
+        for i, board in enumerate(boards):
+            board[7, i] = Stone.BLACK
+            cache.put(board, Stone.WHITE, Reply((0, i), 1.0))
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(boards[0], Stone.WHITE))
+        self.assertEqual(cache.get(boards[1], Stone.WHITE).move, (0, 1))
+        cache.put(boards[0], Stone.WHITE, Reply(None, None))
+        self.assertIsNone(cache.get(boards[2], Stone.WHITE))
+        self.assertEqual(cache.get(boards[0], Stone.WHITE), Reply(None, None))
+
+    def test_save_load(self):
+        """SQLite 파일로 저장한 내용과 LRU 순서를 다시 불러와야 함"""
+        board, mirrored = self.__boards()
+        other: Board = Board()
+        other[7,7] = Stone.BLACK
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, "replies.sqlite")
+            self.assertEqual(len(ReplyCache(path=path)), 0)
+            cache: ReplyCache = ReplyCache()
+            move = cache.choose_move(board, Stone.WHITE)
+            cache.put(other, Stone.WHITE, Reply(None, None))
+            cache.save(path)
+
+            loaded: ReplyCache = ReplyCache(max_entries=1, path=path)
+            self.assertEqual(len(loaded), 1)
+            self.assertEqual(loaded.get(other, Stone.WHITE), Reply(None, None))
+            loaded.max_entries = 2
+            loaded.load()
+            self.assertEqual(loaded.get(board, Stone.WHITE).move, move)
+
+
+class TestSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.__directory = tempfile.TemporaryDirectory()
+        self.now: float = 0.0
+
+    def tearDown(self):
+        self.__directory.cleanup()
+
+    def __store(self, max_active: int = 2) -> SessionStore:
+        return SessionStore(self.__directory.name, max_active, clock=lambda: self.now)
+
+    def test_dump_load(self):
+        """착수 기록으로 저장한 보드는 수순과 무르기까지 복원되어야 함"""
+        board: Board = Board(rule=KOREAN_RULE)
+        for idx, stone in zip([(7,7), (7,8), (8,8), (6,6)], [Stone.BLACK, Stone.WHITE]*2):
+            board[idx] = stone
+        data: bytes = dump_board(board)
+        self.assertEqual(len(data), 5 + 2*4)
+        loaded: Board = load_board(data)
+        self.assertEqual(loaded.rule, KOREAN_RULE)
+        self.assertEqual(loaded.moves, board.moves)
+        self.assertEqual(loaded.zobrist, board.zobrist)
+        self.assertEqual(loaded.undo(), (6,6))
+        self.assertEqual(loaded.last_stone, Stone.BLACK)
+
+        board.init_board[0, 0] = Stone.WHITE
+        loaded = load_board(dump_board(board))
+        self.assertEqual(loaded.code_view().tolist(), board.code_view().tolist())
+        self.assertEqual(loaded.last_stone, board.last_stone)
+
+    def test_winning_moves(self):
+        """승리한 마지막 수까지 복원되어야 함"""
+        board: Board = Board()
+        for i in range(4):
+            board[7, i] = Stone.BLACK
+            board[0, i] = Stone.WHITE
+        with self.assertRaises(BoardErrors.WinError):
+            board[7, 4] = Stone.BLACK
+        self.assertEqual(load_board(dump_board(board)).moves, board.moves)
+
+    def test_lru_spill(self):
+        """max_active를 넘으면 checkout 중이 아닌 가장 오래된 보드부터 내보내야 함"""
+        store: SessionStore = self.__store()
+        store.create("a")[7, 7] = Stone.BLACK
+        self.now = 1
+        self.assertIs(store.checkout("a"), store.get("a"))
+        store.create("b")
+        self.now = 2
+        store.create("c")
+        self.assertEqual((store.active, store.spills), (2, 1))
+        self.assertIn("b", store)
+        self.assertNotIn("d", store)
+
+        store.checkin("a")
+        self.assertEqual(store.get("b").moves, ())
+        self.assertEqual(store.loads, 1)
+        self.assertEqual(store.active, 2)
+        self.assertEqual(store.get("a")[7, 7], Stone.BLACK)
+        with self.assertRaises(KeyError):
+            store.get("d")
+        with self.assertRaises(KeyError):
+            store.get("../a")
+
+    def test_invalid_id(self):
+        """파일 이름으로 쓸 수 없는 id는 없는 게임으로 다뤄야 함"""
+        store: SessionStore = self.__store()
+        store.create("a")
+        for game_id in ("", "../a", "a?x=1", "a/b", "a b", "a.omok", "가"):
+            self.assertNotIn(game_id, store)
+            with self.assertRaises(KeyError):
+                store.get(game_id)
+            with self.assertRaises(KeyError):
+                store.create(game_id)
+
+    def test_spill_idle(self):
+        """idle_seconds 넘게 쓰지 않고 checkout 중이 아닌 보드만 내보내야 함"""
+        store: SessionStore = self.__store(max_active=8)
+        store.create("a")[7, 7] = Stone.BLACK
+        store.create("b")
+        store.checkout("b")
+        self.now = 10
+        store.create("c")
+        self.assertEqual(store.spill_idle(5), 1)
+        self.assertEqual(store.active, 2)
+        self.assertEqual(store.get("a").moves, ((7, 7),))
+
+        store.flush()
+        reopened: SessionStore = self.__store()
+        self.assertEqual(reopened.get("a").moves, ((7, 7),))
+        store.delete("a")
+        self.assertNotIn("a", store)
+        self.assertNotIn("a", self.__store())
+
+
+class TestGameServer(unittest.TestCase):
+    """main.GameServer에 asyncio 스트림으로 접속해 HTTP와 WebSocket 처리를 확인"""
+    def setUp(self):
+        self.__directory = tempfile.TemporaryDirectory()
+        self.server = main.GameServer(main.BatchQueue(), SessionStore(self.__directory.name))
+
+    def tearDown(self):
+        self.__directory.cleanup()
+
+    def __run(self, scenario) -> None:
+        """서버를 띄우고 scenario(port)를 실행"""
+        async def run():
+            listener = await asyncio.start_server(self.server.handle, "127.0.0.1", 0)
+            async with listener:
+                await asyncio.wait_for(scenario(listener.sockets[0].getsockname()[1]), 10)
+        asyncio.run(run())
+
+    @staticmethod
+    async def __http(port: int, request: str) -> tuple[int, bytes]:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request.encode())
+        response: bytes = await reader.read()
+        writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), body
+
+    async def __new_game(self, port: int, rule: str = "default") -> str:
+        body: str = json.dumps({"rule": rule})
+        status, data = await self.__http(
+            port, f"POST /games HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n{body}"
+        )
+        self.assertEqual(status, 201)
+        return json.loads(data)["id"]
+
+    @staticmethod
+    async def __connect(port: int, game_id: str, key: str = "dGhlIHNhbXBsZSBub25jZQ=="):
+        """WebSocket 핸드셰이크 후 (reader, writer, 응답 머리말)"""
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(
+            f"GET /ws/{game_id} HTTP/1.1\r\nHost: test\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n\r\n".encode()
+        )
+        head: bytes = await reader.readuntil(b"\r\n\r\n")
+        return reader, writer, head
+
+    @staticmethod
+    def __send(writer: asyncio.StreamWriter, message) -> None:
+        """클라이언트 프레임은 마스킹해서 보냄"""
+        payload: bytes = (message if isinstance(message, str) else json.dumps(message)).encode()
+        mask: bytes = os.urandom(4)
+        writer.write(
+            struct.pack("!BB", 0x81, 0x80 | len(payload)) + mask
+            + bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        )
+
+    @staticmethod
+    async def __recv(reader: asyncio.StreamReader) -> dict:
+        head: bytes = await reader.readexactly(2)
+        length: int = head[1] & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        return json.loads(await reader.readexactly(length))
+
+    def test_http_routes(self):
+        """HTML 클라이언트, 게임 생성과 보드 조회, 없는 경로"""
+        async def scenario(port):
+            status, body = await self.__http(port, "GET / HTTP/1.1\r\n\r\n")
+            self.assertEqual(status, 200)
+            self.assertIn(b"<html>", body)
+            game_id: str = await self.__new_game(port, "renju")
+            self.assertEqual(self.server.store.get(game_id).rule, RENJU_RULE)
+            status, body = await self.__http(port, f"GET /games/{game_id} HTTP/1.1\r\n\r\n")
+            self.assertEqual(status, 200)
+            self.assertEqual(body.decode(), Board().to_html())
+            body = '{"rule": "unknown"}'
+            status, _ = await self.__http(
+                port, f"POST /games HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n{body}"
+            )
+            self.assertEqual(status, 400)
+            for path in ("/games/nope", "/games/../etc", "/nope"):
+                status, _ = await self.__http(port, f"GET {path} HTTP/1.1\r\n\r\n")
+                self.assertEqual(status, 404)
+        self.__run(scenario)
+
+    def test_handshake(self):
+        """RFC 6455 예시 키로 Accept를 계산하고 checkpoint를 먼저 보내야 함.
+        없는 게임이나 파일 이름으로 쓸 수 없는 id는 404"""
+        async def scenario(port):
+            game_id: str = await self.__new_game(port)
+            reader, writer, head = await self.__connect(port, game_id)
+            self.assertTrue(head.startswith(b"HTTP/1.1 101"))
+            self.assertIn(b"Sec-WebSocket-Accept: s3pPLMBiTxaQ9kYGzzhZRbK+xOo=", head)
+            checkpoint: dict = await self.__recv(reader)
+            self.assertEqual(checkpoint["type"], "checkpoint")
+            self.assertEqual(checkpoint["shape"], [15, 15])
+            writer.close()
+            for bad_id in ("nope", "../etc", "abc?x=1", ""):
+                reader, writer, head = await self.__connect(port, bad_id)
+                self.assertTrue(head.startswith(b"HTTP/1.1 404"), bad_id)
+                writer.close()
+        self.__run(scenario)
+
+    def test_messages(self):
+        """착수는 모든 클라이언트에게 patch로, 규칙 위반은 보낸 클라이언트에게만 error로 알려야 함"""
+        async def scenario(port):
+            game_id: str = await self.__new_game(port)
+            player, player_writer, _ = await self.__connect(port, game_id)
+            viewer, viewer_writer, _ = await self.__connect(port, game_id)
+            await self.__recv(player)
+            await self.__recv(viewer)
+
+            self.__send(player_writer, {"type": "move", "cell": [7, 7]})
+            patch: dict = {"type": "patch", "version": 1, "cell": [7, 7], "stone": 1}
+            self.assertEqual(await self.__recv(player), patch)
+            self.assertEqual(await self.__recv(viewer), patch)
+
+            for message, error in (
+                ({"type": "move", "cell": [7, 7]}, "NotEmptyBoardError"),
+                ({"type": "move", "cell": [-1, 0]}, "MinusIndexError"),
+                ({"type": "move", "cell": [99, 0]}, "BadMessage"),
+                ({"type": "move"}, "BadMessage"),
+                ({"type": "dance"}, "BadMessage"),
+                ("garbage", "BadMessage"),
+            ):
+                self.__send(player_writer, message)
+                self.assertEqual((await self.__recv(player))["error"], error)
+
+            self.__send(viewer_writer, {"type": "ai"})
+            self.__send(viewer_writer, {"type": "move", "cell": [0, 0]})
+            self.assertEqual(await self.__recv(viewer), {"type": "error", "error": "AiThinking"})
+            ai_patch: dict = await self.__recv(viewer)
+            self.assertEqual((ai_patch["version"], ai_patch["stone"]), (2, 2))
+            self.assertEqual(await self.__recv(player), ai_patch)
+
+            self.__send(player_writer, {"type": "resign", "stone": 1})
+            self.assertEqual(await self.__recv(player), {"type": "result", "winner": 2})
+            self.assertEqual(await self.__recv(viewer), {"type": "result", "winner": 2})
+            self.__send(player_writer, {"type": "move", "cell": [0, 0]})
+            self.assertEqual(await self.__recv(player), {"type": "error", "error": "GameOver"})
+
+            self.__send(player_writer, {"type": "undo"})
+            self.assertEqual((await self.__recv(viewer))["stone"], 0)
+            self.assertIsNone(self.server.games[game_id].winner)
+            player_writer.close()
+            viewer_writer.close()
+        self.__run(scenario)
+
+    def test_reply_cache(self):
+        """AI 응수는 점수와 함께 replies에 저장하고, 같은 국면에서는 저장된 수를 둬야 함"""
+        replies: ReplyCache = ReplyCache()
+        self.server = main.GameServer(main.BatchQueue(), self.server.store, replies)
+
+        async def scenario(port):
+            game_id: str = await self.__new_game(port)
+            reader, writer, _ = await self.__connect(port, game_id)
+            await self.__recv(reader)
+            self.__send(writer, {"type": "move", "cell": [7, 7]})
+            await self.__recv(reader)
+            board: Board = Board()
+            board[7,7] = Stone.BLACK
+            self.__send(writer, {"type": "ai"})
+            cell: list[int] = (await self.__recv(reader))["cell"]
+
+            ai: OmokAi = OmokAi(board, Stone.WHITE)
+            move = ai.choose_move()
+            self.assertEqual(replies.get(board, Stone.WHITE), Reply(move, ai.view_moveboard[move].item()))
+            self.assertEqual(tuple(cell), move)
+            self.__send(writer, {"type": "undo"})
+            await self.__recv(reader)
+            self.__send(writer, {"type": "ai"})
+            self.assertEqual((await self.__recv(reader))["cell"], cell)
+            self.assertEqual(len(replies), 1)
+            writer.close()
+        self.__run(scenario)
+
+    def test_disconnect(self):
+        """마지막 클라이언트가 나가면 게임을 저장소에 돌려주고, 다시 접속하면 이어서 진행해야 함"""
+        async def scenario(port):
+            game_id: str = await self.__new_game(port)
+            reader, writer, _ = await self.__connect(port, game_id)
+            await self.__recv(reader)
+            self.__send(writer, {"type": "move", "cell": [7, 7]})
+            await self.__recv(reader)
+            self.assertIn(game_id, self.server.games)
+            writer.close()
+            while game_id in self.server.games:
+                await asyncio.sleep(0.01)
+
+            self.server.store.spill(game_id)
+            reader, writer, _ = await self.__connect(port, game_id)
+            checkpoint: dict = await self.__recv(reader)
+            self.assertEqual(checkpoint["last_stone"], 1)
+            self.assertEqual(self.server.games[game_id].board.moves, ((7, 7),))
+            writer.close()
+        self.__run(scenario)
+
+    def test_slow_client(self):
+        """보내지 못한 데이터가 MAX_BUFFERED를 넘게 쌓인 클라이언트는 연결을 끊어야 함"""
+        class Transport:
+            buffered: int = 0
+            aborted: bool = False
+
+            def get_write_buffer_size(self) -> int:
+                return self.buffered
+
+            def abort(self) -> None:
+                self.aborted = True
+
+        class Writer:
+            def __init__(self) -> None:
+                self.transport: Transport = Transport()
+                self.written: list[bytes] = []
+
+            def is_closing(self) -> bool:
+                return self.transport.aborted
+
+            def write(self, data: bytes) -> None:
+                self.written.append(data)
+                self.transport.buffered += len(data)
+
+        writer: Writer = Writer()
+        ws: main.WebSocket = main.WebSocket(None, writer)
+        message: dict = {"type": "patch", "html": "x" * 1000}
+        while not writer.transport.aborted:
+            ws.send(message)
+        self.assertLessEqual(writer.transport.buffered, main.MAX_BUFFERED + 2000)
+        sent: int = len(writer.written)
+        ws.send(message)
+        self.assertEqual(len(writer.written), sent)
+
+
+class TestSparseBoard(unittest.TestCase):
+    def test_play_anywhere(self):
+        """음수나 아주 먼 좌표에도 착수할 수 있어야 함"""
+        board: SparseBoard = SparseBoard()
+        board[-1000,3] = Stone.BLACK
+        board[10**9,-10**9] = Stone.WHITE
+        self.assertEqual(board[-1000,3], Stone.BLACK)
+        self.assertEqual(board[10**9,-10**9], Stone.WHITE)
+        self.assertEqual(board[0,0], Stone.EMPTY)
+        self.assertEqual(len(board), 2)
+        self.assertEqual(board.bounds, ((-1000, -10**9), (10**9, 3)))
+
+    def test_resolve_rule(self):
+        """rule은 Board와 같이 k < 1이면 RuleError, exact는 bool로 정규화"""
+        with self.assertRaises(BoardErrors.RuleError):
+            SparseBoard(rule=Rule(k=0))
+        self.assertIs(SparseBoard(rule=Rule(k=3, exact=1)).rule.exact, True)
+        self.assertEqual(SparseBoard().rule, Board().rule)
+
+    def test_follow_board_rules(self):
+        """Board와 같은 착수 규칙을 적용해야 함"""
+        board: SparseBoard = SparseBoard()
+        with self.assertRaises(BoardErrors.BlackFirstError):
+            board[0,0] = Stone.WHITE
+        with self.assertRaises(BoardErrors.PutEmptyStoneError):
+            board[0,0] = Stone.EMPTY
+        with self.assertRaises(BoardErrors.UseSliceError):
+            board[0] = Stone.BLACK
+        board[0,0] = Stone.BLACK
+        with self.assertRaises(BoardErrors.NotEmptyBoardError):
+            board[0,0] = Stone.WHITE
+        with self.assertRaises(BoardErrors.PutSameAgainError):
+            board[0,1] = Stone.BLACK
+
+    def test_run_length_and_win(self):
+        """방향별 run을 합쳐 길이를 유지하고 5개가 되면 WinError"""
+        board: SparseBoard = SparseBoard()
+        black = [(-2,-2), (0,0), (2,2), (-1,-1)]
+        white = [(50,0), (50,1), (50,2), (50,4)]
+        for b, w in zip(black, white):
+            board[b] = Stone.BLACK
+            board[w] = Stone.WHITE
+        self.assertEqual(board.run_length((-1,-1), 2), 3)
+        self.assertEqual(board.run_length((50,1), 0), 3)
+        self.assertEqual(board.run_length((50,4), 0), 1)
+        self.assertEqual(board.run_length((7,7), 0), 0)
+        with self.assertRaises(BoardErrors.WinError):
+            board[1,1] = Stone.BLACK
+        self.assertEqual(board.run_length((2,2), 2), 5)
+
+    def test_candidates(self):
+        """돌 주변 2칸 이내의 빈칸만 착수 후보"""
+        board: SparseBoard = SparseBoard()
+        self.assertEqual(board.candidates, frozenset())
+        board[100,100] = Stone.BLACK
+        self.assertEqual(len(board.candidates), 24)
+        board[100,101] = Stone.WHITE
+        self.assertEqual(len(board.candidates), 30 - 2)
+        self.assertNotIn((100,101), board.candidates)
+
+    def test_to_dense(self):
+        """돌이 놓인 영역만 Stone ndarray로 변환"""
+        board: SparseBoard = SparseBoard()
+        board[-3,5] = Stone.BLACK
+        board[-1,4] = Stone.WHITE
+        arr, origin = board.to_dense(margin=1)
+        self.assertEqual(arr.shape, (5, 4))
+        self.assertEqual(origin, (-4, 3))
+        self.assertEqual(arr[1,2], Stone.BLACK)
+        self.assertEqual(arr[3,1], Stone.WHITE)
+
+
+class TestBatchBoard(unittest.TestCase):
+    def test_has_batch_shape(self):
+        """N개의 판을 (N, 15, 15) 배열 하나로 가져야 함"""
+        batch: BatchBoard = BatchBoard(4)
+        self.assertEqual(batch.shape, (4, 15, 15))
+        self.assertTrue((batch.boards == BatchBoard.EMPTY).all())
+
+    def test_boards_readonly(self):
+        """batch.boards로 판을 직접 변경할 수 없어야 함"""
+        batch: BatchBoard = BatchBoard(2)
+        with self.assertRaises(ValueError):
+            batch.boards[0, 0, 0] = BatchBoard.BLACK
+
+    def test_step_alternates_stones(self):
+        """모든 판에서 흑부터 번갈아 착수"""
+        batch: BatchBoard = BatchBoard(3)
+        rewards, dones = batch.step(np.array([0, 16, 224]))
+        self.assertTrue((rewards == 0).all())
+        self.assertFalse(dones.any())
+        self.assertTrue((batch.boards[[0, 1, 2], [0, 1, 14], [0, 1, 14]] == BatchBoard.BLACK).all())
+        batch.step(np.array([1, 17, 223]))
+        self.assertTrue((batch.boards[[0, 1, 2], [0, 1, 14], [1, 2, 13]] == BatchBoard.WHITE).all())
+
+    def test_illegal_action_loses_and_resets(self):
+        """빈칸이 아니거나 범위 밖 착수는 -1 보상과 함께 판이 초기화됨"""
+        batch: BatchBoard = BatchBoard(3)
+        batch.step(np.array([5, 5, 5]))
+        rewards, dones = batch.step(np.array([5, -1, 6]))
+        self.assertEqual(rewards.tolist(), [-1, -1, 0])
+        self.assertEqual(dones.tolist(), [True, True, False])
+        self.assertTrue((batch.boards[:2] == BatchBoard.EMPTY).all())
+        self.assertEqual((batch.boards[2] != BatchBoard.EMPTY).sum(), 2)
+        with self.assertRaises(BatchBoardErrors.ActionShapeError):
+            batch.step(np.array([1, 2]))
+
+    def test_win_resets_board(self):
+        """오목을 완성한 판만 1 보상을 받고 초기화됨"""
+        batch: BatchBoard = BatchBoard(2)
+        black = [(7, 3), (6, 4), (5, 5), (4, 6), (3, 7)]
+        white = [(0, 0), (0, 1), (0, 2), (0, 3)]
+        for i, (r, c) in enumerate(black):
+            rewards, dones = batch.step(np.array([r*15 + c, 14*15 + 2*i]))
+            if i < 4:
+                self.assertFalse(dones.any())
+                batch.step(np.array([white[i][0]*15 + white[i][1], 2*i]))
+        self.assertEqual(rewards.tolist(), [1, 0])
+        self.assertEqual(dones.tolist(), [True, False])
+        self.assertTrue((batch.boards[0] == BatchBoard.EMPTY).all())
+        self.assertEqual((batch.boards[1] != BatchBoard.EMPTY).sum(), 9)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file